@@ -2,7 +2,7 @@ from __future__ import absolute_import
 
 import six
 
-from datetime import timedelta
+from datetime import datetime, timedelta
 from django.db.models import Q
 from django.utils import timezone
 from rest_framework.response import Response
@@ -16,6 +16,7 @@ from sentry.models import Environment, Event, Group
 from sentry.search.utils import parse_query
 from sentry.utils.apidocs import scenario, attach_scenarios
 from sentry.search.utils import InvalidQuery
+from sentry.utils.cursors import Cursor
 
 
 @scenario('ListAvailableSamples')
@@ -24,6 +25,33 @@ def list_available_samples_scenario(runner):
     runner.request(method='GET', path='/issues/%s/events/' % group.id)
 
 
+def get_page_bounds(request, default_per_page=100):
+    """
+    Returns the ``end`` and ``limit`` of the events (most recent first) that
+    are needed for the page of events that is requested.
+    """
+    try:
+        per_page = int(request.GET.get('per_page', default_per_page))
+        cursor = request.GET.get('cursor')
+        cursor = Cursor.from_string(cursor) if cursor else None
+    except ValueError:
+        return {}
+
+    if cursor is None:
+        return {'limit': per_page + 1}
+
+    # Previous pages are read in the opposite order.
+    if cursor.is_prev:
+        return {}
+
+    bounds = {'limit': cursor.offset + per_page + 1}
+    if cursor.value:
+        bounds['end'] = datetime.fromtimestamp(
+            float(cursor.value) / DateTimePaginator.multiplier
+        ).replace(tzinfo=timezone.utc)
+    return bounds
+
+
 class GroupEventsEndpoint(GroupEndpoint, EnvironmentMixin):
     doc_section = DocSection.EVENTS
 
@@ -92,11 +120,14 @@ class GroupEventsEndpoint(GroupEndpoint, EnvironmentMixin):
             events = events.filter(q)
 
         if tags:
+            # Unless the events are filtered further, only the events of the
+            # requested page need to be matched by the tag filter.
             event_filter = tagstore.get_group_event_filter(
                 group.project_id,
                 group.id,
                 environment.id if environment is not None else None,
                 tags,
+                **(get_page_bounds(request) if not query else {})
             )
 
             if not event_filter:
@@ -11,7 +11,7 @@ from sentry.api.content_negotiation import ConditionalContentNegotiation
 from sentry.api.exceptions import ResourceDoesNotExist
 from sentry.api.paginator import OffsetPaginator
 from sentry.api.serializers import serialize
-from sentry.models import File, Release, ReleaseFile
+from sentry.models import File, Release, ReleaseFile, ReleaseFileManifest
 from sentry.utils.apidocs import scenario, attach_scenarios
 
 ERR_FILE_EXISTS = 'A file matching this name already exists for the given release'
@@ -189,4 +189,8 @@ class ProjectReleaseFilesEndpoint(ProjectEndpoint):
             file.delete()
             return Response({'detail': ERR_FILE_EXISTS}, status=409)
 
+        # Manifests built while the transaction was open may not include the
+        # new file.
+        ReleaseFileManifest.invalidate(release.id, dist.id if dist else None)
+
         return Response(serialize(releasefile, request.user), status=201)
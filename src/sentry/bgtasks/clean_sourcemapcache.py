@@ -0,0 +1,9 @@
+from __future__ import absolute_import
+
+from sentry.bgtasks.api import bgtask
+from sentry.lang.javascript.sourcemapcache import sourcemap_artifact_cache
+
+
+@bgtask()
+def clean_sourcemapcache():
+    sourcemap_artifact_cache.clear_old_entries()
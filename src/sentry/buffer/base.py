@@ -10,10 +10,15 @@ from __future__ import absolute_import
 import logging
 import six
 
-from django.db.models import F
+from collections import defaultdict
+from django.db import connections, router
+from django.db.models import F, Model
+from django.db.models.fields import AutoField, FieldDoesNotExist
 
+from sentry.db.models.utils import ExpressionNode
 from sentry.signals import buffer_incr_complete
 from sentry.tasks.process_buffer import process_incr
+from sentry.utils import db
 from sentry.utils.services import Service
 
 
@@ -38,7 +43,7 @@ class Buffer(Service):
     This is useful in situations where a single event might be happening so fast that the queue cant
     keep up with the updates.
     """
-    __all__ = ('incr', 'process', 'process_pending', 'validate')
+    __all__ = ('incr', 'incr_many', 'flush', 'process', 'process_pending', 'validate')
 
     def incr(self, model, columns, filters, extra=None):
         """
@@ -53,6 +58,21 @@ class Buffer(Service):
             }
         )
 
+    def incr_many(self, increments):
+        """
+        Perform several increments at once. ``increments`` is a sequence of
+        ``(model, columns, filters, extra)`` tuples.
+
+        >>> incr_many([(Group, {'times_seen': 1}, {'pk': group.pk}, None)])
+        """
+        for model, columns, filters, extra in increments:
+            self.incr(model, columns, filters, extra)
+
+    def flush(self):
+        """
+        Write out any increments that are held in memory by this process.
+        """
+
     def process_pending(self, partition=None):
         return []
 
@@ -71,3 +91,138 @@ class Buffer(Service):
             created=created,
             sender=model,
         )
+
+    def process_batch(self, items):
+        """
+        Apply many buffered increments at once. ``items`` is a list of
+        ``(model, columns, filters, extra)`` tuples, as passed to ``process``.
+
+        On PostgreSQL, rows of the same model that have the same filter,
+        counter and extra columns are updated with a single statement. Rows
+        that could not be updated that way (most importantly rows that do not
+        exist yet) are passed on to ``process`` one at a time.
+        """
+        groups = defaultdict(list)
+        for model, columns, filters, extra in items:
+            extra = extra or {}
+            signature = (
+                model,
+                tuple(sorted(filters)),
+                tuple(sorted(columns)),
+                tuple(sorted(extra)),
+            )
+            groups[signature].append((columns, filters, extra))
+
+        for (model, filter_names, column_names, extra_names), rows in six.iteritems(groups):
+            updated = set()
+            using = router.db_for_write(model)
+            if len(rows) > 1 and db.is_postgres(using):
+                updated = _bulk_update(
+                    model, using, filter_names, column_names, extra_names, rows,
+                )
+
+            for index, (columns, filters, extra) in enumerate(rows):
+                if index not in updated:
+                    # Subclasses override ``process`` to take buffered keys
+                    # instead, so always use the row-level implementation.
+                    Buffer.process(self, model, columns, filters, extra or None)
+                    continue
+
+                buffer_incr_complete.send_robust(
+                    model=model,
+                    columns=columns,
+                    filters=filters,
+                    extra=extra or None,
+                    created=False,
+                    sender=model,
+                )
+
+
+def _get_field(model, name):
+    opts = model._meta
+    if name == 'pk':
+        return opts.pk
+    try:
+        return opts.get_field(name)
+    except FieldDoesNotExist:
+        for field in opts.fields:
+            if field.attname == name:
+                return field
+    return None
+
+
+def _get_cast_type(field, connection):
+    db_type = field.db_type(connection)
+    if isinstance(field, AutoField) or db_type in ('serial', 'bigserial'):
+        return 'bigint' if 'big' in db_type else 'integer'
+    return db_type
+
+
+def _bulk_update(model, using, filter_names, column_names, extra_names, rows):
+    """
+    Update existing rows with one ``UPDATE ... FROM (VALUES ...)`` statement,
+    returning the set of indexes (into ``rows``) of the rows that were
+    updated. An empty set is returned if the rows cannot be expressed as a
+    single statement.
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+
+    filter_fields = [_get_field(model, name) for name in filter_names]
+    column_fields = [_get_field(model, name) for name in column_names]
+    extra_fields = [_get_field(model, name) for name in extra_names]
+    if None in filter_fields or None in column_fields or None in extra_fields:
+        return set()
+
+    for _, _, extra in rows:
+        if any(isinstance(value, ExpressionNode) for value in six.itervalues(extra)):
+            return set()
+
+    casts = ['integer'] + [
+        _get_cast_type(field, connection)
+        for field in filter_fields + column_fields + extra_fields
+    ]
+    aliases = ['idx'] + \
+        ['f%d' % i for i in range(len(filter_fields))] + \
+        ['i%d' % i for i in range(len(column_fields))] + \
+        ['e%d' % i for i in range(len(extra_fields))]
+
+    row_template = '(%s)' % ', '.join('%%s::%s' % cast for cast in casts)
+    params = []
+    for index, (columns, filters, extra) in enumerate(rows):
+        params.append(index)
+        for name, field in zip(filter_names, filter_fields):
+            value = filters[name]
+            if isinstance(value, Model):
+                value = value.pk
+            params.append(field.get_db_prep_value(value, connection))
+        for name in column_names:
+            params.append(columns[name])
+        for name, field in zip(extra_names, extra_fields):
+            params.append(field.get_db_prep_save(extra[name], connection))
+
+    table = qn(model._meta.db_table)
+    assignments = [
+        '%s = %s.%s + v.%s' % (qn(field.column), table, qn(field.column), qn(alias))
+        for field, alias in zip(column_fields, aliases[1 + len(filter_fields):])
+    ] + [
+        '%s = v.%s' % (qn(field.column), qn(alias))
+        for field, alias in zip(extra_fields, aliases[1 + len(filter_fields) + len(column_fields):])
+    ]
+    conditions = [
+        '%s.%s = v.%s' % (table, qn(field.column), qn(alias))
+        for field, alias in zip(filter_fields, aliases[1:])
+    ]
+
+    sql = 'UPDATE %s SET %s FROM (VALUES %s) AS v (%s) WHERE %s RETURNING v.%s' % (
+        table,
+        ', '.join(assignments),
+        ', '.join([row_template] * len(rows)),
+        ', '.join(qn(alias) for alias in aliases),
+        ' AND '.join(conditions),
+        qn('idx'),
+    )
+
+    cursor = connection.cursor()
+    cursor.execute(sql, params)
+    return set(index for index, in cursor.fetchall())
@@ -7,9 +7,15 @@ sentry.buffer.redis
 """
 from __future__ import absolute_import
 
+import atexit
+import itertools
+import os
 import six
+import sys
+import threading
 
-from time import time
+from collections import defaultdict
+from time import sleep, time
 from binascii import crc32
 
 from django.db import models
@@ -19,11 +25,14 @@ from sentry.buffer import Buffer
 from sentry.exceptions import InvalidConfiguration
 from sentry.tasks.process_buffer import process_incr, process_pending
 from sentry.utils import metrics
-from sentry.utils.compat import pickle
 from sentry.utils.hashlib import md5_text
 from sentry.utils.imports import import_string
 from sentry.utils.redis import get_cluster_from_options
 
+# Guards the per-process setup of coalescing buffers (see
+# ``RedisBuffer._ensure_flusher``).
+_flusher_init_lock = threading.Lock()
+
 
 class PendingBuffer(object):
     def __init__(self, size):
@@ -52,17 +61,75 @@ class PendingBuffer(object):
         return rv
 
 
+class CoalescedIncr(object):
+    """
+    Increments to a single ``(model, filters)`` buffer key that have been
+    merged in memory and not yet written to Redis.
+    """
+    __slots__ = ['model', 'filters', 'columns', 'extra']
+
+    def __init__(self, model, filters):
+        self.model = model
+        self.filters = filters
+        self.columns = defaultdict(int)
+        self.extra = {}
+
+    def merge(self, columns, extra=None):
+        for column, amount in six.iteritems(columns):
+            self.columns[column] += amount
+        if extra:
+            # last write wins, same as ``hset`` in Redis
+            self.extra.update(extra)
+
+
 class RedisBuffer(Buffer):
     key_expire = 60 * 60  # 1 hour
     pending_key = 'b:p'
 
-    def __init__(self, pending_partitions=1, incr_batch_size=2, **options):
+    def __init__(self, pending_partitions=1, incr_batch_size=2, coalesce_window=None,
+                 coalesce_max_keys=1000, bulk_process=False, pending_chunk_size=10000,
+                 pending_time_limit=45, codec='sentry.utils.codecs.PickleCodec', codec_options=None,
+                 **options):
         self.cluster, options = get_cluster_from_options('SENTRY_BUFFER_OPTIONS', options)
         self.pending_partitions = pending_partitions
         self.incr_batch_size = incr_batch_size
         assert self.pending_partitions > 0
         assert self.incr_batch_size > 0
 
+        # The ``codec`` encodes filters and extra values. Values written by
+        # any codec from ``sentry.utils.codecs`` can always be read, so this
+        # can be changed once all workers are able to read the new format.
+        # Once no pickled values are left, ``codec_options`` can disable
+        # decoding them with ``{'allow_pickle': False}``.
+        self.codec = import_string(codec)(**(codec_options or {}))
+
+        # When ``bulk_process`` is set, every ``process_incr`` batch is
+        # locked and fetched from Redis with one round trip per host and
+        # written to the database with one statement per model. This makes
+        # a much larger ``incr_batch_size`` practical.
+        self.bulk_process = bulk_process
+
+        # ``process_pending`` drains pending keys in chunks of
+        # ``pending_chunk_size`` per host and stops after
+        # ``pending_time_limit`` seconds so it never outlives its lock.
+        self.pending_chunk_size = pending_chunk_size
+        self.pending_time_limit = pending_time_limit
+        assert self.pending_chunk_size > 0
+
+        # When ``coalesce_window`` (in seconds) is set, increments are merged
+        # in memory per buffer key and written to Redis by a background
+        # thread once per window, or as soon as ``coalesce_max_keys``
+        # distinct keys are waiting.
+        self.coalesce_window = coalesce_window
+        self.coalesce_max_keys = coalesce_max_keys
+        assert self.coalesce_window is None or self.coalesce_window > 0
+        assert self.coalesce_max_keys > 0
+        self._coalesce_lock = threading.Lock()
+        self._coalesce_pid = None
+        self._coalesced = {}
+        self._coalesced_calls = 0
+        self._flusher = None
+
     def validate(self):
         try:
             with self.cluster.all() as client:
@@ -118,27 +185,178 @@ class RedisBuffer(Buffer):
             - Perform an incrby on counters
             - Perform a set (last write wins) on extra
         - Add hashmap key to pending flushes
+
+        If coalescing is enabled the increment is merged with other pending
+        increments for the same key and written on the next flush.
         """
-        # TODO(dcramer): longer term we'd rather not have to serialize values
-        # here (unless it's to JSON)
-        key = self._make_key(model, filters)
-        pending_key = self._make_pending_key_from_key(key)
-        # We can't use conn.map() due to wanting to support multiple pending
-        # keys (one per Redis partition)
-        conn = self.cluster.get_local_client_for_key(key)
+        if not self.coalesce_window:
+            key = self._make_key(model, filters)
+            # We can't use conn.map() due to wanting to support multiple pending
+            # keys (one per Redis partition)
+            conn = self.cluster.get_local_client_for_key(key)
+            pipe = conn.pipeline()
+            self._write_incr(pipe, key, model, columns, filters, extra)
+            pipe.execute()
+            return
+
+        self._coalesce([(model, columns, filters, extra)])
+
+    def incr_many(self, increments):
+        """
+        Perform several increments at once, writing them to Redis with a single
+        pipeline per host.
+
+        If coalescing is enabled the increments are merged with other pending
+        increments, same as with ``incr``.
+        """
+        if not increments:
+            return
+
+        if not self.coalesce_window:
+            self._write_incrs([
+                (self._make_key(model, filters), model, columns, filters, extra)
+                for model, columns, filters, extra in increments
+            ])
+            return
 
-        pipe = conn.pipeline()
+        self._coalesce(increments)
+
+    def _coalesce(self, increments):
+        self._ensure_flusher()
+
+        with self._coalesce_lock:
+            for model, columns, filters, extra in increments:
+                key = self._make_key(model, filters)
+                pending = self._coalesced.get(key)
+                if pending is None:
+                    pending = self._coalesced[key] = CoalescedIncr(model, filters)
+                pending.merge(columns, extra)
+                self._coalesced_calls += 1
+            full = len(self._coalesced) >= self.coalesce_max_keys
+
+        if full:
+            self.flush()
+
+    def _write_incrs(self, increments, on_failure=None):
+        # Buffer keys and the pending set they are tracked in must live on
+        # the same host, so the pipeline is run against each host directly.
+        router = self.cluster.get_router()
+        hosts = defaultdict(list)
+        for increment in increments:
+            hosts[router.get_host_for_key(increment[0])].append(increment)
+
+        # A failing host doesn't prevent writing to the others. The
+        # increments of the failed hosts are passed to ``on_failure`` before
+        # the (last) error is raised.
+        failed = []
+        exc_info = None
+        for host_id, host_increments in six.iteritems(hosts):
+            pipe = self.cluster.get_local_client(host_id).pipeline()
+            for key, model, columns, filters, extra in host_increments:
+                self._write_incr(pipe, key, model, columns, filters, extra)
+            try:
+                pipe.execute()
+            except Exception:
+                failed.extend(host_increments)
+                exc_info = sys.exc_info()
+
+        if exc_info is not None:
+            if on_failure is not None:
+                on_failure(failed)
+            six.reraise(*exc_info)
+
+    def _write_incr(self, pipe, key, model, columns, filters, extra=None):
+        pending_key = self._make_pending_key_from_key(key)
         pipe.hsetnx(key, 'm', '%s.%s' % (model.__module__, model.__name__))
-        pipe.hsetnx(key, 'f', pickle.dumps(filters))
+        pipe.hsetnx(key, 'f', self.codec.encode(filters))
         for column, amount in six.iteritems(columns):
             pipe.hincrby(key, 'i+' + column, amount)
 
         if extra:
             for column, value in six.iteritems(extra):
-                pipe.hset(key, 'e+' + column, pickle.dumps(value))
+                pipe.hset(key, 'e+' + column, self.codec.encode(value))
         pipe.expire(key, self.key_expire)
         pipe.zadd(pending_key, time(), key)
-        pipe.execute()
+
+    def flush(self):
+        """
+        Write all coalesced increments to Redis, using a single pipeline per
+        host.
+        """
+        with self._coalesce_lock:
+            if not self._coalesced:
+                return
+            coalesced, self._coalesced = self._coalesced, {}
+            calls, self._coalesced_calls = self._coalesced_calls, 0
+
+        metrics.timing('buffer.coalesce.keys', len(coalesced))
+        metrics.timing('buffer.coalesce.ratio', float(calls) / len(coalesced))
+
+        self._write_incrs([
+            (key, pending.model, pending.columns, pending.filters, pending.extra)
+            for key, pending in six.iteritems(coalesced)
+        ], on_failure=self._restore_coalesced)
+
+    def _restore_coalesced(self, increments):
+        # Keep the increments that could not be written, so that they are
+        # retried by the next flush instead of being lost.
+        metrics.incr('buffer.coalesce.restored', amount=len(increments))
+
+        with self._coalesce_lock:
+            for key, model, columns, filters, extra in increments:
+                pending = CoalescedIncr(model, filters)
+                pending.merge(columns, extra)
+                newer = self._coalesced.get(key)
+                if newer is not None:
+                    pending.merge(newer.columns, newer.extra)
+                self._coalesced[key] = pending
+
+    def _ensure_flusher(self):
+        pid = os.getpid()
+        if self._coalesce_pid == pid:
+            return
+
+        # Only one thread may reset the state inherited across a fork and
+        # start the flusher, otherwise several threads that all see a stale
+        # pid would each install their own lock and discard increments the
+        # others already merged.
+        with _flusher_init_lock:
+            if self._coalesce_pid == pid:
+                return
+
+            if self._coalesce_pid is not None:
+                # We were forked from a process that already started buffering.
+                # Whatever it has pending is not ours to write, and its lock may
+                # have been held at the time of the fork.
+                self._coalesce_lock = threading.Lock()
+                self._coalesced = {}
+                self._coalesced_calls = 0
+
+            if self._flusher is None:
+                atexit.register(self._flush_on_shutdown)
+                from celery.signals import worker_process_shutdown
+                worker_process_shutdown.connect(self._flush_on_shutdown, weak=False)
+
+            self._flusher = threading.Thread(target=self._run_flusher)
+            self._flusher.setDaemon(True)
+            self._flusher.start()
+            self._coalesce_pid = pid
+
+    def _run_flusher(self):
+        while True:
+            sleep(self.coalesce_window)
+            try:
+                self.flush()
+            except Exception:
+                self.logger.exception('buffer.flush-failed')
+
+    def _flush_on_shutdown(self, **kwargs):
+        if self._coalesce_pid != os.getpid():
+            return
+        try:
+            self.flush()
+        except Exception:
+            self.logger.exception('buffer.flush-failed')
 
     def process_pending(self, partition=None):
         if partition is None and self.pending_partitions > 1:
@@ -159,25 +377,66 @@ class RedisBuffer(Buffer):
 
         pending_buffer = PendingBuffer(self.incr_batch_size)
 
+        def dispatch(key):
+            pending_buffer.append(key)
+            if pending_buffer.full():
+                process_incr.apply_async(
+                    kwargs={
+                        'batch_keys': pending_buffer.flush(),
+                    }
+                )
+
         try:
             keycount = 0
-            with self.cluster.all() as conn:
-                results = conn.zrange(pending_key, 0, -1)
-
-            with self.cluster.all() as conn:
-                for host_id, keys in six.iteritems(results.value):
-                    if not keys:
-                        continue
-                    keycount += len(keys)
-                    for key in keys:
-                        pending_buffer.append(key)
-                        if pending_buffer.full():
-                            process_incr.apply_async(
-                                kwargs={
-                                    'batch_keys': pending_buffer.flush(),
-                                }
-                            )
-                    conn.target([host_id]).zrem(pending_key, *keys)
+            deadline = time() + self.pending_time_limit
+            hosts = list(self.cluster.hosts)
+            first_round = True
+
+            # Drain the pending set of every host in chunks of (at most)
+            # ``pending_chunk_size`` keys, oldest first. Each round takes the
+            # oldest chunk from every host that still has pending keys, so a
+            # large backlog on one host can't starve the others, and neither
+            # the full pending set nor the time it takes to drain it needs to
+            # fit within one round.
+            while hosts:
+                with self.cluster.fanout(hosts=hosts) as conn:
+                    results = conn.zrange(
+                        pending_key, 0, self.pending_chunk_size - 1, withscores=True)
+
+                chunks = {
+                    host_id: items for host_id, items in six.iteritems(results.value) if items
+                }
+                if not chunks:
+                    break
+
+                if first_round:
+                    oldest = min(items[0][1] for items in six.itervalues(chunks))
+                    metrics.timing('buffer.pending-age', time() - oldest)
+                    first_round = False
+
+                for key, _ in sorted(
+                    itertools.chain.from_iterable(six.itervalues(chunks)),
+                    key=lambda item: item[1],
+                ):
+                    dispatch(key)
+
+                with self.cluster.fanout(hosts=list(chunks)) as conn:
+                    for host_id, items in six.iteritems(chunks):
+                        conn.target([host_id]).zrem(pending_key, *[key for key, _ in items])
+
+                keycount += sum(len(items) for items in six.itervalues(chunks))
+
+                # hosts that returned a partial chunk have been drained
+                hosts = [
+                    host_id for host_id, items in six.iteritems(chunks)
+                    if len(items) >= self.pending_chunk_size
+                ]
+
+                if hosts and time() >= deadline:
+                    # Leave the rest for the next run rather than outliving
+                    # the lock.
+                    metrics.incr('buffer.pending-deferred')
+                    break
 
             # queue up remainder of pending keys
             if not pending_buffer.empty():
@@ -196,9 +455,74 @@ class RedisBuffer(Buffer):
         if key is not None:
             batch_keys = [key]
 
+        if self.bulk_process and len(batch_keys) > 1:
+            self._process_batch(batch_keys)
+            return
+
         for key in batch_keys:
             self._process_single_incr(key)
 
+    def _decode_values(self, values):
+        model = import_string(values['m'])
+        filters = self.codec.decode(values['f'])
+        incr_values = {}
+        extra_values = {}
+        for k, v in six.iteritems(values):
+            if k.startswith('i+'):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith('e+'):
+                extra_values[k[2:]] = self.codec.decode(v)
+        return model, incr_values, filters, extra_values
+
+    def _process_batch(self, batch_keys):
+        # prevent a stampede due to the way we use celery etas + duplicate
+        # tasks
+        with self.cluster.map() as conn:
+            locks = [
+                (key, conn.set(self._make_lock_key(key), '1', nx=True, ex=10))
+                for key in batch_keys
+            ]
+
+        locked_keys = []
+        for key, result in locks:
+            if result.value:
+                locked_keys.append(key)
+            else:
+                metrics.incr('buffer.revoked', tags={'reason': 'locked'})
+                self.logger.debug('buffer.revoked.locked', extra={'redis_key': key})
+
+        if not locked_keys:
+            return
+
+        try:
+            router = self.cluster.get_router()
+            hosts = defaultdict(list)
+            for key in locked_keys:
+                hosts[router.get_host_for_key(key)].append(key)
+
+            items = []
+            for host_id, keys in six.iteritems(hosts):
+                pipe = self.cluster.get_local_client(host_id).pipeline()
+                for key in keys:
+                    pipe.hgetall(key)
+                    pipe.zrem(self._make_pending_key_from_key(key), key)
+                    pipe.delete(key)
+                results = pipe.execute()
+
+                for key, values in zip(keys, results[::3]):
+                    if not values:
+                        metrics.incr('buffer.revoked', tags={'reason': 'empty'})
+                        self.logger.debug('buffer.revoked.empty', extra={'redis_key': key})
+                        continue
+                    items.append(self._decode_values(values))
+
+            if items:
+                super(RedisBuffer, self).process_batch(items)
+        finally:
+            with self.cluster.map() as conn:
+                for key in locked_keys:
+                    conn.delete(self._make_lock_key(key))
+
     def _process_single_incr(self, key):
         client = self.cluster.get_routing_client()
         lock_key = self._make_lock_key(key)
@@ -224,15 +548,7 @@ class RedisBuffer(Buffer):
                 self.logger.debug('buffer.revoked.empty', extra={'redis_key': key})
                 return
 
-            model = import_string(values['m'])
-            filters = pickle.loads(values['f'])
-            incr_values = {}
-            extra_values = {}
-            for k, v in six.iteritems(values):
-                if k.startswith('i+'):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith('e+'):
-                    extra_values[k[2:]] = pickle.loads(v)
+            model, incr_values, filters, extra_values = self._decode_values(values)
 
             super(RedisBuffer, self).process(model, incr_values, filters, extra_values)
         finally:
@@ -36,3 +36,19 @@ class BaseCache(local):
 
     def get(self, key, version=None, raw=False):
         raise NotImplementedError
+
+    def get_many(self, keys, version=None, raw=False):
+        """
+        Fetch many values at once, returning a mapping of key to value for
+        every key that was present in the cache.
+        """
+        results = {}
+        for key in keys:
+            value = self.get(key, version=version, raw=raw)
+            if value is not None:
+                results[key] = value
+        return results
+
+    def set_many(self, mapping, timeout, version=None, raw=False):
+        for key, value in mapping.items():
+            self.set(key, value, timeout, version=version, raw=raw)
@@ -26,16 +26,44 @@ class CommonRedisCache(BaseCache):
         self.client = client
         BaseCache.__init__(self, **options)
 
-    def set(self, key, value, timeout, version=None, raw=False):
-        key = self.make_key(key, version=version)
+    def _encode(self, key, value, raw):
         v = json.dumps(value) if not raw else value
         if len(v) > self.max_size:
             raise ValueTooLarge('Cache key too large: %r %r' % (key, len(v)))
+        return v
+
+    def set(self, key, value, timeout, version=None, raw=False):
+        key = self.make_key(key, version=version)
+        v = self._encode(key, value, raw)
         if timeout:
             self.client.setex(key, int(timeout), v)
         else:
             self.client.set(key, v)
 
+    def _write_many(self, client, mapping, timeout, version, raw):
+        for key, value in mapping.items():
+            key = self.make_key(key, version=version)
+            v = self._encode(key, value, raw)
+            if timeout:
+                client.setex(key, int(timeout), v)
+            else:
+                client.set(key, v)
+
+    def _decode_many(self, keys, values, raw):
+        results = {}
+        for key, value in zip(keys, values):
+            if value is None:
+                continue
+            results[key] = json.loads(value) if not raw else value
+        return results
+
+    def set_many(self, mapping, timeout, version=None, raw=False):
+        if not mapping:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        self._write_many(pipe, mapping, timeout, version, raw)
+        pipe.execute()
+
     def delete(self, key, version=None):
         key = self.make_key(key, version=version)
         self.client.delete(key)
@@ -47,6 +75,13 @@ class CommonRedisCache(BaseCache):
             result = json.loads(result)
         return result
 
+    def get_many(self, keys, version=None, raw=False):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.client.mget([self.make_key(key, version=version) for key in keys])
+        return self._decode_many(keys, values, raw)
+
 
 class RbCache(CommonRedisCache):
 
@@ -56,6 +91,23 @@ class RbCache(CommonRedisCache):
         client = cluster.get_routing_client()
         CommonRedisCache.__init__(self, client, **options)
 
+    # The routing client does not support pipelines or cross-host multi-key
+    # commands, so batch operations are fanned out to each host with ``map``.
+
+    def set_many(self, mapping, timeout, version=None, raw=False):
+        if not mapping:
+            return
+        with self.client.map() as client:
+            self._write_many(client, mapping, timeout, version, raw)
+
+    def get_many(self, keys, version=None, raw=False):
+        keys = list(keys)
+        if not keys:
+            return {}
+        with self.client.map() as client:
+            promises = [client.get(self.make_key(key, version=version)) for key in keys]
+        return self._decode_many(keys, [p.value for p in promises], raw)
+
 
 # Confusing legacy name for RbCache.  We don't actually have a pure redis cache
 RedisCache = RbCache
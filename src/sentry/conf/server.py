@@ -612,7 +612,11 @@ BGTASKS = {
     'sentry.bgtasks.clean_dsymcache:clean_dsymcache': {
         'interval': 5 * 60,
         'roles': ['worker'],
-    }
+    },
+    'sentry.bgtasks.clean_sourcemapcache:clean_sourcemapcache': {
+        'interval': 5 * 60,
+        'roles': ['worker'],
+    },
 }
 
 # Sentry logs to two major places: stdout, and it's internal project.
@@ -914,6 +918,11 @@ SENTRY_ALLOW_ORIGIN = None
 # Enable scraping of javascript context for source code
 SENTRY_SCRAPE_JAVASCRIPT_CONTEXT = True
 
+# Number of source files (and source maps) of an event that are fetched
+# concurrently, and the limit of concurrent fetches for a single domain.
+SENTRY_SCRAPE_JAVASCRIPT_CONCURRENCY = 8
+SENTRY_SCRAPE_JAVASCRIPT_DOMAIN_CONCURRENCY = 4
+
 # Buffer backend
 SENTRY_BUFFER = 'sentry.buffer.Buffer'
 SENTRY_BUFFER_OPTIONS = {}
@@ -924,6 +933,21 @@ SENTRY_BUFFER_OPTIONS = {}
 SENTRY_CACHE = None
 SENTRY_CACHE_OPTIONS = {}
 
+# Process-local cache in front of the shared cache for model lookups through
+# ``get_from_cache``, used by managers created with ``local_cache=True``.
+# Entries are invalidated through a pubsub channel on the given Redis cluster.
+SENTRY_MODEL_LOCAL_CACHE = False
+SENTRY_MODEL_LOCAL_CACHE_OPTIONS = {
+    'cluster': 'default',
+    'channel': 'modelcache:invalidate',
+    'ttl': 10,
+    'size': 1000,
+}
+
+# Number of processed stack frames to keep in a per-process cache in front of
+# the shared frame cache used by stacktrace processors (0 disables it.)
+SENTRY_FRAME_CACHE_LOCAL_SIZE = 0
+
 # Attachment blob cache backend
 SENTRY_ATTACHMENTS = 'sentry.attachments.default.DefaultAttachmentCache'
 SENTRY_ATTACHMENTS_OPTIONS = {}
@@ -945,6 +969,10 @@ CACHE_VERSION = 1
 SENTRY_DIGESTS = 'sentry.digests.backends.dummy.DummyBackend'
 SENTRY_DIGESTS_OPTIONS = {}
 
+# The maximum number of scheduled digests that are delivered by a single
+# task. Setting this to 1 delivers each digest with a separate task.
+SENTRY_DIGESTS_DELIVERY_BATCH_SIZE = 100
+
 # Quota backend
 SENTRY_QUOTAS = 'sentry.quotas.Quota'
 SENTRY_QUOTA_OPTIONS = {}
@@ -1034,6 +1062,19 @@ SENTRY_MAX_MESSAGE_LENGTH = 1024 * 8
 SENTRY_MAX_STACKTRACE_FRAMES = 50
 SENTRY_MAX_EXCEPTIONS = 25
 
+# Maximum size (in bytes, after decoding and decompression) and nesting depth
+# of an event payload accepted by the store endpoints
+SENTRY_MAX_EVENT_PAYLOAD_SIZE = 20 * 1024 * 1024  # 20MB
+SENTRY_MAX_EVENT_PAYLOAD_DEPTH = 128
+
+# Maximum number of events accepted in a single request to the batch store
+# endpoint
+SENTRY_STORE_BATCH_MAX_EVENTS = 100
+
+# Maximum size (in bytes, after decompression) of a request to the batch store
+# endpoint
+SENTRY_STORE_BATCH_MAX_SIZE = 50 * 1024 * 1024  # 50MB
+
 # Gravatar service base url
 SENTRY_GRAVATAR_BASE_URL = 'https://secure.gravatar.com'
 
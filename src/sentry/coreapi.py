@@ -17,11 +17,10 @@ import re
 import six
 import zlib
 
-from collections import MutableMapping
+from collections import MutableMapping, OrderedDict
+from django.conf import settings
 from django.core.exceptions import SuspiciousOperation
 from django.utils.crypto import constant_time_compare
-from gzip import GzipFile
-from six import BytesIO
 from time import time
 
 from sentry import filters
@@ -29,6 +28,7 @@ from sentry.attachments import attachment_cache
 from sentry.cache import default_cache
 from sentry.interfaces.base import get_interface
 from sentry.event_manager import EventManager
+from sentry.ingest_config import get_ingest_config
 from sentry.models import ProjectKey
 from sentry.tasks.store import preprocess_event, \
     preprocess_event_from_reprocessing
@@ -37,7 +37,6 @@ from sentry.utils.auth import parse_auth_header
 from sentry.utils.http import origin_from_request
 from sentry.utils.data_filters import is_valid_ip, \
     is_valid_release, is_valid_error_message, FilterStatKeys
-from sentry.utils.strings import decompress
 from sentry.utils.canonical import CANONICAL_TYPES
 
 
@@ -68,6 +67,11 @@ class APIForbidden(APIError):
     http_status = 403
 
 
+class APIPayloadTooLarge(APIError):
+    http_status = 413
+    msg = 'Event payload is too large'
+
+
 class APIRateLimited(APIError):
     http_status = 429
     msg = 'Creation of this event was denied due to rate limiting'
@@ -236,9 +240,43 @@ class ClientApiHelper(object):
             raise APIError('Bad data decoding request (%s, %s)' %
                            (type(e).__name__, e))
 
-    def decompress_deflate(self, encoded_data):
+    def _get_max_size(self, max_size):
+        if max_size is None:
+            max_size = settings.SENTRY_MAX_EVENT_PAYLOAD_SIZE
+        return max_size
+
+    def _decompress(self, decompressor, encoded_data, max_size):
+        """
+        Incrementally decompresses ``encoded_data``, giving up as soon as the
+        result would be larger than ``max_size`` bytes.
+        """
+        chunks = []
+        size = 0
+        data = encoded_data
+        while True:
+            chunk = decompressor.decompress(data, max_size - size + 1)
+            size += len(chunk)
+            if size > max_size:
+                raise APIPayloadTooLarge()
+            chunks.append(chunk)
+            data = decompressor.unconsumed_tail
+            if not data:
+                break
+        chunk = decompressor.flush()
+        size += len(chunk)
+        if size > max_size:
+            raise APIPayloadTooLarge()
+        chunks.append(chunk)
+        return b''.join(chunks)
+
+    def decompress_deflate(self, encoded_data, max_size=None):
+        max_size = self._get_max_size(max_size)
         try:
-            return zlib.decompress(encoded_data).decode('utf-8')
+            return self._decompress(
+                zlib.decompressobj(), encoded_data, max_size,
+            ).decode('utf-8')
+        except APIError:
+            raise
         except Exception as e:
             # This error should be caught as it suggests that there's a
             # bug somewhere in the client's code.
@@ -246,14 +284,14 @@ class ClientApiHelper(object):
             raise APIError('Bad data decoding request (%s, %s)' %
                            (type(e).__name__, e))
 
-    def decompress_gzip(self, encoded_data):
+    def decompress_gzip(self, encoded_data, max_size=None):
+        max_size = self._get_max_size(max_size)
         try:
-            fp = BytesIO(encoded_data)
-            try:
-                f = GzipFile(fileobj=fp)
-                return f.read().decode('utf-8')
-            finally:
-                f.close()
+            return self._decompress(
+                zlib.decompressobj(16 + zlib.MAX_WBITS), encoded_data, max_size,
+            ).decode('utf-8')
+        except APIError:
+            raise
         except Exception as e:
             # This error should be caught as it suggests that there's a
             # bug somewhere in the client's code.
@@ -261,12 +299,20 @@ class ClientApiHelper(object):
             raise APIError('Bad data decoding request (%s, %s)' %
                            (type(e).__name__, e))
 
-    def decode_and_decompress_data(self, encoded_data):
+    def decode_and_decompress_data(self, encoded_data, max_size=None):
+        max_size = self._get_max_size(max_size)
         try:
+            decoded_data = base64.b64decode(encoded_data)
             try:
-                return decompress(encoded_data).decode('utf-8')
+                return self._decompress(
+                    zlib.decompressobj(), decoded_data, max_size,
+                ).decode('utf-8')
             except zlib.error:
-                return base64.b64decode(encoded_data).decode('utf-8')
+                if len(decoded_data) > max_size:
+                    raise APIPayloadTooLarge()
+                return decoded_data.decode('utf-8')
+        except APIError:
+            raise
         except Exception as e:
             # This error should be caught as it suggests that there's a
             # bug somewhere in the client's code.
@@ -274,12 +320,20 @@ class ClientApiHelper(object):
             raise APIError('Bad data decoding request (%s, %s)' %
                            (type(e).__name__, e))
 
-    def safely_load_json_string(self, json_string):
+    def safely_load_json_string(self, json_string, max_depth=None):
+        if max_depth is None:
+            max_depth = settings.SENTRY_MAX_EVENT_PAYLOAD_DEPTH
         try:
             if isinstance(json_string, six.binary_type):
                 json_string = json_string.decode('utf-8')
+            # Deeply nested payloads are rejected before anything is
+            # allocated for them.
+            if json.exceeds_depth(json_string, max_depth):
+                raise APIError('Event payload is nested too deeply')
             obj = json.loads(json_string)
             assert isinstance(obj, dict)
+        except APIError:
+            raise
         except Exception as e:
             # This error should be caught as it suggests that there's a
             # bug somewhere in the client's code.
@@ -328,9 +382,14 @@ class ClientApiHelper(object):
             if message and not is_valid_error_message(project, message):
                 return (True, FilterStatKeys.ERROR_MESSAGE)
 
-        for filter_cls in filters.all():
-            filter_obj = filter_cls(project)
-            if filter_obj.is_enabled() and filter_obj.test(data):
+        # Only the filters that are enabled for the project are tested. They
+        # share values derived from the event (such as the user agent.)
+        context = {}
+        for filter_id in get_ingest_config(project).filters:
+            if not filters.exists(filter_id):
+                continue
+            filter_obj = filters.get(filter_id)(project, context)
+            if filter_obj.test(data):
                 return (True, six.text_type(filter_obj.id))
 
         return (False, None)
@@ -354,12 +413,9 @@ class ClientApiHelper(object):
         if start_time is None:
             start_time = time()
 
-        # we might be passed some sublcasses of dict that fail dumping
-        if isinstance(data, DOWNGRADE_DATA_TYPES):
-            data = dict(data.items())
+        cache_key, data = self._prepare_for_queue(data)
 
         cache_timeout = 3600
-        cache_key = 'e:{1}:{0}'.format(data['project'], data['event_id'])
         default_cache.set(cache_key, data, cache_timeout)
 
         # Attachments will be empty or None if the "event-attachments" feature
@@ -373,6 +429,42 @@ class ClientApiHelper(object):
         task.delay(cache_key=cache_key, start_time=start_time,
                    event_id=data['event_id'])
 
+    def insert_data_batch_to_database(self, items, start_time=None):
+        """
+        Queue many events for processing at once.
+
+        All payloads are written to the cache in a single batch and the
+        processing tasks are published over one shared broker connection.
+        """
+        if start_time is None:
+            start_time = time()
+
+        payloads = OrderedDict(self._prepare_for_queue(data) for data in items)
+        if not payloads:
+            return
+
+        default_cache.set_many(payloads, 3600)
+
+        from sentry.celery import app
+        with app.producer_or_acquire() as producer:
+            for cache_key, data in six.iteritems(payloads):
+                preprocess_event.apply_async(
+                    kwargs={
+                        'cache_key': cache_key,
+                        'start_time': start_time,
+                        'event_id': data['event_id'],
+                    },
+                    producer=producer,
+                )
+
+    def _prepare_for_queue(self, data):
+        # we might be passed some sublcasses of dict that fail dumping
+        if isinstance(data, DOWNGRADE_DATA_TYPES):
+            data = dict(data.items())
+
+        cache_key = 'e:{1}:{0}'.format(data['project'], data['event_id'])
+        return cache_key, data
+
 
 class MinidumpApiHelper(ClientApiHelper):
     def origin_from_request(self, request):
@@ -490,6 +582,11 @@ class LazyData(MutableMapping):
         # TODO(dcramer): CSP is passing already decoded JSON, which sort of
         # defeats the purpose of a lot of lazy evaluation. It needs refactored
         # to avoid doing that.
+        # Compressed payloads are checked while they are decompressed.
+        if isinstance(data, six.string_types) and content_encoding not in ('gzip', 'deflate') \
+                and len(data) > settings.SENTRY_MAX_EVENT_PAYLOAD_SIZE:
+            raise APIPayloadTooLarge()
+
         if isinstance(data, six.binary_type):
             if content_encoding == 'gzip':
                 data = helper.decompress_gzip(data)
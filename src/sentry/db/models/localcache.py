@@ -0,0 +1,154 @@
+"""
+sentry.db.models.localcache
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+A process-local cache tier for ``BaseManager.get_from_cache``.
+
+Entries are kept in memory for a short time, and are evicted from every
+process when they are invalidated through a Redis pubsub channel. The local
+tier is only used while the process is subscribed to that channel, since
+invalidations could be missed otherwise.
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import logging
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from django.conf import settings
+
+__all__ = ('LocalCache', 'InvalidationChannel', 'get_invalidation_channel')
+
+logger = logging.getLogger('sentry')
+
+
+class LocalCache(object):
+    """
+    A thread safe, size bounded LRU cache whose entries expire after ``ttl``
+    seconds.
+    """
+
+    def __init__(self, ttl, size):
+        self.ttl = ttl
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is None or item[0] < time.time():
+                return None
+            # Reinsert the item to mark it as the most recently used.
+            self._data[key] = item
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.time() + self.ttl, value)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class InvalidationChannel(object):
+    """
+    Evicts keys from the registered local caches of every process that is
+    subscribed to ``channel``.
+    """
+
+    def __init__(self, cluster, channel):
+        self.cluster = cluster
+        self.channel = channel
+        self.caches = []
+        self.connected = False
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def register(self, cache):
+        self.caches.append(cache)
+
+    def _get_client(self):
+        from sentry.utils.redis import clusters
+        return clusters.get(self.cluster).get_local_client_for_key(self.channel)
+
+    def _evict(self, keys):
+        for cache in self.caches:
+            cache.delete_many(keys)
+
+    def _reset(self):
+        self.connected = False
+        for cache in self.caches:
+            cache.clear()
+
+    def is_active(self):
+        """
+        Returns whether invalidations are currently being received, starting
+        the subscriber in this process if necessary.
+        """
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Threads don't survive a fork, so anything inherited
+                    # from the parent process can't be trusted.
+                    self._reset()
+                    self._pid = os.getpid()
+                    t = threading.Thread(target=self._run)
+                    t.setDaemon(True)
+                    t.start()
+        return self.connected
+
+    def _run(self):
+        while True:
+            try:
+                pubsub = self._get_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self.connected = True
+                for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        self._evict(message['data'].split('\n'))
+            except Exception:
+                logger.warning('Lost subscription to model cache invalidations', exc_info=True)
+            finally:
+                self._reset()
+            time.sleep(1)
+
+    def invalidate(self, keys):
+        """
+        Evicts ``keys`` from the local caches of this process immediately, and
+        from those of every other process once the message is delivered.
+        """
+        keys = list(keys)
+        self._evict(keys)
+        try:
+            self._get_client().publish(self.channel, '\n'.join(keys))
+        except Exception:
+            logger.warning('Unable to publish model cache invalidation', exc_info=True)
+
+
+_channel = None
+
+
+def get_invalidation_channel():
+    global _channel
+    if _channel is None:
+        options = settings.SENTRY_MODEL_LOCAL_CACHE_OPTIONS
+        _channel = InvalidationChannel(options['cluster'], options['channel'])
+    return _channel
@@ -21,9 +21,12 @@ from django.db.models.signals import (post_save, post_delete, post_init, class_p
 from django.utils.encoding import smart_text
 
 from sentry import nodestore
+from sentry.utils import metrics
 from sentry.utils.cache import cache
+from sentry.utils.compat import pickle
 from sentry.utils.hashlib import md5_text
 
+from .localcache import LocalCache, get_invalidation_channel
 from .query import create_or_update
 
 __all__ = ('BaseManager', )
@@ -81,7 +84,9 @@ class BaseManager(Manager):
         self.cache_fields = kwargs.pop('cache_fields', [])
         self.cache_ttl = kwargs.pop('cache_ttl', 60 * 5)
         self.cache_version = kwargs.pop('cache_version', None)
+        self.local_cache = kwargs.pop('local_cache', False)
         self.__local_cache = threading.local()
+        self.__process_cache = None
         super(BaseManager, self).__init__(*args, **kwargs)
 
     def _get_cache(self):
@@ -103,11 +108,13 @@ class BaseManager(Manager):
         # we cant serialize weakrefs
         d.pop('_BaseManager__cache', None)
         d.pop('_BaseManager__local_cache', None)
+        d.pop('_BaseManager__process_cache', None)
         return d
 
     def __setstate__(self, state):
         self.__dict__.update(state)
         self.__local_cache = weakref.WeakKeyDictionary()
+        self.__process_cache = None
 
     def __class_prepared(self, sender, **kwargs):
         """
@@ -122,6 +129,11 @@ class BaseManager(Manager):
         if not self.cache_version:
             self.cache_version = self._generate_cache_version()
 
+        if self.local_cache and settings.SENTRY_MODEL_LOCAL_CACHE:
+            options = settings.SENTRY_MODEL_LOCAL_CACHE_OPTIONS
+            self.__process_cache = LocalCache(options['ttl'], options['size'])
+            get_invalidation_channel().register(self.__process_cache)
+
         post_init.connect(self.__post_init, sender=sender, weak=False)
         post_save.connect(self.__post_save, sender=sender, weak=False)
         post_delete.connect(self.__post_delete, sender=sender, weak=False)
@@ -141,21 +153,28 @@ class BaseManager(Manager):
         """
         self.__cache_state(instance)
 
-    def __post_save(self, instance, **kwargs):
+    def __post_save(self, instance, invalidate=True, **kwargs):
         """
         Pushes changes to an instance into the cache, and removes invalid (changed)
         lookup values.
+
+        Unless ``invalidate`` is false (which is the case when the cache is
+        being populated after a miss), the lookup values are also evicted from
+        the process-local caches.
         """
         pk_name = instance._meta.pk.name
         pk_names = ('pk', pk_name)
         pk_val = instance.pk
+        stale_keys = [self.__get_lookup_cache_key(**{pk_name: pk_val})]
         for key in self.cache_fields:
             if key in pk_names:
                 continue
             # store pointers
             value = self.__value_for_field(instance, key)
+            lookup_key = self.__get_lookup_cache_key(**{key: value})
+            stale_keys.append(lookup_key)
             cache.set(
-                key=self.__get_lookup_cache_key(**{key: value}),
+                key=lookup_key,
                 value=pk_val,
                 timeout=self.cache_ttl,
                 version=self.cache_version,
@@ -184,33 +203,60 @@ class BaseManager(Manager):
                 value = self.__cache[instance][key]
                 current_value = self.__value_for_field(instance, key)
                 if value != current_value:
+                    lookup_key = self.__get_lookup_cache_key(**{key: value})
+                    stale_keys.append(lookup_key)
                     cache.delete(
-                        key=self.__get_lookup_cache_key(**{key: value}),
+                        key=lookup_key,
                         version=self.cache_version,
                     )
 
         self.__cache_state(instance)
 
+        if invalidate:
+            self.__invalidate_process_cache(stale_keys)
+
     def __post_delete(self, instance, **kwargs):
         """
         Drops instance from all cache storages.
         """
         pk_name = instance._meta.pk.name
+        stale_keys = []
         for key in self.cache_fields:
             if key in ('pk', pk_name):
                 continue
             # remove pointers
             value = self.__value_for_field(instance, key)
+            lookup_key = self.__get_lookup_cache_key(**{key: value})
+            stale_keys.append(lookup_key)
             cache.delete(
-                key=self.__get_lookup_cache_key(**{key: value}),
+                key=lookup_key,
                 version=self.cache_version,
             )
         # remove actual object
+        lookup_key = self.__get_lookup_cache_key(**{pk_name: instance.pk})
+        stale_keys.append(lookup_key)
         cache.delete(
-            key=self.__get_lookup_cache_key(**{pk_name: instance.pk}),
+            key=lookup_key,
             version=self.cache_version,
         )
 
+        self.__invalidate_process_cache(stale_keys)
+
+    def __get_process_cache(self):
+        """
+        Returns the process-local cache, if it is enabled and can currently be
+        kept consistent with the shared cache.
+        """
+        if self.__process_cache is None:
+            return None
+        if not get_invalidation_channel().is_active():
+            return None
+        return self.__process_cache
+
+    def __invalidate_process_cache(self, keys):
+        if self.__process_cache is not None:
+            get_invalidation_channel().invalidate(keys)
+
     def __get_lookup_cache_key(self, **kwargs):
         return make_key(self.model, 'modelcache', kwargs)
 
@@ -256,11 +302,33 @@ class BaseManager(Manager):
         if key in self.cache_fields or key == pk_name:
             cache_key = self.__get_lookup_cache_key(**{key: value})
 
+            process_cache = self.__get_process_cache()
+            if process_cache is not None:
+                retval = process_cache.get(cache_key)
+                metrics.incr(
+                    'modelcache.local',
+                    tags={
+                        'model': self.model.__name__,
+                        'result': 'miss' if retval is None else 'hit',
+                    },
+                    skip_internal=True,
+                )
+                if retval is not None:
+                    if key != pk_name:
+                        return self.get_from_cache(**{pk_name: retval})
+                    # Instances are stored pickled so that callers never
+                    # share (and mutate) the same object.
+                    retval = pickle.loads(retval)
+                    retval._state.db = router.db_for_read(self.model, **kwargs)
+                    return retval
+
             retval = cache.get(cache_key, version=self.cache_version)
             if retval is None:
                 result = self.get(**kwargs)
                 # Ensure we're pushing it into the cache
-                self.__post_save(instance=result)
+                self.__post_save(instance=result, invalidate=False)
+                if process_cache is not None:
+                    self.__set_process_cache(process_cache, result)
                 return result
 
             # If we didn't look up by pk we need to hit the reffed
@@ -280,12 +348,36 @@ class BaseManager(Manager):
                 logger.error('Cache response returned invalid value %r', retval)
                 return self.get(**kwargs)
 
+            if process_cache is not None:
+                self.__set_process_cache(process_cache, retval)
+
             retval._state.db = router.db_for_read(self.model, **kwargs)
 
             return retval
         else:
             return self.get(**kwargs)
 
+    def __set_process_cache(self, process_cache, instance):
+        pk_name = instance._meta.pk.name
+        for key in self.cache_fields:
+            if key in ('pk', pk_name):
+                continue
+            process_cache.set(
+                self.__get_lookup_cache_key(**{key: self.__value_for_field(instance, key)}),
+                instance.pk,
+            )
+
+        db = instance._state.db
+        instance._state.db = None
+        try:
+            process_cache.set(
+                self.__get_lookup_cache_key(**{pk_name: instance.pk}),
+                pickle.dumps(instance, pickle.HIGHEST_PROTOCOL),
+            )
+        except Exception as e:
+            logger.error(e, exc_info=True)
+        instance._state.db = db
+
     def create_or_update(self, **kwargs):
         return create_or_update(self.model, **kwargs)
 
@@ -310,6 +402,7 @@ class BaseManager(Manager):
         pk_name = self.model._meta.pk.name
         cache_key = self.__get_lookup_cache_key(**{pk_name: instance_id})
         cache.delete(cache_key, version=self.cache_version)
+        self.__invalidate_process_cache([cache_key])
 
     def post_save(self, instance, **kwargs):
         """
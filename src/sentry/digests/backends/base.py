@@ -24,6 +24,30 @@ class InvalidState(Exception):
     """
 
 
+class DigestBatch(object):
+    """
+    The timelines that were opened by ``Backend.digest_many``.
+
+    Iterating the batch yields a ``(key, records)`` tuple for each timeline.
+    Only the timelines that are marked with ``close`` are closed when the
+    batch is exited -- afterwards, ``closed`` contains the keys of the
+    timelines that were successfully closed.
+    """
+
+    def __init__(self, timelines):
+        self.timelines = timelines
+        self.closed = set()
+
+    def __iter__(self):
+        return iter(self.timelines)
+
+    def __len__(self):
+        return len(self.timelines)
+
+    def close(self, key):
+        self.closed.add(key)
+
+
 class Backend(Service):
     """
     A digest backend coordinates the addition of records to timelines, as well
@@ -56,7 +80,10 @@ class Backend(Service):
     be preempted by a new record being added to the timeline, requiring it to
     be transitioned to "waiting" instead.)
     """
-    __all__ = ('add', 'delete', 'digest', 'enabled', 'maintenance', 'schedule', 'validate')
+    __all__ = (
+        'add', 'delete', 'digest', 'digest_many', 'enabled', 'maintenance', 'schedule',
+        'validate',
+    )
 
     def __init__(self, **options):
         # The ``minimum_delay`` option defines the default minimum amount of
@@ -159,6 +186,37 @@ class Backend(Service):
         """
         raise NotImplementedError
 
+    def digest_many(self, keys, minimum_delay=None):
+        """
+        Extract records from several timelines at once.
+
+        This method acts as a context manager. The target of the ``as`` clause
+        is a ``DigestBatch`` of the timelines that could be opened (timelines
+        that are not in the ready state, or are being digested elsewhere, are
+        skipped.) ``minimum_delay`` is an optional mapping of timeline keys to
+        their minimum delay.
+
+        Each timeline of the batch that is marked with ``DigestBatch.close``
+        is closed when the context manager exits, same as if it had been
+        digested with ``digest``. Timelines that are not marked, or all of them
+        if an exception is raised, are left as they are. As with ``digest``,
+        any irrevocable action should only be performed after the context
+        manager has exited, and only for the timelines in
+        ``DigestBatch.closed``.
+
+        For example::
+
+            with timelines.digest_many(['project:1', 'project:2']) as batch:
+                for key, records in batch:
+                    messages[key] = build_digest_email(records)
+                    batch.close(key)
+
+            for key in batch.closed:
+                messages[key].send_async()
+
+        """
+        raise NotImplementedError
+
     def schedule(self, deadline):
         """
         Identify timelines that are ready for processing.
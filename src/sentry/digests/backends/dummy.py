@@ -2,7 +2,7 @@ from __future__ import absolute_import
 
 from contextlib import contextmanager
 
-from sentry.digests.backends.base import Backend
+from sentry.digests.backends.base import Backend, DigestBatch
 
 
 class DummyBackend(Backend):
@@ -16,6 +16,10 @@ class DummyBackend(Backend):
     def digest(self, key, minimum_delay=None):
         yield []
 
+    @contextmanager
+    def digest_many(self, keys, minimum_delay=None):
+        yield DigestBatch([])
+
     def schedule(self, deadline):
         return
         yield  # make this a generator
@@ -4,11 +4,13 @@ import logging
 import six
 import time
 
+from collections import defaultdict
 from contextlib import contextmanager
 from redis.client import ResponseError
+from uuid import uuid4
 
 from sentry.digests import Record, ScheduleEntry
-from sentry.digests.backends.base import Backend, InvalidState
+from sentry.digests.backends.base import Backend, DigestBatch, InvalidState
 from sentry.utils.locking.backends.redis import RedisLockBackend
 from sentry.utils.locking.manager import LockManager
 from sentry.utils.redis import (check_cluster_versions, get_cluster_from_options, load_script)
@@ -71,7 +73,8 @@ class RedisBackend(Backend):
 
     def __init__(self, **options):
         self.cluster, options = get_cluster_from_options('SENTRY_DIGESTS_OPTIONS', options)
-        self.locks = LockManager(RedisLockBackend(self.cluster))
+        self.lock_backend = RedisLockBackend(self.cluster)
+        self.locks = LockManager(self.lock_backend)
 
         self.namespace = options.pop('namespace', 'd')
 
@@ -94,13 +97,14 @@ class RedisBackend(Backend):
             label='Digests',
         )
 
+    def _get_timeline_key(self, key):
+        return '{}:t:{}'.format(self.namespace, key)
+
     def _get_connection(self, key):
-        return self.cluster.get_local_client_for_key(
-            '{}:t:{}'.format(self.namespace, key),
-        )
+        return self.cluster.get_local_client_for_key(self._get_timeline_key(key))
 
     def _get_timeline_lock(self, key, duration):
-        lock_key = '{}:t:{}'.format(self.namespace, key)
+        lock_key = self._get_timeline_key(key)
         return self.locks.get(
             lock_key,
             duration=duration,
@@ -251,6 +255,109 @@ class RedisBackend(Backend):
                 [record.key for record in records],
             )
 
+    def _decode_records(self, response):
+        for key, value, timestamp in response:
+            # If the record value is `None`, this means the record data was
+            # missing (it was presumably evicted by Redis) so we don't need to
+            # return it here.
+            if value is not None:
+                yield Record(key, self.codec.decode(value), float(timestamp))
+
+    @contextmanager
+    def digest_many(self, keys, minimum_delay=None, timestamp=None):
+        if minimum_delay is None:
+            minimum_delay = {}
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        # All keys of a timeline (and its lock) are stored on the same host,
+        # so the timelines on each host are opened and closed together.
+        router = self.cluster.get_router()
+        hosts = defaultdict(list)
+        for key in keys:
+            hosts[router.get_host_for_key(self._get_timeline_key(key))].append(key)
+
+        lock_owner = uuid4().hex
+        opened = defaultdict(list)
+        timelines = []
+        for host, host_keys in six.iteritems(hosts):
+            arguments = [
+                'DIGEST_OPEN_MANY',
+                self.namespace,
+                self.ttl,
+                timestamp,
+                self.capacity if self.capacity else -1,
+                lock_owner,
+                30,
+            ]
+            for key in host_keys:
+                arguments.extend([key, self.lock_backend.prefix_key(self._get_timeline_key(key))])
+
+            try:
+                response = script(self.cluster.get_local_client(host), ['-'], arguments)
+            except Exception as error:
+                logger.error(
+                    'Failed to open digests on partition %r due to error: %r',
+                    host,
+                    error,
+                    exc_info=True
+                )
+                continue
+
+            for key, status, records in response:
+                if status != 'ok':
+                    logger.info('Skipped digest delivery for %r: %s', key, status)
+                    continue
+                opened[host].append((key, [record[0] for record in records]))
+                # Records are only decoded once they are iterated.
+                timelines.append((key, self._decode_records(records)))
+
+        batch = DigestBatch(timelines)
+        try:
+            yield batch
+        except Exception:
+            # Same as with ``digest``, nothing is closed if the block fails.
+            batch.closed.clear()
+            raise
+        finally:
+            for host, host_timelines in six.iteritems(opened):
+                arguments = [
+                    'DIGEST_CLOSE_MANY',
+                    self.namespace,
+                    self.ttl,
+                    timestamp,
+                    lock_owner,
+                ]
+                for key, record_ids in host_timelines:
+                    lock_key = self.lock_backend.prefix_key(self._get_timeline_key(key))
+                    if key in batch.closed:
+                        delay = minimum_delay.get(key)
+                        arguments.extend([
+                            key,
+                            lock_key,
+                            1,
+                            delay if delay is not None else self.minimum_delay,
+                            len(record_ids),
+                        ])
+                        arguments.extend(record_ids)
+                    else:
+                        arguments.extend([key, lock_key, 0, 0, 0])
+
+                try:
+                    script(self.cluster.get_local_client(host), ['-'], arguments)
+                except Exception as error:
+                    logger.error(
+                        'Failed to close digests on partition %r due to error: %r',
+                        host,
+                        error,
+                        exc_info=True
+                    )
+                    # These digests will be delivered again after maintenance,
+                    # so they must not be delivered now.
+                    for key, _ in host_timelines:
+                        batch.closed.discard(key)
+
     def delete(self, key, timestamp=None):
         if timestamp is None:
             timestamp = time.time()
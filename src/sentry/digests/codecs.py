@@ -2,20 +2,33 @@ from __future__ import absolute_import
 
 import zlib
 
-from sentry.utils.compat import pickle
+from sentry.digests.notifications import Notification
+from sentry.utils import codecs
 
+codecs.register_namedtuple(Notification)
 
-class Codec(object):
+
+class Codec(codecs.Codec):
+    pass
+
+
+class CompressedPickleCodec(Codec):
     def encode(self, value):
-        raise NotImplementedError
+        return zlib.compress(codecs.PickleCodec().encode(value))
 
     def decode(self, value):
-        raise NotImplementedError
+        return super(CompressedPickleCodec, self).decode(zlib.decompress(value))
 
 
-class CompressedPickleCodec(Codec):
+class CompressedMsgpackCodec(Codec):
+    """
+    Encodes records with msgpack instead of pickle. Records written by
+    ``CompressedPickleCodec`` can still be decoded (and vice versa), unless
+    the ``allow_pickle`` option is disabled.
+    """
+
     def encode(self, value):
-        return zlib.compress(pickle.dumps(value))
+        return zlib.compress(codecs.MsgpackCodec().encode(value))
 
     def decode(self, value):
-        return pickle.loads(zlib.decompress(value))
+        return super(CompressedMsgpackCodec, self).decode(zlib.decompress(value))
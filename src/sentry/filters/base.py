@@ -5,6 +5,7 @@ __all__ = ['Filter']
 from sentry.models import ProjectOption
 from sentry.signals import inbound_filter_toggled
 from rest_framework import serializers
+from ua_parser.user_agent_parser import Parse
 
 
 class FilterSerializer(serializers.Serializer):
@@ -18,8 +19,34 @@ class Filter(object):
     default = False
     serializer_cls = FilterSerializer
 
-    def __init__(self, project):
+    def __init__(self, project, context=None):
         self.project = project
+        # Values derived from the event that is being tested, which are
+        # shared by all filters that are tested against the same event.
+        self.context = context if context is not None else {}
+
+    def get_user_agent(self, data):
+        if 'user_agent' not in self.context:
+            user_agent = ''
+            try:
+                for key, value in data['sentry.interfaces.Http']['headers']:
+                    if key.lower() == 'user-agent':
+                        user_agent = value
+                        break
+            except LookupError:
+                pass
+            self.context['user_agent'] = user_agent
+        return self.context['user_agent']
+
+    def parse_user_agent(self, data):
+        """
+        Returns the parsed user agent of the event, or ``None`` if the event
+        does not have a user agent.
+        """
+        if 'parsed_user_agent' not in self.context:
+            value = self.get_user_agent(data)
+            self.context['parsed_user_agent'] = Parse(value) if value else None
+        return self.context['parsed_user_agent']
 
     def is_enabled(self):
         return ProjectOption.objects.get_value(
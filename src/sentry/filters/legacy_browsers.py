@@ -2,7 +2,6 @@ from __future__ import absolute_import
 
 from .base import Filter
 
-from ua_parser.user_agent_parser import Parse
 from rest_framework import serializers
 from sentry.models import ProjectOption
 from sentry.api.fields import MultipleChoiceField
@@ -79,14 +78,6 @@ class LegacyBrowsersFilter(Filter):
             value=option_val,
         )
 
-    def get_user_agent(self, data):
-        try:
-            for key, value in data['sentry.interfaces.Http']['headers']:
-                if key.lower() == 'user-agent':
-                    return value
-        except LookupError:
-            return ''
-
     def filter_default(self, browser):
         """
         Legacy filter - new users specify individual filters
@@ -191,15 +182,12 @@ class LegacyBrowsersFilter(Filter):
             key='filters:{}'.format(self.id),
         )
 
-        value = self.get_user_agent(data)
-        if not value:
-            return False
-
-        ua = Parse(value)
+        ua = self.parse_user_agent(data)
         if not ua:
             return False
 
-        browser = ua['user_agent']
+        # The parsed user agent is shared with other filters.
+        browser = dict(ua['user_agent'])
 
         if not browser['family']:
             return False
@@ -50,14 +50,6 @@ class WebCrawlersFilter(Filter):
     description = 'Some crawlers may execute pages in incompatible ways which then cause errors that are unlikely to be seen by a normal user.'
     default = True
 
-    def get_user_agent(self, data):
-        try:
-            for key, value in data['sentry.interfaces.Http']['headers']:
-                if key.lower() == 'user-agent':
-                    return value
-        except LookupError:
-            return ''
-
     def test(self, data):
         # TODO(dcramer): we could also look at UA parser and use the 'Spider'
         # device type
@@ -0,0 +1,207 @@
+"""
+sentry.ingest_config
+~~~~~~~~~~~~~~~~~~~~
+
+A cached snapshot of the project and organization configuration that is
+needed to accept (or reject) events for a project.
+
+The store endpoint used to look up every option it needed separately. The
+snapshot is built once and stored in the cache as a whole, along with the
+token of the project it was built for. The token is deleted whenever one of
+the underlying project or organization options changes, so a snapshot that
+was built before the change (and stored after it) is never used. The token
+and the snapshot are fetched together, a request only needs a single cache
+fetch.
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import uuid
+
+from celery.signals import task_postrun
+from django.core.signals import request_finished
+
+from sentry.db.models.localcache import LocalCache
+from sentry.utils.cache import cache
+from sentry.utils.data_filters import FilterProgram
+from sentry.utils.data_scrubber import SensitiveDataFilter
+from sentry.utils.http import get_origins, is_valid_origin
+
+__all__ = ('ProjectIngestConfig', 'get_ingest_config', 'invalidate_ingest_config')
+
+#: Version of the cached representation. Changing any of the attributes of
+#: ``ProjectIngestConfig`` requires incrementing this.
+VERSION = 3
+
+CACHE_TTL = 60 * 60
+
+_local_cache = {}
+
+#: Structures that are compiled from a configuration (such as data scrubbers)
+#: are kept for the lifetime of the process, keyed by configuration revision.
+_compiled_cache = LocalCache(ttl=CACHE_TTL, size=1000)
+
+
+def _get_cache_key(project_id):
+    return 'ingestconfig:%s:%s' % (VERSION, project_id)
+
+
+def _get_token_key(project_id):
+    return 'ingestconfig:token:%s' % (project_id, )
+
+
+class ProjectIngestConfig(object):
+    """
+    The options of a project (and its organization) that affect how events
+    are accepted, resolved to their effective values.
+    """
+
+    def __init__(self, project_id, organization_id, project_options,
+                 organization_options, origins, filters, revision=None):
+        self.revision = revision or uuid.uuid4().hex
+        self.project_id = project_id
+        self.organization_id = organization_id
+        self.project_options = project_options
+        self.organization_options = organization_options
+        self.origins = origins
+        self.filters = filters
+
+        org_options = organization_options
+
+        def get_option(key, default=None):
+            return project_options.get(key, default)
+
+        self.scrub_ip_address = (
+            org_options.get('sentry:require_scrub_ip_address', False) or
+            get_option('sentry:scrub_ip_address', False)
+        )
+        self.scrub_data = (
+            org_options.get('sentry:require_scrub_data', False) or
+            get_option('sentry:scrub_data', True)
+        )
+        self.scrub_defaults = (
+            org_options.get('sentry:require_scrub_defaults', False) or
+            get_option('sentry:scrub_defaults', True)
+        )
+        self.sensitive_fields = (
+            org_options.get('sentry:sensitive_fields', []) +
+            get_option('sentry:sensitive_fields', [])
+        )
+        self.exclude_fields = (
+            org_options.get('sentry:safe_fields', []) +
+            get_option('sentry:safe_fields', [])
+        )
+
+    @classmethod
+    def build(cls, project):
+        from sentry import filters
+        from sentry.models import OrganizationOption, ProjectOption
+
+        enabled_filters = []
+        for filter_cls in filters.all():
+            if filter_cls(project).is_enabled():
+                enabled_filters.append(filter_cls.id)
+
+        return cls(
+            project_id=project.id,
+            organization_id=project.organization_id,
+            project_options=ProjectOption.objects.get_all_values(project),
+            organization_options=OrganizationOption.objects.get_all_values(
+                project.organization_id),
+            origins=get_origins(project),
+            filters=enabled_filters,
+        )
+
+    def prime_option_caches(self):
+        """
+        Seeds the process-local option caches with the values of this
+        snapshot, so that option lookups made while handling the current
+        request don't need to fetch them again.
+        """
+        from sentry.models import OrganizationOption, ProjectOption
+
+        ProjectOption.objects.prime_cache(self.project_id, self.project_options)
+        OrganizationOption.objects.prime_cache(
+            self.organization_id, self.organization_options)
+
+    def _get_compiled(self, name, factory):
+        key = (name, self.revision)
+        value = _compiled_cache.get(key)
+        if value is None:
+            value = factory()
+            _compiled_cache.set(key, value)
+        return value
+
+    @property
+    def data_filter(self):
+        """
+        The ``SensitiveDataFilter`` for this configuration, or ``None`` if data
+        scrubbing is disabled.
+        """
+        if not self.scrub_data:
+            return None
+
+        return self._get_compiled('data_filter', lambda: SensitiveDataFilter(
+            fields=self.sensitive_fields,
+            include_defaults=self.scrub_defaults,
+            exclude_fields=self.exclude_fields,
+        ))
+
+    @property
+    def filter_program(self):
+        """
+        The compiled IP address, release and error message filters.
+        """
+        return self._get_compiled(
+            'filter_program', lambda: FilterProgram.from_options(self.project_options))
+
+    def is_valid_origin(self, origin):
+        return is_valid_origin(origin, allowed=self.origins)
+
+
+def get_ingest_config(project):
+    """
+    Returns the ``ProjectIngestConfig`` for ``project``, building it if it
+    isn't cached yet.
+    """
+    config = _local_cache.get(project.id)
+    if config is not None:
+        return config
+
+    token_key = _get_token_key(project.id)
+    cache_key = _get_cache_key(project.id)
+    cached = cache.get_many([token_key, cache_key])
+    token = cached.get(token_key)
+    if token is not None and cached.get(cache_key, (None, None))[0] == token:
+        config = cached[cache_key][1]
+        config.prime_option_caches()
+    else:
+        if token is None:
+            token = uuid.uuid4().hex
+            cache.set(token_key, token, CACHE_TTL)
+        config = ProjectIngestConfig.build(project)
+        cache.set(cache_key, (token, config), CACHE_TTL)
+
+    _local_cache[project.id] = config
+    return config
+
+
+def invalidate_ingest_config(project_ids):
+    """
+    Removes the cached configuration of the given projects, causing it to be
+    rebuilt the next time it is requested.
+    """
+    project_ids = list(project_ids)
+    for project_id in project_ids:
+        _local_cache.pop(project_id, None)
+    cache.delete_many([_get_token_key(project_id) for project_id in project_ids])
+
+
+def clear_local_cache(**kwargs):
+    _local_cache.clear()
+
+
+task_postrun.connect(clear_local_cache, weak=False)
+request_finished.connect(clear_local_cache, weak=False)
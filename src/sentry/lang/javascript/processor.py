@@ -6,9 +6,14 @@ import logging
 import re
 import base64
 import six
+import threading
+import time
 import zlib
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from django.db import connections
 from os.path import splitext
 from requests.utils import get_encoding_from_headers
 from six.moves.urllib.parse import urljoin, urlsplit
@@ -25,7 +30,7 @@ except ImportError:
 
 from sentry import http
 from sentry.interfaces.stacktrace import Stacktrace
-from sentry.models import EventError, ReleaseFile
+from sentry.models import EventError, ReleaseFile, ReleaseFileManifest
 from sentry.utils.cache import cache
 from sentry.utils.files import compress_file
 from sentry.utils.hashlib import md5_text
@@ -34,6 +39,7 @@ from sentry.utils import metrics
 from sentry.stacktraces import StacktraceProcessor
 
 from .cache import SourceCache, SourceMapCache
+from .sourcemapcache import sourcemap_artifact_cache
 
 # number of surrounding lines (on each side) to fetch
 LINES_OF_CONTEXT = 5
@@ -197,48 +203,68 @@ def discover_sourcemap(result):
     return sourcemap
 
 
+def find_release_file(filename, release, dist=None):
+    """
+    Returns the ``ReleaseFile`` that is served for ``filename`` in
+    ``release``, or ``None`` if there is none.
+    """
+    artifact = get_release_artifact(filename, release, dist)
+    if artifact is None:
+        logger.debug(
+            'Release artifact %r not found in manifest (release_id=%s)', filename, release.id
+        )
+        return None
+
+    try:
+        return ReleaseFile.objects.select_related('file').get(id=artifact[0])
+    except ReleaseFile.DoesNotExist:
+        return None
+
+
+def get_release_artifact(filename, release, dist=None):
+    """
+    Returns a ``(release file id, checksum)`` tuple identifying the contents
+    that are served for ``filename`` in ``release``, or ``None`` if there is
+    no such release artifact.
+    """
+    manifest = ReleaseFileManifest.get(release.id, dist and dist.id or None)
+    return manifest.lookup(filename, dist and dist.name or None)
+
+
+def read_release_artifact(artifact):
+    """
+    Returns the contents of the release artifact identified by the
+    ``(release file id, checksum)`` tuple ``artifact``, or ``None`` if that
+    release file no longer exists or has different contents.
+    """
+    try:
+        releasefile = ReleaseFile.objects.select_related('file').get(id=artifact[0])
+    except ReleaseFile.DoesNotExist:
+        return None
+
+    if releasefile.file.checksum != artifact[1]:
+        return None
+
+    try:
+        with metrics.timer('sourcemaps.release_file_read'):
+            with releasefile.file.getfile() as fp:
+                return fp.read()
+    except Exception as e:
+        logger.exception(six.text_type(e))
+        return None
+
+
 def fetch_release_file(filename, release, dist=None):
     cache_key = 'releasefile:v1:%s:%s' % (release.id, md5_text(filename).hexdigest(), )
 
     logger.debug('Checking cache for release artifact %r (release_id=%s)', filename, release.id)
     result = cache.get(cache_key)
 
-    dist_name = dist and dist.name or None
-
     if result is None:
-        filename_choices = ReleaseFile.normalize(filename)
-        filename_idents = [ReleaseFile.get_ident(f, dist_name) for f in filename_choices]
-
-        logger.debug(
-            'Checking database for release artifact %r (release_id=%s)', filename, release.id
-        )
-
-        possible_files = list(
-            ReleaseFile.objects.filter(
-                release=release,
-                dist=dist,
-                ident__in=filename_idents,
-            ).select_related('file')
-        )
-
-        if len(possible_files) == 0:
-            logger.debug(
-                'Release artifact %r not found in database (release_id=%s)', filename, release.id
-            )
+        releasefile = find_release_file(filename, release, dist)
+        if releasefile is None:
             cache.set(cache_key, -1, 60)
             return None
-        elif len(possible_files) == 1:
-            releasefile = possible_files[0]
-        else:
-            # Pick first one that matches in priority order.
-            # This is O(N*M) but there are only ever at most 4 things here
-            # so not really worth optimizing.
-            releasefile = next((
-                rf
-                for ident in filename_idents
-                for rf in possible_files
-                if rf.ident == ident
-            ))
 
         logger.debug(
             'Found release artifact %r (id=%s, release_id=%s)', filename, releasefile.id, release.id
@@ -403,6 +429,7 @@ def get_max_age(headers):
 
 
 def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=True):
+    artifact = None
     if is_data_uri(url):
         try:
             body = base64.b64decode(
@@ -414,12 +441,32 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
                 'reason': e.message,
             })
     else:
-        result = fetch_file(
-            url, project=project, release=release, dist=dist, allow_scraping=allow_scraping
-        )
-        body = result.body
+        if release:
+            # Sourcemaps uploaded as release artifacts are parsed only once
+            # per host (and kept in memory while they are being used.)
+            artifact = get_release_artifact(url, release, dist)
+            if artifact is not None:
+                sourcemap_view = sourcemap_artifact_cache.get(artifact)
+                if sourcemap_view is not None:
+                    metrics.incr('sourcemaps.artifact_cache', tags={'result': 'hit'},
+                                 skip_internal=True)
+                    return sourcemap_view
+                metrics.incr('sourcemaps.artifact_cache', tags={'result': 'miss'},
+                             skip_internal=True)
+
+                # Only cache a body read from exactly this release file, as
+                # ``fetch_file`` may return a stale, scraped or other dist's one.
+                body = read_release_artifact(artifact)
+                if body is None:
+                    artifact = None
+
+        if artifact is None:
+            result = fetch_file(
+                url, project=project, release=release, dist=dist, allow_scraping=allow_scraping
+            )
+            body = result.body
     try:
-        return SourceMapView.from_json_bytes(body)
+        sourcemap_view = SourceMapView.from_json_bytes(body)
     except Exception as exc:
         # This is in debug because the product shows an error already.
         logger.debug(six.text_type(exc), exc_info=True)
@@ -427,11 +474,73 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
             'url': http.expose_url(url),
         })
 
+    if artifact is not None:
+        sourcemap_artifact_cache.set(artifact, sourcemap_view, body)
+    return sourcemap_view
+
 
 def is_data_uri(url):
     return url[:BASE64_PREAMBLE_LENGTH] == BASE64_SOURCEMAP_PREAMBLE
 
 
+def fetch_concurrently(fetch, urls, concurrency=1, domain_concurrency=1):
+    """
+    Calls ``fetch`` for each of ``urls``, running up to ``concurrency`` calls
+    at a time (but no more than ``domain_concurrency`` for the same domain.)
+
+    Returns a list of ``(url, result, error)`` tuples in the order of
+    ``urls``, where ``error`` is the ``http.BadSource`` raised by ``fetch``
+    (if any.) Any other exception is raised.
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+
+    def call(url, semaphore=None):
+        start = time.time()
+        try:
+            if semaphore is None:
+                return url, fetch(url), None
+            with semaphore:
+                return url, fetch(url), None
+        except http.BadSource as exc:
+            return url, None, exc
+        finally:
+            durations.append(time.time() - start)
+            if semaphore is not None:
+                # Worker threads don't outlive this call, so make sure the
+                # database connections they opened are not left behind.
+                for connection in connections.all():
+                    connection.close()
+
+    durations = []
+    start = time.time()
+    if concurrency <= 1 or len(urls) == 1:
+        results = [call(url) for url in urls]
+    else:
+        semaphores = {}
+        for url in urls:
+            domain = urlsplit(url).netloc
+            if domain not in semaphores:
+                semaphores[domain] = threading.BoundedSemaphore(domain_concurrency)
+
+        executor = ThreadPoolExecutor(max_workers=min(concurrency, len(urls)))
+        try:
+            futures = [
+                executor.submit(call, url, semaphores[urlsplit(url).netloc])
+                for url in urls
+            ]
+            results = [future.result() for future in futures]
+        finally:
+            executor.shutdown(wait=True)
+
+    # Compare the time spent waiting for the fetches to the time they would
+    # have taken one after another.
+    metrics.timing('sourcemaps.fetch_concurrently.wall', time.time() - start)
+    metrics.timing('sourcemaps.fetch_concurrently.serial', sum(durations))
+    return results
+
+
 def generate_module(src):
     """
     Converts a url into a made-up module name by doing the following:
@@ -761,72 +870,94 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
             self.cache_source(filename)
         return self.cache.get(filename)
 
-    def cache_source(self, filename):
-        sourcemaps = self.sourcemaps
-        cache = self.cache
+    def fetch_source(self, filename):
+        # TODO: respect cache-control/max-age headers to some extent
+        logger.debug('Fetching remote source %r', filename)
+        return fetch_file(
+            filename,
+            project=self.project,
+            release=self.release,
+            dist=self.dist,
+            allow_scraping=self.allow_scraping
+        )
 
+    def fetch_sourcemap(self, sourcemap_url):
+        return fetch_sourcemap(
+            sourcemap_url,
+            project=self.project,
+            release=self.release,
+            dist=self.dist,
+            allow_scraping=self.allow_scraping,
+        )
+
+    def add_source(self, filename, result):
+        """
+        Adds a fetched source file to the cache, returning the URL of its
+        sourcemap (if any.)
+        """
+        self.cache.add(filename, result.body, result.encoding)
+        self.cache.alias(result.url, filename)
+
+        sourcemap_url = discover_sourcemap(result)
+        if not sourcemap_url:
+            return None
+
+        logger.debug('Found sourcemap %r for minified script %r', sourcemap_url[:256], result.url)
+        self.sourcemaps.link(filename, sourcemap_url)
+        return sourcemap_url
+
+    def add_sourcemap(self, sourcemap_url, sourcemap_view):
+        self.sourcemaps.add(sourcemap_url, sourcemap_view)
+
+        # cache any inlined sources
+        for src_id, source_name in sourcemap_view.iter_sources():
+            source_view = sourcemap_view.get_sourceview(src_id)
+            if source_view is not None:
+                self.cache.add(
+                    urljoin(sourcemap_url, source_name),
+                    source_view
+                )
+
+    def can_fetch(self, filename):
         self.fetch_count += 1
 
         if self.fetch_count > self.max_fetches:
-            cache.add_error(filename, {
+            self.cache.add_error(filename, {
                 'type': EventError.JS_TOO_MANY_REMOTE_SOURCES,
             })
+            return False
+        return True
+
+    def cache_source(self, filename):
+        if not self.can_fetch(filename):
             return
 
-        # TODO: respect cache-control/max-age headers to some extent
-        logger.debug('Fetching remote source %r', filename)
         try:
-            result = fetch_file(
-                filename,
-                project=self.project,
-                release=self.release,
-                dist=self.dist,
-                allow_scraping=self.allow_scraping
-            )
+            result = self.fetch_source(filename)
         except http.BadSource as exc:
-            cache.add_error(filename, exc.data)
+            self.cache.add_error(filename, exc.data)
             return
 
-        cache.add(filename, result.body, result.encoding)
-        cache.alias(result.url, filename)
-
-        sourcemap_url = discover_sourcemap(result)
-        if not sourcemap_url:
-            return
-
-        logger.debug('Found sourcemap %r for minified script %r', sourcemap_url[:256], result.url)
-        sourcemaps.link(filename, sourcemap_url)
-        if sourcemap_url in sourcemaps:
+        sourcemap_url = self.add_source(filename, result)
+        if not sourcemap_url or sourcemap_url in self.sourcemaps:
             return
 
         # pull down sourcemap
         try:
-            sourcemap_view = fetch_sourcemap(
-                sourcemap_url,
-                project=self.project,
-                release=self.release,
-                dist=self.dist,
-                allow_scraping=self.allow_scraping,
-            )
+            sourcemap_view = self.fetch_sourcemap(sourcemap_url)
         except http.BadSource as exc:
-            cache.add_error(filename, exc.data)
+            self.cache.add_error(filename, exc.data)
             return
 
-        sourcemaps.add(sourcemap_url, sourcemap_view)
-
-        # cache any inlined sources
-        for src_id, source_name in sourcemap_view.iter_sources():
-            source_view = sourcemap_view.get_sourceview(src_id)
-            if source_view is not None:
-                self.cache.add(
-                    urljoin(sourcemap_url, source_name),
-                    source_view
-                )
+        self.add_sourcemap(sourcemap_url, sourcemap_view)
 
     def populate_source_cache(self, frames):
         """
         Fetch all sources that we know are required (being referenced directly
         in frames).
+
+        The sources are fetched concurrently, followed by all of the (distinct)
+        sourcemaps they refer to.
         """
         pending_file_list = set()
         for f in frames:
@@ -845,10 +976,29 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 continue
             pending_file_list.add(f['abs_path'])
 
-        for idx, filename in enumerate(pending_file_list):
-            self.cache_source(
-                filename=filename,
-            )
+        concurrency = settings.SENTRY_SCRAPE_JAVASCRIPT_CONCURRENCY
+        domain_concurrency = settings.SENTRY_SCRAPE_JAVASCRIPT_DOMAIN_CONCURRENCY
+
+        filenames = [f for f in pending_file_list if self.can_fetch(f)]
+        pending_sourcemaps = OrderedDict()
+        for filename, result, exc in fetch_concurrently(
+                self.fetch_source, filenames, concurrency, domain_concurrency):
+            if exc is not None:
+                self.cache.add_error(filename, exc.data)
+                continue
+
+            sourcemap_url = self.add_source(filename, result)
+            if sourcemap_url and sourcemap_url not in self.sourcemaps:
+                pending_sourcemaps.setdefault(sourcemap_url, []).append(filename)
+
+        for sourcemap_url, sourcemap_view, exc in fetch_concurrently(
+                self.fetch_sourcemap, pending_sourcemaps, concurrency, domain_concurrency):
+            if exc is not None:
+                for filename in pending_sourcemaps[sourcemap_url]:
+                    self.cache.add_error(filename, exc.data)
+                continue
+
+            self.add_sourcemap(sourcemap_url, sourcemap_view)
 
     def close(self):
         StacktraceProcessor.close(self)
@@ -0,0 +1,181 @@
+"""
+sentry.lang.javascript.sourcemapcache
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Caches sourcemaps that were uploaded as release artifacts on the local host.
+
+Sourcemaps are identified by the id of their ``ReleaseFile`` and the checksum
+of its file, so cached entries never need to be invalidated. Parsed
+sourcemaps are kept in memory (bounded by the size of their bodies), and the
+bodies are stored on local disk so that other processes on the same host
+don't need to fetch (and decompress) them again.
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import errno
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from collections import OrderedDict
+from symbolic import SourceMapView
+
+from sentry import options
+
+__all__ = ['SourceMapArtifactCache']
+
+logger = logging.getLogger(__name__)
+
+ONE_HOUR = 60 * 60
+ONE_DAY_AND_A_HALF = int(60 * 60 * 24 * 1.5)
+
+
+class SourceMapArtifactCache(object):
+    def __init__(self):
+        self._views = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache_path(self):
+        return options.get('sourcemaps.cache-path')
+
+    def get_path(self, key):
+        releasefile_id, checksum = key
+        return os.path.join(self.cache_path, '%s-%s.map' % (releasefile_id, checksum))
+
+    def get(self, key):
+        """
+        Returns the parsed sourcemap for ``key`` (a tuple of release file id
+        and file checksum), or ``None`` if it isn't cached on this host.
+        """
+        with self._lock:
+            item = self._views.pop(key, None)
+            if item is not None:
+                # Reinsert the item to mark it as the most recently used.
+                self._views[key] = item
+                return item[1]
+
+        path = self.get_path(key)
+        try:
+            stat = os.stat(path)
+            with open(path, 'rb') as f:
+                body = f.read()
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+
+        self._try_bump_timestamp(path, stat)
+        try:
+            view = SourceMapView.from_json_bytes(body)
+        except Exception:
+            logger.warning('Removing unparseable cached sourcemap %r', path, exc_info=True)
+            self._remove(path)
+            return None
+
+        self._add_view(key, view, len(body))
+        return view
+
+    def set(self, key, view, body):
+        """
+        Caches the parsed sourcemap ``view`` for ``key`` along with the
+        ``body`` it was parsed from.
+        """
+        self._add_view(key, view, len(body))
+
+        path = self.get_path(key)
+        if os.path.exists(path):
+            return
+
+        try:
+            try:
+                os.makedirs(self.cache_path)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            # Write to a temporary file first, so that other processes never
+            # see partially written sourcemaps.
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_path, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(body)
+                os.rename(temp_path, path)
+            except Exception:
+                self._remove(temp_path)
+                raise
+        except (IOError, OSError):
+            logger.warning('Could not write sourcemap to cache %r', path, exc_info=True)
+
+    def _add_view(self, key, view, size):
+        max_size = options.get('sourcemaps.memory-cache-size')
+        if size > max_size:
+            return
+
+        with self._lock:
+            item = self._views.pop(key, None)
+            if item is not None:
+                self._size -= item[0]
+            self._views[key] = (size, view)
+            self._size += size
+            while self._size > max_size:
+                _, (evicted_size, _) = self._views.popitem(last=False)
+                self._size -= evicted_size
+
+    def _try_bump_timestamp(self, path, old_stat):
+        # The modification time is used to evict the least recently used
+        # sourcemaps from disk, but it is not worth updating on every read.
+        now = int(time.time())
+        if old_stat.st_mtime < now - ONE_HOUR:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+            self._size = 0
+
+    def clear_old_entries(self):
+        """
+        Removes sourcemaps that were not used for a while from disk, and the
+        least recently used ones if the cache exceeds its size.
+        """
+        try:
+            names = os.listdir(self.cache_path)
+        except OSError:
+            return
+
+        entries = []
+        for name in names:
+            path = os.path.join(self.cache_path, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        cutoff = int(time.time()) - ONE_DAY_AND_A_HALF
+        max_size = options.get('sourcemaps.cache-size')
+        total_size = sum(size for _, size, _ in entries)
+
+        for mtime, size, path in sorted(entries):
+            if mtime >= cutoff and total_size <= max_size:
+                break
+            self._remove(path)
+            total_size -= size
+
+
+sourcemap_artifact_cache = SourceMapArtifactCache()
@@ -14,10 +14,12 @@ import six
 import uuid
 import time
 import errno
+import fcntl
 import shutil
 import hashlib
 import logging
 import tempfile
+from contextlib import contextmanager
 from requests.exceptions import RequestException
 
 from jsonfield import JSONField
@@ -34,6 +36,7 @@ from sentry.cache import default_cache
 from sentry.db.models import FlexibleForeignKey, Model, \
     sane_repr, BaseManager, BoundedPositiveIntegerField
 from sentry.models.file import File, ChunkFileState
+from sentry.utils import metrics
 from sentry.utils.zip import safe_extract_zip
 from sentry.constants import KNOWN_DSYM_TYPES
 from sentry.reprocessing import resolve_processing_issue, \
@@ -42,6 +45,7 @@ from sentry.reprocessing import resolve_processing_issue, \
 
 logger = logging.getLogger(__name__)
 
+ONE_HOUR = 60 * 60
 ONE_DAY = 60 * 60 * 24
 ONE_DAY_AND_A_HALF = int(ONE_DAY * 1.5)
 
@@ -518,14 +522,16 @@ class DSymCache(object):
             dsym_path = os.path.join(self.get_project_path(project), debug_id)
 
             try:
-                os.stat(dsym_path)
+                stat = os.stat(dsym_path)
             except OSError as e:
                 if e.errno != errno.ENOENT:
                     raise
                 debug_file = find_dsym_file(project, debug_id)
                 if debug_file is None:
                     continue
-                debug_file.file.save_to(dsym_path)
+                self._save_to_cache(debug_file.file, dsym_path)
+            else:
+                self._try_bump_timestamp(dsym_path, stat)
             rv[debug_id] = dsym_path
 
         return rv
@@ -670,25 +676,70 @@ class DSymCache(object):
             except OSError as e:
                 if e.errno != errno.ENOENT:
                     raise
-                symcache_file.cache_file.save_to(cachefile_path)
+                self._save_to_cache(symcache_file.cache_file, cachefile_path)
             else:
                 self._try_bump_timestamp(cachefile_path, stat)
+            # Symcaches are memory mapped, so all processes on the host share
+            # the same pages of a cached file.
             rv[dsym_id] = SymCache.from_path(cachefile_path)
         return rv
 
+    @contextmanager
+    def _lock_path(self, path):
+        # The lock files are left in place (and eventually removed by
+        # ``clear_old_entries``), removing them here would allow two
+        # processes to hold the lock on different files.
+        lock_path = path + '.lock'
+        try:
+            os.makedirs(os.path.dirname(lock_path))
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        with open(lock_path, 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                os.utime(lock_path, None)
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _save_to_cache(self, file, path):
+        """Downloads ``file`` to ``path`` in the cache, unless another
+        process on this host is doing so already (in which case this waits
+        for that download.)
+        """
+        with self._lock_path(path):
+            if os.path.isfile(path):
+                metrics.incr('dsymcache.fill', tags={'result': 'waited'}, skip_internal=True)
+                return
+            with metrics.timer('dsymcache.download'):
+                file.save_to(path)
+            metrics.incr('dsymcache.fill', tags={'result': 'downloaded'}, skip_internal=True)
+
     def _try_bump_timestamp(self, path, old_stat):
+        # The modification time is used to find the least recently used files
+        # when the cache is cleared.
         now = int(time.time())
-        if old_stat.st_ctime < now - ONE_DAY:
-            os.utime(path, (now, now))
+        if old_stat.st_mtime < now - ONE_HOUR:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
 
     def clear_old_entries(self):
+        """Removes files that have not been used for a day and a half, and
+        then the least recently used files until the cache fits in
+        ``dsym.cache-size`` bytes (if set.)
+        """
         try:
             cache_folders = os.listdir(self.cache_path)
         except OSError:
             return
 
         cutoff = int(time.time()) - ONE_DAY_AND_A_HALF
+        max_size = options.get('dsym.cache-size')
 
+        entries = []
         for cache_folder in cache_folders:
             cache_folder = os.path.join(self.cache_path, cache_folder)
             try:
@@ -698,14 +749,31 @@ class DSymCache(object):
             for cached_file in items:
                 cached_file = os.path.join(cache_folder, cached_file)
                 try:
-                    mtime = os.path.getmtime(cached_file)
+                    stat = os.stat(cached_file)
                 except OSError:
                     continue
-                if mtime < cutoff:
+                if stat.st_mtime < cutoff:
                     try:
                         os.remove(cached_file)
                     except OSError:
                         pass
+                elif not cached_file.endswith('.lock'):
+                    entries.append((stat.st_mtime, stat.st_size, cached_file))
+
+        if not max_size:
+            return
+
+        total_size = sum(size for _, size, _ in entries)
+        for mtime, size, cached_file in sorted(entries):
+            if total_size <= max_size:
+                break
+            # Files that are in use stay accessible (and mapped) until they
+            # are closed by the processes using them.
+            try:
+                os.remove(cached_file)
+            except OSError:
+                pass
+            total_size -= size
 
 
 ProjectDSymFile.dsymcache = DSymCache()
@@ -143,7 +143,7 @@ class Organization(Model):
         default=1
     )
 
-    objects = OrganizationManager(cache_fields=('pk', 'slug', ))
+    objects = OrganizationManager(cache_fields=('pk', 'slug', ), local_cache=True)
 
     class Meta:
         app_label = 'sentry'
@@ -58,6 +58,7 @@ class OrganizationOptionManager(BaseManager):
             return
         inst.delete()
         self.reload_cache(organization.id)
+        self.invalidate_ingest_config(organization.id)
 
     def set_value(self, organization, key, value):
         self.create_or_update(
@@ -68,6 +69,7 @@ class OrganizationOptionManager(BaseManager):
             },
         )
         self.reload_cache(organization.id)
+        self.invalidate_ingest_config(organization.id)
 
     def get_all_values(self, organization):
         if isinstance(organization, models.Model):
@@ -87,6 +89,13 @@ class OrganizationOptionManager(BaseManager):
     def clear_local_cache(self, **kwargs):
         self.__cache = {}
 
+    def prime_cache(self, organization_id, values):
+        """
+        Populates the local cache with values that were loaded elsewhere,
+        unless they are already present.
+        """
+        self.__cache.setdefault(organization_id, values)
+
     def reload_cache(self, organization_id):
         cache_key = self._make_key(organization_id)
         result = dict((i.key, i.value) for i in self.filter(organization=organization_id))
@@ -94,11 +103,21 @@ class OrganizationOptionManager(BaseManager):
         self.__cache[organization_id] = result
         return result
 
+    def invalidate_ingest_config(self, organization_id):
+        from sentry.ingest_config import invalidate_ingest_config
+        from sentry.models import Project
+
+        invalidate_ingest_config(Project.objects.filter(
+            organization=organization_id,
+        ).values_list('id', flat=True))
+
     def post_save(self, instance, **kwargs):
         self.reload_cache(instance.organization_id)
+        self.invalidate_ingest_config(instance.organization_id)
 
     def post_delete(self, instance, **kwargs):
         self.reload_cache(instance.organization_id)
+        self.invalidate_ingest_config(instance.organization_id)
 
     def contribute_to_class(self, model, name):
         super(OrganizationOptionManager, self).contribute_to_class(model, name)
@@ -115,7 +115,7 @@ class Project(Model):
     objects = ProjectManager(cache_fields=[
         'pk',
         'slug',
-    ])
+    ], local_cache=True)
     platform = models.CharField(max_length=64, null=True)
 
     class Meta:
@@ -67,7 +67,7 @@ class ProjectKey(Model):
     rate_limit_count = BoundedPositiveIntegerField(null=True)
     rate_limit_window = BoundedPositiveIntegerField(null=True)
 
-    objects = BaseManager(cache_fields=('public_key', 'secret_key', ))
+    objects = BaseManager(cache_fields=('public_key', 'secret_key', ), local_cache=True)
 
     data = JSONField()
 
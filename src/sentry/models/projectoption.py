@@ -54,6 +54,7 @@ class ProjectOptionManager(BaseManager):
     def unset_value(self, project, key):
         self.filter(project=project, key=key).delete()
         self.reload_cache(project.id)
+        self.invalidate_ingest_config(project.id)
 
     def set_value(self, project, key, value):
         inst, created = self.create_or_update(
@@ -64,6 +65,7 @@ class ProjectOptionManager(BaseManager):
             },
         )
         self.reload_cache(project.id)
+        self.invalidate_ingest_config(project.id)
         return created or inst > 0
 
     def get_all_values(self, project):
@@ -84,6 +86,13 @@ class ProjectOptionManager(BaseManager):
     def clear_local_cache(self, **kwargs):
         self.__cache = {}
 
+    def prime_cache(self, project_id, values):
+        """
+        Populates the local cache with values that were loaded elsewhere,
+        unless they are already present.
+        """
+        self.__cache.setdefault(project_id, values)
+
     def reload_cache(self, project_id):
         cache_key = self._make_key(project_id)
         result = dict((i.key, i.value) for i in self.filter(project=project_id))
@@ -91,11 +100,18 @@ class ProjectOptionManager(BaseManager):
         self.__cache[project_id] = result
         return result
 
+    def invalidate_ingest_config(self, project_id):
+        from sentry.ingest_config import invalidate_ingest_config
+
+        invalidate_ingest_config([project_id])
+
     def post_save(self, instance, **kwargs):
         self.reload_cache(instance.project_id)
+        self.invalidate_ingest_config(instance.project_id)
 
     def post_delete(self, instance, **kwargs):
         self.reload_cache(instance.project_id)
+        self.invalidate_ingest_config(instance.project_id)
 
     def contribute_to_class(self, model, name):
         super(ProjectOptionManager, self).contribute_to_class(model, name)
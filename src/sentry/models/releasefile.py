@@ -8,12 +8,24 @@ sentry.models.releasefile
 
 from __future__ import absolute_import
 
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
 from six.moves.urllib.parse import urlsplit, urlunsplit
 
 from sentry.db.models import BoundedPositiveIntegerField, FlexibleForeignKey, Model, sane_repr
+from sentry.db.models.localcache import LocalCache
+from sentry.utils.cache import cache
 from sentry.utils.hashlib import sha1_text
 
+MANIFEST_TTL = 3600
+
+#: Lifetime of the manifest token that is set by changes that are not
+#: committed yet. Manifests that are built before the commit don't include
+#: the change, so they must not be used for long.
+PENDING_MANIFEST_TTL = 60
+
 
 class ReleaseFile(Model):
     r"""
@@ -82,3 +94,99 @@ class ReleaseFile(Model):
         if query:
             urls.append('~' + urlunsplit(uri_relative_without_query))
         return urls
+
+
+class ReleaseFileManifest(object):
+    """
+    The release files of a release (and distribution), by ident.
+
+    Resolving a filename to a release file only needs dictionary lookups
+    once the manifest is loaded. Manifests are cached under a token that is
+    replaced whenever a release file of the release is changed, which makes
+    it possible to keep them in memory as well.
+    """
+    _local_cache = LocalCache(ttl=MANIFEST_TTL, size=100)
+
+    def __init__(self, files):
+        # ident -> (release file id, file checksum)
+        self.files = files
+
+    def __len__(self):
+        return len(self.files)
+
+    def lookup(self, filename, dist=None):
+        """
+        Returns a ``(release file id, file checksum)`` tuple for the release
+        file that is served for ``filename``, or ``None``.
+        """
+        for name in ReleaseFile.normalize(filename):
+            match = self.files.get(ReleaseFile.get_ident(name, dist))
+            if match is not None:
+                return match
+        return None
+
+    @staticmethod
+    def _get_token_key(release_id, dist_id):
+        return 'releasefile:manifest-token:%s:%s' % (release_id, dist_id or '')
+
+    @staticmethod
+    def _get_cache_key(release_id, dist_id, token):
+        return 'releasefile:manifest:v1:%s:%s:%s' % (release_id, dist_id or '', token)
+
+    @classmethod
+    def build(cls, release_id, dist_id=None):
+        return cls(dict(
+            (ident, (releasefile_id, checksum))
+            for ident, releasefile_id, checksum in ReleaseFile.objects.filter(
+                release=release_id,
+                dist=dist_id,
+            ).values_list('ident', 'id', 'file__checksum')
+        ))
+
+    @classmethod
+    def get(cls, release_id, dist_id=None):
+        token_key = cls._get_token_key(release_id, dist_id)
+        token = cache.get(token_key)
+        if token is None:
+            token = uuid.uuid4().hex
+            cache.set(token_key, token, MANIFEST_TTL)
+
+        local_key = (release_id, dist_id, token)
+        manifest = cls._local_cache.get(local_key)
+        if manifest is not None:
+            return manifest
+
+        cache_key = cls._get_cache_key(release_id, dist_id, token)
+        files = cache.get(cache_key)
+        if files is None:
+            manifest = cls.build(release_id, dist_id)
+            cache.set(cache_key, manifest.files, MANIFEST_TTL)
+        else:
+            manifest = cls(files)
+
+        cls._local_cache.set(local_key, manifest)
+        return manifest
+
+    @classmethod
+    def invalidate(cls, release_id, dist_id=None, ttl=None):
+        """
+        Replaces the token of the manifest, so that it is built again. If
+        ``ttl`` is given, manifests built under the new token are only used
+        for that long.
+        """
+        token_key = cls._get_token_key(release_id, dist_id)
+        if ttl is None:
+            cache.delete(token_key)
+        else:
+            cache.set(token_key, uuid.uuid4().hex, ttl)
+
+
+def _invalidate_manifest(instance, using, **kwargs):
+    # Within a transaction the change is not visible to others yet, callers
+    # should invalidate the manifest again once it is committed.
+    ttl = PENDING_MANIFEST_TTL if transaction.get_connection(using).in_atomic_block else None
+    ReleaseFileManifest.invalidate(instance.release_id, instance.dist_id, ttl=ttl)
+
+
+post_save.connect(_invalidate_manifest, sender=ReleaseFile, weak=False)
+post_delete.connect(_invalidate_manifest, sender=ReleaseFile, weak=False)
@@ -58,6 +58,14 @@ register('redis.options', type=Dict, flags=FLAG_NOSTORE)
 
 # symbolizer specifics
 register('dsym.cache-path', type=String, default='/tmp/sentry-dsym-cache')
+# Size in bytes that the dsym cache is trimmed to (0 keeps files for as long
+# as they are used)
+register('dsym.cache-size', default=0)
+
+# sourcemaps uploaded as release artifacts, cached per host
+register('sourcemaps.cache-path', type=String, default='/tmp/sentry-sourcemap-cache')
+register('sourcemaps.cache-size', default=2 * 1024 * 1024 * 1024)
+register('sourcemaps.memory-cache-size', default=128 * 1024 * 1024)
 
 # Mail
 register('mail.backend', default='smtp', flags=FLAG_NOSTORE)
@@ -116,6 +124,15 @@ register('cloudflare.secret-key', default='')
 
 # Tagstore
 register('tagstore.multi-sampling', default=0.0)
+# The tag search index is written when ``write`` is enabled. It should only be
+# used for searches (``read``) once it has been written to for as long as the
+# event retention period (or has been backfilled.)
+register('tagstore.search-index.cluster', default='default')
+register('tagstore.search-index.write', default=False)
+register('tagstore.search-index.read', default=False)
+# Same for the index of the events of a group by tag, used to filter events.
+register('tagstore.event-index.write', default=False)
+register('tagstore.event-index.read', default=False)
 
 # Slack Integration
 register('slack.client-id', flags=FLAG_PRIORITIZE_DISK)
@@ -46,7 +46,7 @@ class Quota(Service):
     """
     __all__ = (
         'get_maximum_quota', 'get_organization_quota', 'get_project_quota', 'is_rate_limited',
-        'translate_quota', 'validate', 'refund', 'get_event_retention',
+        'is_rate_limited_batch', 'translate_quota', 'validate', 'refund', 'get_event_retention',
     )
 
     def __init__(self, **options):
@@ -55,6 +55,17 @@ class Quota(Service):
     def is_rate_limited(self, project, key=None):
         return NotRateLimited()
 
+    def is_rate_limited_batch(self, project, key=None, quantity=1):
+        """
+        Check ``quantity`` items against the quotas at once, returning a list
+        of ``RateLimit`` results (one per item, in order.)
+
+        The result is the same as calling ``is_rate_limited`` once per item,
+        which is what this default implementation does. Backends should
+        override this to perform the check in a single operation.
+        """
+        return [self.is_rate_limited(project, key=key) for _ in range(quantity)]
+
     def refund(self, project, key=None, timestamp=None):
         raise NotImplementedError
 
@@ -17,6 +17,7 @@ from sentry.quotas.base import NotRateLimited, Quota, RateLimited
 from sentry.utils.redis import get_cluster_from_options, load_script
 
 is_rate_limited = load_script('quotas/is_rate_limited.lua')
+is_rate_limited_batch = load_script('quotas/is_rate_limited_batch.lua')
 
 
 class BasicRedisQuota(object):
@@ -165,16 +166,7 @@ class RedisQuota(Quota):
         """Return the timestamp when the next rate limit period begins for an interval."""
         return (((timestamp - shift) // interval) + 1) * interval + shift
 
-    def is_rate_limited(self, project, key=None, timestamp=None):
-        if timestamp is None:
-            timestamp = time()
-
-        quotas = self.get_quotas_with_limits(project, key=key)
-
-        # If there are no quotas to actually check, skip the trip to the database.
-        if not quotas:
-            return NotRateLimited()
-
+    def __get_script_arguments(self, project, quotas, timestamp):
         keys = []
         args = []
         for quota in quotas:
@@ -184,7 +176,19 @@ class RedisQuota(Quota):
             keys.extend((key, return_key))
             expiry = self.get_next_period_start(quota.window, shift, timestamp) + self.grace
             args.extend((quota.limit, int(expiry)))
+        return keys, args
 
+    def is_rate_limited(self, project, key=None, timestamp=None):
+        if timestamp is None:
+            timestamp = time()
+
+        quotas = self.get_quotas_with_limits(project, key=key)
+
+        # If there are no quotas to actually check, skip the trip to the database.
+        if not quotas:
+            return NotRateLimited()
+
+        keys, args = self.__get_script_arguments(project, quotas, timestamp)
         client = self.cluster.get_local_client_for_key(six.text_type(project.organization_id))
         rejections = is_rate_limited(client, keys, args)
         if any(rejections):
@@ -205,3 +209,46 @@ class RedisQuota(Quota):
                     reason_code=worst_case[1],
                 )
         return NotRateLimited()
+
+    def is_rate_limited_batch(self, project, key=None, quantity=1, timestamp=None):
+        if timestamp is None:
+            timestamp = time()
+
+        quotas = self.get_quotas_with_limits(project, key=key)
+
+        # If there are no quotas to actually check, skip the trip to the database.
+        if not quotas:
+            return [NotRateLimited() for _ in range(quantity)]
+
+        keys, args = self.__get_script_arguments(project, quotas, timestamp)
+        args.append(quantity)
+
+        client = self.cluster.get_local_client_for_key(six.text_type(project.organization_id))
+        result = is_rate_limited_batch(client, keys, args)
+        accepted, available = int(result[0]), [int(value) for value in result[1:]]
+
+        # Items past the accepted count are only rejected if an enforced
+        # quota ran out of capacity. If the batch was stopped by a quota that
+        # is only tracked, the remaining items pass without being counted,
+        # just like they would when checked one at a time.
+        worst_case = (0, None)
+        enforce = False
+        for quota, capacity in zip(quotas, available):
+            if capacity > accepted or not quota.enforce:
+                continue
+            enforce = True
+            shift = project.organization_id % quota.window
+            delay = self.get_next_period_start(quota.window, shift, timestamp) - timestamp
+            if delay > worst_case[0]:
+                worst_case = (delay, quota.reason_code)
+
+        results = [NotRateLimited() for _ in range(accepted)]
+        for _ in range(quantity - accepted):
+            if enforce:
+                results.append(RateLimited(
+                    retry_after=worst_case[0],
+                    reason_code=worst_case[1],
+                ))
+            else:
+                results.append(NotRateLimited())
+        return results
@@ -84,6 +84,20 @@ local function variadic_argument_parser(argument_parser)
     end
 end
 
+local function list_argument_parser(argument_parser)
+    -- Parses a length-prefixed list of arguments (unlike the variadic parser,
+    -- this can be followed by further arguments.)
+    return function (cursor, arguments)
+        local length = tonumber(arguments[cursor])
+        cursor = cursor + 1
+        local results = {}
+        for i = 1, length do
+            cursor, results[i] = argument_parser(cursor, arguments)
+        end
+        return cursor, results
+    end
+end
+
 local function multiple_argument_parser(...)
     local parsers = {...}
     return function (cursor, arguments)
@@ -347,6 +361,41 @@ local function delete_timeline(configuration, timeline_id)
 end
 
 
+local function digest_timelines(configuration, timeline_capacity, lock_owner, lock_duration, timelines)
+    -- Opens the digests of several timelines at once. Each timeline is locked
+    -- (with the same lock that is used when digesting a single timeline), and
+    -- timelines that are not in the ready state or are already locked are
+    -- skipped, as indicated by their status in the response.
+    local results = {}
+    for i, timeline in ipairs(timelines) do
+        local status = 'ok'
+        local records = {}
+        if redis.call('ZSCORE', configuration:get_schedule_ready_key(), timeline.timeline_id) == false then
+            status = 'invalid_state'
+        elseif not redis.call('SET', timeline.lock_key, lock_owner, 'EX', lock_duration, 'NX') then
+            status = 'locked'
+        else
+            records = digest_timeline(configuration, timeline.timeline_id, timeline_capacity)
+        end
+        results[i] = {timeline.timeline_id, status, records}
+    end
+    return results
+end
+
+local function close_digests(configuration, lock_owner, timelines)
+    -- Closes the digests of the timelines that were processed, and releases
+    -- the locks of all timelines that were opened.
+    for _, timeline in ipairs(timelines) do
+        if timeline.close == 1 then
+            close_digest(configuration, timeline.timeline_id, timeline.delay_minimum, timeline.record_ids)
+        end
+        if redis.call('GET', timeline.lock_key) == lock_owner then
+            redis.call('DEL', timeline.lock_key)
+        end
+    end
+end
+
+
 -- Command Execution
 
 local configuration_argument_parser = object_argument_parser({
@@ -448,6 +497,33 @@ local commands = {
         )(cursor, arguments)
         return close_digest(configuration, timeline_id, delay_minimum, record_ids)
     end,
+    DIGEST_OPEN_MANY = function (cursor, arguments)
+        local cursor, configuration, timeline_capacity, lock_owner, lock_duration, timelines = multiple_argument_parser(
+            configuration_argument_parser,
+            argument_parser(tonumber),
+            argument_parser(),
+            argument_parser(tonumber),
+            variadic_argument_parser(object_argument_parser({
+                {"timeline_id", argument_parser()},
+                {"lock_key", argument_parser()},
+            }))
+        )(cursor, arguments)
+        return digest_timelines(configuration, timeline_capacity, lock_owner, lock_duration, timelines)
+    end,
+    DIGEST_CLOSE_MANY = function (cursor, arguments)
+        local cursor, configuration, lock_owner, timelines = multiple_argument_parser(
+            configuration_argument_parser,
+            argument_parser(),
+            variadic_argument_parser(object_argument_parser({
+                {"timeline_id", argument_parser()},
+                {"lock_key", argument_parser()},
+                {"close", argument_parser(tonumber)},
+                {"delay_minimum", argument_parser(tonumber)},
+                {"record_ids", list_argument_parser(argument_parser())},
+            }))
+        )(cursor, arguments)
+        return close_digests(configuration, lock_owner, timelines)
+    end,
 }
 
 local cursor, command = argument_parser(
@@ -0,0 +1,47 @@
+-- Check a collection of quota counters to identify how many of a batch of
+-- items can be accepted. The ``KEYS`` and leading ``ARGV`` values are laid out
+-- the same way as for ``is_rate_limited.lua`` (counter key, refund key, limit
+-- and expiry for each quota), with one additional trailing ``ARGV`` value that
+-- specifies the number of items in the batch.
+--
+-- For example, to check a batch of 5 items against a quota ``foo`` that has a
+-- limit of 10 items and expires at the Unix timestamp ``100``, the ``KEYS``
+-- and ``ARGV`` values would be as follows:
+--
+--   KEYS = {"foo", "subtract_from_foo"}
+--   ARGV = {10, 100, 5}
+--
+-- Items are accepted in order for as long as every quota has remaining
+-- capacity. The counters for all quotas are incremented by the number of
+-- accepted items, which is the same outcome as checking each item with
+-- ``is_rate_limited.lua`` sequentially. The result is a Lua table/array
+-- (Redis multi bulk reply) where the first element is the number of accepted
+-- items, followed by the remaining capacity of each quota *before* the batch
+-- was applied.
+assert(#KEYS == #ARGV - 1, "incorrect number of keys and arguments provided")
+assert(#KEYS % 2 == 0, "there must be an even number of keys")
+
+local quantity = tonumber(ARGV[#ARGV])
+local accepted = quantity
+local results = {}
+for i=1, #KEYS, 2 do
+    local limit = tonumber(ARGV[i])
+    local available = limit - ((redis.call('GET', KEYS[i]) or 0) - (redis.call('GET', KEYS[i + 1]) or 0))
+    if available < 0 then
+        available = 0
+    end
+    if available < accepted then
+        accepted = available
+    end
+    results[(i + 1) / 2 + 1] = available
+end
+
+if accepted > 0 then
+    for i=1, #KEYS, 2 do
+        redis.call('INCRBY', KEYS[i], accepted)
+        redis.call('EXPIREAT', KEYS[i], ARGV[i + 1])
+    end
+end
+
+results[1] = accepted
+return results
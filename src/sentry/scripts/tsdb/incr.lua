@@ -0,0 +1,30 @@
+-- Increment a batch of counters that are stored in hashes, setting the
+-- expiration time of each hash only if it does not have one yet (which is
+-- usually because it was just created.)
+--
+-- ``KEYS`` contains the hash keys. For each hash key, ``ARGV`` contains the
+-- expiration timestamp, the number of fields to increment, followed by a
+-- field and amount pair for each of those fields.
+--
+-- For example, to increment field ``1`` by 1 and field ``2`` by 3 in hash
+-- ``foo`` (which expires at the Unix timestamp ``100``), and field ``1`` by
+-- 1 in hash ``bar`` (which expires at the Unix timestamp ``200``), the
+-- ``KEYS`` and ``ARGV`` values would be as follows:
+--
+--   KEYS = {"foo", "bar"}
+--   ARGV = {100, 2, 1, 1, 2, 3, 200, 1, 1, 1}
+local cursor = 1
+for _, key in ipairs(KEYS) do
+    local expiry = ARGV[cursor]
+    local count = tonumber(ARGV[cursor + 1])
+    cursor = cursor + 2
+
+    for _ = 1, count do
+        redis.call('HINCRBY', key, ARGV[cursor], ARGV[cursor + 1])
+        cursor = cursor + 2
+    end
+
+    if redis.call('TTL', key) < 0 then
+        redis.call('EXPIREAT', key, expiry)
+    end
+end
@@ -9,15 +9,15 @@ class MinHashSignatureBuilder(object):
         self.rows = rows
 
     def __call__(self, features):
-        return map(
-            lambda column: min(
-                map(
-                    lambda feature: mmh3.hash(
-                        feature,
-                        column,
-                    ) % self.rows,
-                    features,
-                ),
-            ),
-            range(self.columns),
-        )
+        # Duplicate features can't change the minimum of a column, so each
+        # distinct feature is only hashed once per column. The hashing and
+        # reduction run entirely in builtins (``map`` over ``mmh3.hash`` and
+        # ``int.__rmod__``), avoiding a Python level call for every hash.
+        features = list(set(features))
+        count = len(features)
+        hash = mmh3.hash
+        modulo = self.rows.__rmod__
+        return [
+            min(map(modulo, map(hash, features, [column] * count)))
+            for column in range(self.columns)
+        ]
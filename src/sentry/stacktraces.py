@@ -5,8 +5,11 @@ import hashlib
 from datetime import datetime
 
 from collections import namedtuple
+from django.conf import settings
 
+from sentry.db.models.localcache import LocalCache
 from sentry.models import Project, Release
+from sentry.utils import metrics
 from sentry.utils.safe import safe_execute
 from sentry.utils.cache import cache
 
@@ -15,6 +18,10 @@ from six import integer_types, text_type
 
 logger = logging.getLogger(__name__)
 
+FRAME_CACHE_TIMEOUT = 3600
+
+_local_frame_cache = None
+
 StacktraceInfo = namedtuple('StacktraceInfo', ['stacktrace', 'container', 'platforms'])
 StacktraceInfo.__hash__ = lambda x: id(x)
 StacktraceInfo.__eq__ = lambda a, b: a is b
@@ -30,6 +37,7 @@ class ProcessableFrame(object):
         self.data = None
         self.cache_key = None
         self.cache_value = None
+        self.frame_cache = None
         self.processable_frames = processable_frames
 
     def __repr__(self):
@@ -50,6 +58,7 @@ class ProcessableFrame(object):
         self.processable_frames = None
         self.stacktrace_info = None
         self.processor = None
+        self.frame_cache = None
 
     @property
     def previous_frame(self):
@@ -60,7 +69,10 @@ class ProcessableFrame(object):
 
     def set_cache_value(self, value):
         if self.cache_key is not None:
-            cache.set(self.cache_key, value, 3600)
+            if self.frame_cache is not None:
+                self.frame_cache.set(self.cache_key, value)
+            else:
+                cache.set(self.cache_key, value, FRAME_CACHE_TIMEOUT)
             return True
         return False
 
@@ -104,15 +116,84 @@ class ProcessableFrame(object):
         return rv
 
 
+def get_local_frame_cache():
+    """
+    Returns the per process cache in front of the frame cache, or ``None``
+    if it is disabled.
+    """
+    global _local_frame_cache
+    size = settings.SENTRY_FRAME_CACHE_LOCAL_SIZE
+    if not size:
+        return None
+    if _local_frame_cache is None:
+        _local_frame_cache = LocalCache(ttl=FRAME_CACHE_TIMEOUT, size=size)
+    return _local_frame_cache
+
+
+class FrameCache(object):
+    """
+    Batches the frame cache lookups and writes of a processing task.
+
+    Cache keys are derived from everything that goes into processing a
+    frame, so values never change for a key and can also be kept in the
+    (optional) per process cache.
+    """
+
+    def __init__(self):
+        self.local_cache = get_local_frame_cache()
+        self.pending = {}
+
+    def get_many(self, keys):
+        rv = {}
+        missing = []
+        for key in keys:
+            value = None
+            if self.local_cache is not None:
+                value = self.local_cache.get(key)
+            if value is not None:
+                rv[key] = value
+            else:
+                missing.append(key)
+
+        if missing:
+            values = cache.get_many(missing)
+            if self.local_cache is not None:
+                for key, value in six.iteritems(values):
+                    self.local_cache.set(key, value)
+            rv.update(values)
+        return rv
+
+    def set(self, key, value):
+        self.pending[key] = value
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        cache.set_many(pending, FRAME_CACHE_TIMEOUT)
+        if self.local_cache is not None:
+            for key, value in six.iteritems(pending):
+                self.local_cache.set(key, value)
+
+
 class StacktraceProcessingTask(object):
-    def __init__(self, processable_stacktraces, processors):
+    def __init__(self, processable_stacktraces, processors, frame_cache=None):
         self.processable_stacktraces = processable_stacktraces
         self.processors = processors
+        self.frame_cache = frame_cache
 
     def close(self):
         for frame in self.iter_processable_frames():
             frame.close()
 
+    def flush_frame_cache(self):
+        if self.frame_cache is None:
+            return
+        try:
+            self.frame_cache.flush()
+        except Exception:
+            logger.exception('Failed to write frame cache')
+
     def iter_processors(self):
         return iter(self.processors)
 
@@ -345,11 +426,25 @@ def process_single_stacktrace(processing_task, stacktrace_info, processable_fram
     )
 
 
-def lookup_frame_cache(keys):
-    rv = {}
-    for key in keys:
-        rv[key] = cache.get(key)
-    return rv
+def lookup_frame_cache(keys, frame_cache=None):
+    if frame_cache is None:
+        frame_cache = FrameCache()
+    return frame_cache.get_many(keys)
+
+
+def record_frame_cache_metrics(processable_frames):
+    by_processor = {}
+    for processable_frame in processable_frames:
+        counts = by_processor.setdefault(processable_frame.processor.__class__.__name__, [0, 0])
+        counts[processable_frame.cache_value is None] += 1
+
+    for processor, (hits, misses) in six.iteritems(by_processor):
+        for result, amount in (('hit', hits), ('miss', misses)):
+            if amount:
+                metrics.incr('process_stacktraces.frame_cache', amount=amount, tags={
+                    'processor': processor,
+                    'result': result,
+                }, skip_internal=True)
 
 
 def get_stacktrace_processing_task(infos, processors):
@@ -359,10 +454,12 @@ def get_stacktrace_processing_task(infos, processors):
     by_processor = {}
     by_stacktrace_info = {}
     to_lookup = {}
+    frame_cache = FrameCache()
 
     for info in infos:
         processable_frames = get_processable_frames(info, processors)
         for processable_frame in processable_frames:
+            processable_frame.frame_cache = frame_cache
             processable_frame.processor.preprocess_frame(processable_frame)
             by_processor.setdefault(processable_frame.processor, []) \
                 .append(processable_frame)
@@ -371,12 +468,16 @@ def get_stacktrace_processing_task(infos, processors):
             if processable_frame.cache_key is not None:
                 to_lookup[processable_frame.cache_key] = processable_frame
 
-    frame_cache = lookup_frame_cache(to_lookup)
-    for cache_key, processable_frame in six.iteritems(to_lookup):
-        processable_frame.cache_value = frame_cache.get(cache_key)
+    if to_lookup:
+        cache_values = lookup_frame_cache(to_lookup, frame_cache=frame_cache)
+        for cache_key, processable_frame in six.iteritems(to_lookup):
+            processable_frame.cache_value = cache_values.get(cache_key)
+        record_frame_cache_metrics(six.itervalues(to_lookup))
 
     return StacktraceProcessingTask(
-        processable_stacktraces=by_stacktrace_info, processors=by_processor
+        processable_stacktraces=by_stacktrace_info,
+        processors=by_processor,
+        frame_cache=frame_cache,
     )
 
 
@@ -432,6 +533,7 @@ def process_stacktraces(data, make_processors=None):
                 changed = True
 
     finally:
+        processing_task.flush_frame_cache()
         for processor in processors:
             processor.close()
         processing_task.close()
@@ -81,6 +81,7 @@ class TagStorage(Service):
 
         'incr_tag_value_times_seen',
         'incr_group_tag_value_times_seen',
+        'incr_tag_values_times_seen_bulk',
         'update_group_tag_key_values_seen',
         'update_group_for_events',
     ])
@@ -291,8 +292,34 @@ class TagStorage(Service):
         """
         raise NotImplementedError
 
-    def get_group_event_filter(self, project_id, group_id, environment_id, tags):
+    def incr_tag_values_times_seen_bulk(self, project_id, group_id, environment_id,
+                                        tags, last_seen=None, count=1):
         """
+        Increment the times seen of the tag values and group tag values for
+        each of ``tags``, a sequence of ``(key, value, data)`` tuples.
+
+        >>> incr_tag_values_times_seen_bulk(1, 2, 3, [("key1", "value1", None)])
+        """
+        for key, value, data in tags:
+            self.incr_tag_value_times_seen(project_id, environment_id, key, value, extra={
+                'last_seen': last_seen,
+                'data': data,
+            }, count=count)
+
+            self.incr_group_tag_value_times_seen(
+                project_id, group_id, environment_id, key, value, extra={
+                    'project_id': project_id,
+                    'last_seen': last_seen,
+                }, count=count)
+
+    def get_group_event_filter(self, project_id, group_id, environment_id, tags,
+                               end=None, limit=None):
+        """
+        ``end`` and ``limit`` describe the page of events (ordered by time,
+        most recent first) that the filter is used for. They are hints: the
+        filter may match more events, but must match at least the ``limit``
+        most recent matching events up to ``end``.
+
         >>> get_group_event_filter(1, 2, 3, {'key1': 'value1', 'key2': 'value2'})
         """
         raise NotImplementedError
@@ -14,7 +14,7 @@ import six
 from collections import defaultdict
 from datetime import timedelta
 from django.db import connections, router, IntegrityError, transaction
-from django.db.models import Q, Sum
+from django.db.models import Count, Q, Sum
 from django.utils import timezone
 from operator import or_
 from six.moves import reduce
@@ -439,7 +439,8 @@ class LegacyTagStorage(TagStorage):
                     },
                     extra=extra)
 
-    def get_group_event_filter(self, project_id, group_id, environment_id, tags):
+    def get_group_event_filter(self, project_id, group_id, environment_id, tags,
+                               end=None, limit=None):
         tagkeys = dict(
             models.TagKey.objects.filter(
                 project_id=project_id,
@@ -670,19 +671,25 @@ class LegacyTagStorage(TagStorage):
         return set(matches)
 
     def update_group_tag_key_values_seen(self, project_id, group_ids):
-        gtk_qs = models.GroupTagKey.objects.filter(
+        counts = {
+            (row['group_id'], row['key']): row['values_seen']
+            for row in models.GroupTagValue.objects.filter(
+                project_id=project_id,
+                group_id__in=group_ids,
+            ).values('group_id', 'key').annotate(values_seen=Count('id'))
+        }
+
+        updates = defaultdict(list)
+        for id, group_id, key, values_seen in models.GroupTagKey.objects.filter(
             project_id=project_id,
-            group_id__in=group_ids
-        )
+            group_id__in=group_ids,
+        ).values_list('id', 'group_id', 'key', 'values_seen'):
+            count = counts.get((group_id, key), 0)
+            if count != values_seen:
+                updates[count].append(id)
 
-        for instance in gtk_qs:
-            instance.update(
-                values_seen=models.GroupTagValue.objects.filter(
-                    project_id=instance.project_id,
-                    group_id=instance.group_id,
-                    key=instance.key,
-                ).count(),
-            )
+        for values_seen, ids in six.iteritems(updates):
+            models.GroupTagKey.objects.filter(id__in=ids).update(values_seen=values_seen)
 
     def get_tag_value_paginator(self, project_id, environment_id, key, query=None,
             order_by='-last_seen'):
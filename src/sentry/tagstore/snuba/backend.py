@@ -495,7 +495,8 @@ class SnubaTagStorage(TagStorage):
         # search backend.
         raise NotImplementedError
 
-    def get_group_event_filter(self, project_id, group_id, environment_id, tags):
+    def get_group_event_filter(self, project_id, group_id, environment_id, tags,
+                               end=None, limit=None):
         start, end = self.get_time_range()
         filters = {
             'project_id': [project_id],
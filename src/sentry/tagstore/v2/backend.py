@@ -15,17 +15,19 @@ import logging
 from collections import defaultdict
 from datetime import timedelta
 from django.db import connections, router, IntegrityError, transaction
-from django.db.models import Q, Sum
+from django.db.models import Count, Q, Sum
 from django.utils import timezone
 from operator import or_
 from six.moves import reduce
 
-from sentry import buffer
+from sentry import buffer, options
 from sentry.tagstore import TagKeyStatus
 from sentry.tagstore.base import TagStorage
 from sentry.utils import db
+from sentry.utils.dates import to_timestamp
 
 from . import models
+from .index import group_event_tag_index, group_tag_index
 from sentry.tagstore.types import TagKey, TagValue, GroupTagKey, GroupTagValue
 
 
@@ -173,6 +175,7 @@ class V2TagStorage(TagStorage):
 
     def setup_receivers(self):
         from django.db.models.signals import post_save
+        from sentry.signals import buffer_incr_complete
 
         def record_project_tag_count(instance, created, **kwargs):
             if not created:
@@ -204,6 +207,19 @@ class V2TagStorage(TagStorage):
         post_save.connect(record_project_tag_count, sender=models.TagValue, weak=False)
         post_save.connect(record_group_tag_count, sender=models.GroupTagValue, weak=False)
 
+        @buffer_incr_complete.connect(sender=models.GroupTagValue, weak=False)
+        def record_group_tag_index(filters, extra, **kwargs):
+            if not options.get('tagstore.search-index.write'):
+                return
+
+            group_tag_index.record(
+                project_id=filters['project_id'],
+                group_id=filters['group_id'],
+                key_id=filters['_key_id'],
+                value_id=filters['_value_id'],
+                last_seen=(extra or {}).get('last_seen'),
+            )
+
     def create_tag_key(self, project_id, environment_id, key, **kwargs):
         environment_id = AGGREGATE_ENVIRONMENT_ID if environment_id is None else environment_id
 
@@ -414,6 +430,10 @@ class V2TagStorage(TagStorage):
                 },
                 exc_info=True
             )
+        else:
+            if options.get('tagstore.event-index.write'):
+                group_event_tag_index.record(
+                    project_id, group_id, [(event_id, date_added, tag_ids)])
 
     def get_tag_key(self, project_id, environment_id, key, status=TagKeyStatus.VISIBLE):
         from sentry.tagstore.exceptions import TagKeyNotFound
@@ -652,7 +672,61 @@ class V2TagStorage(TagStorage):
                         },
                         extra=extra)
 
-    def get_group_event_filter(self, project_id, group_id, environment_id, tags):
+    def incr_tag_values_times_seen_bulk(self, project_id, group_id, environment_id,
+                                        tags, last_seen=None, count=1):
+        assert environment_id is not None
+
+        tags = list(tags)
+        if not tags:
+            return
+
+        environment_ids = [environment_id, AGGREGATE_ENVIRONMENT_ID]
+        tagkeys = models.TagKey.get_or_create_bulk_for_environments(
+            project_id, environment_ids, [key for key, _, _ in tags])
+        tagvalues = models.TagValue.get_or_create_bulk(project_id, [
+            (tagkeys[(env, key)], value)
+            for env in environment_ids
+            for key, value, _ in tags
+        ])
+
+        increments = []
+        for env in environment_ids:
+            for key, value, data in tags:
+                tagkey = tagkeys[(env, key)]
+                tagvalue = tagvalues[(tagkey, value)]
+
+                increments.append((
+                    models.TagValue,
+                    {'times_seen': count},
+                    {
+                        'project_id': project_id,
+                        '_key_id': tagkey.id,
+                        'value': value,
+                    },
+                    {
+                        'last_seen': last_seen,
+                        'data': data,
+                    },
+                ))
+                increments.append((
+                    models.GroupTagValue,
+                    {'times_seen': count},
+                    {
+                        'project_id': project_id,
+                        'group_id': group_id,
+                        '_key_id': tagkey.id,
+                        '_value_id': tagvalue.id,
+                    },
+                    {
+                        'project_id': project_id,
+                        'last_seen': last_seen,
+                    },
+                ))
+
+        buffer.incr_many(increments)
+
+    def get_group_event_filter(self, project_id, group_id, environment_id, tags,
+                               end=None, limit=None):
         # NOTE: `environment_id=None` needs to be filtered differently in this method.
         # EventTag never has NULL `environment_id` fields (individual Events always have an environment),
         # and so `environment_id=None` needs to query EventTag for *all* environments (except, ironically
@@ -693,6 +767,20 @@ class V2TagStorage(TagStorage):
             # set
             return None
 
+        if options.get('tagstore.event-index.read'):
+            # Without page bounds, this is limited the same way as the query
+            # below (to the most recent events.)
+            matches = group_event_tag_index.search(
+                project_id,
+                group_id,
+                tag_lookups,
+                limit=limit if limit is not None else 1000,
+                end=to_timestamp(end) if end is not None else None,
+            )
+            if not matches:
+                return None
+            return {'id__in': set(matches)}
+
         # Django doesnt support union, so we limit results and try to find
         # reasonable matches
 
@@ -917,6 +1005,11 @@ class V2TagStorage(TagStorage):
             self, project_id, environment_id, tags, candidates=None, limit=1000):
 
         from sentry.search.base import ANY
+
+        if options.get('tagstore.search-index.read'):
+            return self._get_group_ids_for_search_filter_from_index(
+                project_id, environment_id, tags, candidates)
+
         # Django doesnt support union, so we limit results and try to find
         # reasonable matches
 
@@ -961,23 +1054,105 @@ class V2TagStorage(TagStorage):
 
         return matches
 
+    def _get_group_ids_for_search_filter_from_index(
+            self, project_id, environment_id, tags, candidates):
+        from sentry.search.base import ANY
+
+        if candidates is not None:
+            candidates = list(candidates)
+            if not candidates:
+                return []
+
+        environment_id = AGGREGATE_ENVIRONMENT_ID if environment_id is None else environment_id
+
+        key_ids = dict(
+            models.TagKey.objects.filter(
+                project_id=project_id,
+                environment_id=environment_id,
+                key__in=tags.keys(),
+                status=TagKeyStatus.VISIBLE,
+            ).values_list('key', 'id')
+        )
+        if len(key_ids) != len(tags):
+            return []
+
+        values = [(key_ids[k], v) for k, v in six.iteritems(tags) if v != ANY]
+        value_ids = {}
+        if values:
+            value_ids = {
+                (key_id, value): value_id
+                for value_id, key_id, value in models.TagValue.objects.filter(
+                    reduce(or_, (Q(_key_id=key_id, value=v) for key_id, v in values)),
+                    project_id=project_id,
+                ).values_list('id', '_key_id', 'value')
+            }
+            if len(value_ids) != len(values):
+                return []
+
+        lookups = [
+            (key_ids[k], None if v == ANY else value_ids[(key_ids[k], v)])
+            for k, v in six.iteritems(tags)
+        ]
+
+        # Unlike the database lookup, the index search is exact: every
+        # matching group is returned, not only the ``limit`` most recently
+        # seen ones.
+        return group_tag_index.search(project_id, lookups, candidates=candidates)
+
     def update_group_tag_key_values_seen(self, project_id, group_ids):
-        gtk_qs = models.GroupTagKey.objects.filter(
+        # ``values_seen`` is maintained incrementally as ``GroupTagValue`` rows
+        # are created (see ``setup_receivers``), this recounts it for all keys
+        # of the groups at once after their values were moved around.
+        group_ids = list(group_ids)
+        if not group_ids:
+            return
+
+        using = router.db_for_write(models.GroupTagKey)
+        if db.is_postgres(using):
+            cursor = connections[using].cursor()
+            cursor.execute(
+                """
+                UPDATE tagstore_grouptagkey
+                SET values_seen = COALESCE(counts.values_seen, 0)
+                FROM tagstore_grouptagkey AS gtk
+                LEFT OUTER JOIN (
+                    SELECT group_id, key_id, COUNT(*) AS values_seen
+                    FROM tagstore_grouptagvalue
+                    WHERE project_id = %s
+                      AND group_id IN %s
+                    GROUP BY group_id, key_id
+                ) AS counts
+                ON (counts.group_id = gtk.group_id AND counts.key_id = gtk.key_id)
+                WHERE tagstore_grouptagkey.id = gtk.id
+                  AND gtk.project_id = %s
+                  AND gtk.group_id IN %s
+                  AND gtk.values_seen != COALESCE(counts.values_seen, 0)
+            """, [project_id, tuple(group_ids), project_id, tuple(group_ids)]
+            )
+            return
+
+        counts = {
+            (row['group_id'], row['_key_id']): row['values_seen']
+            for row in models.GroupTagValue.objects.filter(
+                project_id=project_id,
+                group_id__in=group_ids,
+            ).values('group_id', '_key_id').annotate(values_seen=Count('id'))
+        }
+
+        updates = defaultdict(list)
+        for id, group_id, key_id, values_seen in models.GroupTagKey.objects.filter(
             project_id=project_id,
-            group_id__in=group_ids
-        )
+            group_id__in=group_ids,
+        ).values_list('id', 'group_id', '_key_id', 'values_seen'):
+            count = counts.get((group_id, key_id), 0)
+            if count != values_seen:
+                updates[count].append(id)
 
-        for instance in gtk_qs:
+        for values_seen, ids in six.iteritems(updates):
             models.GroupTagKey.objects.filter(
-                id=instance.id,
                 project_id=project_id,
-            ).update(
-                values_seen=models.GroupTagValue.objects.filter(
-                    project_id=instance.project_id,
-                    group_id=instance.group_id,
-                    _key_id=instance._key_id,
-                ).count(),
-            )
+                id__in=ids,
+            ).update(values_seen=values_seen)
 
     def get_tag_value_paginator(self, project_id, environment_id, key, query=None,
             order_by='-last_seen'):
@@ -1061,11 +1236,32 @@ class V2TagStorage(TagStorage):
         return qs
 
     def update_group_for_events(self, project_id, event_ids, destination_id):
-        return models.EventTag.objects.filter(
+        index_events = None
+        if options.get('tagstore.event-index.write'):
+            index_events = defaultdict(lambda: defaultdict(list))
+            for event_id, group_id, date_added, key_id, value_id in models.EventTag.objects.filter(
+                project_id=project_id,
+                event_id__in=event_ids,
+            ).values_list('event_id', 'group_id', 'date_added', 'key_id', 'value_id'):
+                index_events[group_id][(event_id, date_added)].append((key_id, value_id))
+
+        rv = models.EventTag.objects.filter(
             project_id=project_id,
             event_id__in=event_ids,
         ).update(group_id=destination_id)
 
+        if index_events:
+            for group_id, events in six.iteritems(index_events):
+                events = [
+                    (event_id, date_added, tag_ids)
+                    for (event_id, date_added), tag_ids in six.iteritems(events)
+                ]
+                if group_id != destination_id:
+                    group_event_tag_index.remove(project_id, group_id, events)
+                group_event_tag_index.record(project_id, destination_id, events)
+
+        return rv
+
     def _add_environment_filter(self, queryset, environment_id):
         """\
         Filter a queryset by the provided `environment_id`, handling
@@ -0,0 +1,229 @@
+"""
+sentry.tagstore.v2.index
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+Inverted indexes of tags in Redis, used to answer tag searches without
+querying ``GroupTagValue`` or ``EventTag`` once per tag.
+
+``GroupTagIndex`` keeps a sorted set of group ids for each ``TagKey`` and
+each ``TagValue``, scored by the time the tag was last seen in the group. It
+is written whenever a buffered ``GroupTagValue`` increment is flushed. All
+sets of a project are stored on the same Redis host, so a search for several
+tags is a single ``ZINTERSTORE`` on that host.
+
+``GroupEventTagIndex`` keeps a sorted set of event ids for each tag value of
+a group, scored by the time of the event. It is written along with the
+``EventTag`` rows of an event, and the sets of a group are stored on the
+same Redis host.
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import uuid
+
+from time import time
+
+from sentry import options
+from sentry.utils import redis
+from sentry.utils.dates import to_timestamp
+
+__all__ = ('GroupTagIndex', 'GroupEventTagIndex', 'group_tag_index', 'group_event_tag_index')
+
+KEY_PREFIX = 'ts:gi'
+EVENT_KEY_PREFIX = 'ts:ei'
+
+#: Groups (and events) are removed from the indexes once they are older than
+#: this (same as the default event retention.)
+DEFAULT_RETENTION = 60 * 60 * 24 * 90
+
+#: Temporary sets are removed by the search that creates them, this only
+#: guards against leaking them if it fails halfway.
+TEMPORARY_KEY_TTL = 60
+
+
+class GroupTagIndex(object):
+    def __init__(self, retention=DEFAULT_RETENTION):
+        self.retention = retention
+
+    def _get_client(self, project_id):
+        cluster = redis.clusters.get(options.get('tagstore.search-index.cluster'))
+        return cluster.get_local_client_for_key('%s:%s' % (KEY_PREFIX, project_id))
+
+    def _make_key(self, project_id, key_id, value_id=None):
+        if value_id is None:
+            return '%s:%s:k:%s' % (KEY_PREFIX, project_id, key_id)
+        return '%s:%s:v:%s:%s' % (KEY_PREFIX, project_id, key_id, value_id)
+
+    def record(self, project_id, group_id, key_id, value_id, last_seen=None):
+        """
+        Record that the tag value ``value_id`` of the tag key ``key_id`` was
+        seen in the group ``group_id`` at ``last_seen``.
+        """
+        timestamp = to_timestamp(last_seen) if last_seen is not None else time()
+        cutoff = time() - self.retention
+
+        with self._get_client(project_id).pipeline(transaction=False) as pipe:
+            for key in (self._make_key(project_id, key_id),
+                        self._make_key(project_id, key_id, value_id)):
+                pipe.zadd(key, timestamp, group_id)
+                pipe.zremrangebyscore(key, '-inf', cutoff)
+                pipe.expire(key, self.retention)
+            pipe.execute()
+
+    def search(self, project_id, lookups, candidates=None, limit=None):
+        """
+        Returns the ids of the groups that all of ``lookups`` were seen in,
+        most recently seen first. ``lookups`` is a sequence of ``(key_id,
+        value_id)`` tuples, where a ``value_id`` of ``None`` matches any value
+        of the key. If ``candidates`` is given, only groups within it are
+        returned.
+        """
+        keys = [self._make_key(project_id, key_id, value_id) for key_id, value_id in lookups]
+        end = -1 if limit is None else limit - 1
+
+        if candidates is None and len(keys) == 1:
+            group_ids = self._get_client(project_id).zrevrange(keys[0], 0, end)
+            return [int(group_id) for group_id in group_ids]
+
+        destination = '%s:%s:t:%s' % (KEY_PREFIX, project_id, uuid.uuid4().hex)
+        temporary_keys = [destination]
+        with self._get_client(project_id).pipeline(transaction=False) as pipe:
+            if candidates is not None:
+                members = []
+                for group_id in candidates:
+                    members.extend((0, group_id))
+                if not members:
+                    return []
+                candidates_key = '%s:%s:c:%s' % (KEY_PREFIX, project_id, uuid.uuid4().hex)
+                pipe.zadd(candidates_key, *members)
+                pipe.expire(candidates_key, TEMPORARY_KEY_TTL)
+                keys.append(candidates_key)
+                temporary_keys.append(candidates_key)
+
+            # The score of a group is the last time any of the tags was seen
+            # in it, candidates don't contribute to it.
+            pipe.zinterstore(destination, keys, aggregate='MAX')
+            pipe.expire(destination, TEMPORARY_KEY_TTL)
+            pipe.zrevrange(destination, 0, end)
+            pipe.delete(*temporary_keys)
+            group_ids = pipe.execute()[-2]
+
+        return [int(group_id) for group_id in group_ids]
+
+
+class GroupEventTagIndex(object):
+    def __init__(self, retention=DEFAULT_RETENTION):
+        self.retention = retention
+
+    def _get_client(self, project_id, group_id):
+        cluster = redis.clusters.get(options.get('tagstore.search-index.cluster'))
+        return cluster.get_local_client_for_key(
+            '%s:%s:%s' % (EVENT_KEY_PREFIX, project_id, group_id))
+
+    def _make_key(self, project_id, group_id, key_id, value_id):
+        return '%s:%s:%s:%s:%s' % (EVENT_KEY_PREFIX, project_id, group_id, key_id, value_id)
+
+    def record(self, project_id, group_id, events):
+        """
+        Record the tags of ``events`` (a sequence of ``(event_id, date_added,
+        tag_ids)`` tuples, where ``tag_ids`` are ``(key_id, value_id)`` tuples)
+        for the group ``group_id``.
+        """
+        cutoff = time() - self.retention
+        keys = set()
+
+        with self._get_client(project_id, group_id).pipeline(transaction=False) as pipe:
+            for event_id, date_added, tag_ids in events:
+                timestamp = to_timestamp(date_added)
+                for key_id, value_id in tag_ids:
+                    key = self._make_key(project_id, group_id, key_id, value_id)
+                    pipe.zadd(key, timestamp, event_id)
+                    keys.add(key)
+            for key in keys:
+                pipe.zremrangebyscore(key, '-inf', cutoff)
+                pipe.expire(key, self.retention)
+            pipe.execute()
+
+    def remove(self, project_id, group_id, events):
+        """
+        Remove ``events`` (as passed to ``record``) from the index of the group
+        ``group_id``.
+        """
+        with self._get_client(project_id, group_id).pipeline(transaction=False) as pipe:
+            for event_id, _, tag_ids in events:
+                for key_id, value_id in tag_ids:
+                    pipe.zrem(self._make_key(project_id, group_id, key_id, value_id), event_id)
+            pipe.execute()
+
+    def search(self, project_id, group_id, lookups, offset=0, limit=None, end=None):
+        """
+        Returns the ids of the events of the group ``group_id`` that match all
+        of ``lookups``, most recent first. Each item of ``lookups`` is a
+        sequence of ``(key_id, value_id)`` tuples, an event matches it if it
+        has any of them.
+
+        Only events up to the timestamp ``end`` are returned, if it is given.
+        If ``limit`` is given, the events that have the same timestamp as the
+        last of them are returned as well, so that a page of events ordered by
+        time can always be taken from the result.
+        """
+        client = self._get_client(project_id, group_id)
+        temporary_keys = []
+        keys = []
+
+        with client.pipeline(transaction=False) as pipe:
+            for tag_ids in lookups:
+                tag_keys = [
+                    self._make_key(project_id, group_id, key_id, value_id)
+                    for key_id, value_id in tag_ids
+                ]
+                if len(tag_keys) == 1:
+                    keys.append(tag_keys[0])
+                    continue
+                union_key = '%s:%s:%s:u:%s' % (
+                    EVENT_KEY_PREFIX, project_id, group_id, uuid.uuid4().hex)
+                pipe.zunionstore(union_key, tag_keys, aggregate='MAX')
+                pipe.expire(union_key, TEMPORARY_KEY_TTL)
+                keys.append(union_key)
+                temporary_keys.append(union_key)
+
+            if len(keys) == 1:
+                destination = keys[0]
+            else:
+                destination = '%s:%s:%s:t:%s' % (
+                    EVENT_KEY_PREFIX, project_id, group_id, uuid.uuid4().hex)
+                pipe.zinterstore(destination, keys, aggregate='MAX')
+                pipe.expire(destination, TEMPORARY_KEY_TTL)
+                temporary_keys.append(destination)
+
+            # A negative count returns all events after the offset.
+            pipe.zrevrangebyscore(
+                destination,
+                '+inf' if end is None else end,
+                '-inf',
+                start=offset,
+                num=-1 if limit is None else limit,
+                withscores=True,
+            )
+            items = pipe.execute()[-1]
+
+        try:
+            event_ids = [event_id for event_id, _ in items]
+            if limit is not None and len(items) == limit:
+                score = items[-1][1]
+                seen = set(event_ids)
+                event_ids.extend(
+                    event_id for event_id in client.zrevrangebyscore(destination, score, score)
+                    if event_id not in seen
+                )
+        finally:
+            if temporary_keys:
+                client.delete(*temporary_keys)
+
+        return [int(event_id) for event_id in event_ids]
+
+
+group_tag_index = GroupTagIndex()
+group_event_tag_index = GroupEventTagIndex()
@@ -173,6 +173,32 @@ class TagKey(Model):
 
         return key_to_model
 
+    @classmethod
+    def get_or_create_bulk_for_environments(cls, project_id, environment_ids, keys):
+        # Same as ``get_or_create_bulk``, but for several environments at once
+        # and returning a mapping of ``(environment_id, key)`` to models. The
+        # hot case (everything is cached) is a single cache get for all
+        # environments.
+        keys = set(keys)
+        cache_key_to_key = {
+            cls.get_cache_key(project_id, environment_id, key): (environment_id, key)
+            for environment_id in environment_ids
+            for key in keys
+        }
+        key_to_model = {}
+        for cache_key, model in six.iteritems(cache.get_many(cache_key_to_key.keys())):
+            key_to_model[cache_key_to_key[cache_key]] = model
+
+        for environment_id in environment_ids:
+            remaining_keys = [key for key in keys if (environment_id, key) not in key_to_model]
+            if not remaining_keys:
+                continue
+            for key, model in six.iteritems(
+                    cls.get_or_create_bulk(project_id, environment_id, remaining_keys)):
+                key_to_model[(environment_id, key)] = model
+
+        return key_to_model
+
 
 @register(TagKey)
 class TagKeySerializer(Serializer):
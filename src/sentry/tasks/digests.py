@@ -3,6 +3,8 @@ from __future__ import absolute_import
 import logging
 import time
 
+from django.conf import settings
+
 from sentry.digests import get_option_key
 from sentry.digests.backends.base import InvalidState
 from sentry.digests.notifications import (
@@ -35,8 +37,29 @@ def schedule_digests():
     timeout = 300
     digests.maintenance(deadline - timeout)
 
+    batch_size = settings.SENTRY_DIGESTS_DELIVERY_BATCH_SIZE
+    if batch_size <= 1:
+        for entry in digests.schedule(deadline):
+            deliver_digest.delay(entry.key, entry.timestamp)
+        return
+
+    # Entries are scheduled one host after the other, so consecutive entries
+    # can mostly be opened and closed together.
+    keys = []
     for entry in digests.schedule(deadline):
-        deliver_digest.delay(entry.key, entry.timestamp)
+        keys.append(entry.key)
+        if len(keys) >= batch_size:
+            deliver_digests.delay(keys)
+            keys = []
+
+    if keys:
+        deliver_digests.delay(keys)
+
+
+def get_minimum_delay(plugin, project):
+    return ProjectOption.objects.get_value(
+        project, get_option_key(plugin.get_conf_key(), 'minimum_delay')
+    )
 
 
 @instrumented_task(name='sentry.tasks.digests.deliver_digest', queue='digests.delivery')
@@ -50,9 +73,7 @@ def deliver_digest(key, schedule_timestamp=None):
         digests.delete(key)
         return
 
-    minimum_delay = ProjectOption.objects.get_value(
-        project, get_option_key(plugin.get_conf_key(), 'minimum_delay')
-    )
+    minimum_delay = get_minimum_delay(plugin, project)
 
     try:
         with digests.digest(key, minimum_delay=minimum_delay) as records:
@@ -63,3 +84,46 @@ def deliver_digest(key, schedule_timestamp=None):
 
     if digest:
         plugin.notify_digest(project, digest)
+
+
+@instrumented_task(name='sentry.tasks.digests.deliver_digests', queue='digests.delivery')
+def deliver_digests(keys):
+    from sentry import digests
+
+    targets = {}
+    minimum_delay = {}
+    for key in keys:
+        try:
+            plugin, project = split_key(key)
+        except Project.DoesNotExist as error:
+            logger.info('Cannot deliver digest %r due to error: %s', key, error)
+            digests.delete(key)
+            continue
+        targets[key] = (plugin, project)
+        minimum_delay[key] = get_minimum_delay(plugin, project)
+
+    if not targets:
+        return
+
+    results = {}
+    with digests.digest_many(list(targets), minimum_delay=minimum_delay) as batch:
+        for key, records in batch:
+            plugin, project = targets[key]
+            try:
+                results[key] = build_digest(project, records)
+            except Exception:
+                # The timeline is left open and will be retried after
+                # maintenance, without affecting the rest of the batch.
+                logger.exception('Failed to build digest %r', key)
+                continue
+            batch.close(key)
+
+    for key in batch.closed:
+        digest = results[key]
+        if not digest:
+            continue
+        plugin, project = targets[key]
+        try:
+            plugin.notify_digest(project, digest)
+        except Exception:
+            logger.exception('Failed to deliver digest %r', key)
@@ -307,9 +307,16 @@ class BaseTSDB(Service):
         Increment project ID=1 and group ID=5:
 
         >>> incr_multi([(TimeSeriesModel.project, 1), (TimeSeriesModel.group, 5)])
+
+        Items may also be provided as 3-tuples that carry their own count,
+        which takes precedence over ``count``:
+
+        >>> incr_multi([(TimeSeriesModel.project, 1, 10), (TimeSeriesModel.group, 5)])
         """
-        for model, key in items:
-            self.incr(model, key, timestamp, count, environment_id=environment_id)
+        for item in items:
+            model, key = item[:2]
+            item_count = item[2] if len(item) > 2 else count
+            self.incr(model, key, timestamp, item_count, environment_id=environment_id)
 
     def merge(self, model, destination, sources, timestamp=None, environment_ids=None):
         """
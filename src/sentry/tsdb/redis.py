@@ -12,6 +12,7 @@ import logging
 import operator
 import random
 import uuid
+from array import array
 from binascii import crc32
 from collections import defaultdict, namedtuple
 from hashlib import md5
@@ -36,6 +37,11 @@ CountMinScript = Script(
     resource_string('sentry', 'scripts/tsdb/cmsketch.lua'),
 )
 
+IncrScript = Script(
+    None,
+    resource_string('sentry', 'scripts/tsdb/incr.lua'),
+)
+
 
 class SuppressionWrapper(object):
     """\
@@ -218,29 +224,61 @@ class RedisTSDB(BaseTSDB):
         Increment project ID=1 and group ID=5:
 
         >>> incr_multi([(TimeSeriesModel.project, 1), (TimeSeriesModel.group, 5)])
+
+        Items may also be provided as 3-tuples that carry their own count:
+
+        >>> incr_multi([(TimeSeriesModel.project, 1, 10), (TimeSeriesModel.group, 5)])
         """
-        self.validate_arguments([model for model, _ in items], [environment_id])
+        self.validate_arguments([item[0] for item in items], [environment_id])
 
         if timestamp is None:
             timestamp = timezone.now()
 
+        buckets = []
+        for rollup, max_values in six.iteritems(self.rollups):
+            expiry = self.calculate_expiry(rollup, max_values, timestamp)
+            for item in items:
+                model, key = item[:2]
+                item_count = item[2] if len(item) > 2 else count
+                buckets.append((model, rollup, key, item_count, expiry))
+
         for (cluster, durable), environment_ids in self.get_cluster_groups(
                 set([None, environment_id])):
-            manager = cluster.map()
-            if not durable:
-                manager = SuppressionWrapper(manager)
+            # Collect all of the counters that need to be incremented (merging
+            # increments of the same counter), along with the expiration time
+            # of each hash.
+            hashes = {}
+            for model, rollup, key, item_count, expiry in buckets:
+                for environment_id in environment_ids:
+                    hash_key, hash_field = self.make_counter_key(
+                        model, rollup, timestamp, key, environment_id)
+                    hashes.setdefault(
+                        hash_key, (expiry, defaultdict(int)),
+                    )[1][hash_field] += item_count
+
+            # Each host receives a single script invocation that performs all
+            # of the increments for the hashes that it is responsible for. The
+            # command is routed using the first hash key for that host.
+            router = cluster.get_router()
+            host_keys = defaultdict(list)
+            for hash_key in hashes:
+                host_keys[router.get_host_for_key(hash_key)].append(hash_key)
 
-            with manager as client:
-                for rollup, max_values in six.iteritems(self.rollups):
-                    for model, key in items:
-                        for environment_id in environment_ids:
-                            hash_key, hash_field = self.make_counter_key(
-                                model, rollup, timestamp, key, environment_id)
-                            client.hincrby(hash_key, hash_field, count)
-                            client.expireat(
-                                hash_key,
-                                self.calculate_expiry(rollup, max_values, timestamp),
-                            )
+            commands = {}
+            for keys in six.itervalues(host_keys):
+                arguments = []
+                for hash_key in keys:
+                    expiry, fields = hashes[hash_key]
+                    arguments.extend((expiry, len(fields)))
+                    for hash_field, value in six.iteritems(fields):
+                        arguments.extend((hash_field, value))
+                commands[keys[0]] = [(IncrScript, keys, arguments)]
+
+            try:
+                cluster.execute_commands(commands)
+            except Exception:
+                if durable:
+                    raise
 
     def get_range(self, model, keys, start, end, rollup=None, environment_id=None):
         """
@@ -255,25 +293,38 @@ class RedisTSDB(BaseTSDB):
 
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
         series = map(to_datetime, series)
-
-        results = []
+        epochs = [to_timestamp(timestamp) for timestamp in series]
+        keys = list(set(keys))
+
+        # Counters for keys that share a virtual node are stored in the same
+        # hash, so all fields for each hash can be fetched with one ``HMGET``.
+        # The position of each field in the result is recorded as an offset
+        # into a flat array of ``len(keys) * len(series)`` counts.
+        requests = defaultdict(lambda: ([], []))
+        for i, key in enumerate(keys):
+            for j, timestamp in enumerate(series):
+                hash_key, hash_field = self.make_counter_key(
+                    model, rollup, timestamp, key, environment_id)
+                offsets, fields = requests[hash_key]
+                offsets.append(i * len(series) + j)
+                fields.append(hash_field)
+
+        responses = []
         cluster, _ = self.get_cluster(environment_id)
         with cluster.map() as client:
-            for key in keys:
-                for timestamp in series:
-                    hash_key, hash_field = self.make_counter_key(
-                        model, rollup, timestamp, key, environment_id)
-                    results.append(
-                        (to_timestamp(timestamp), key, client.hget(
-                            hash_key, hash_field)))
+            for hash_key, (offsets, fields) in six.iteritems(requests):
+                responses.append((offsets, client.hmget(hash_key, fields)))
 
-        results_by_key = defaultdict(dict)
-        for epoch, key, count in results:
-            results_by_key[key][epoch] = int(count.value or 0)
+        counts = array('l', [0]) * (len(keys) * len(series))
+        for offsets, response in responses:
+            for offset, value in zip(offsets, response.value):
+                if value is not None:
+                    counts[offset] = int(value)
 
-        for key, points in six.iteritems(results_by_key):
-            results_by_key[key] = sorted(points.items())
-        return dict(results_by_key)
+        return {
+            key: list(zip(epochs, counts[i * len(series):(i + 1) * len(series)]))
+            for i, key in enumerate(keys)
+        }
 
     def merge(self, model, destination, sources, timestamp=None, environment_ids=None):
         environment_ids = (
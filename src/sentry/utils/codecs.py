@@ -0,0 +1,208 @@
+"""
+sentry.utils.codecs
+~~~~~~~~~~~~~~~~~~~
+
+Codecs for values that are stored in shared, short lived storage (such as
+buffers and digest timelines in Redis.)
+
+Every codec can decode the values written by every other codec in this
+module: values written by ``MsgpackCodec`` carry a version prefix, and
+anything without that prefix is treated as a (legacy) pickle. This allows
+switching codecs without a window where existing values can't be read. Once
+the old values have expired, the pickle fallback can be disabled with the
+``allow_pickle`` codec option.
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import calendar
+import msgpack
+import six
+
+from collections import Mapping
+from datetime import date, datetime
+from decimal import Decimal
+from django.db.models import Model, get_model
+from django.utils import timezone
+
+from sentry.db.models.fields.node import NodeData
+from sentry.utils.compat import pickle
+
+__all__ = ('Codec', 'PickleCodec', 'MsgpackCodec', 'decode')
+
+#: Prefix for values encoded by ``MsgpackCodec``. Pickles never start with a
+#: null byte, the second byte is the version of the encoding.
+MSGPACK_PREFIX = b'\x00\x01'
+
+EXT_DATETIME = 1
+EXT_DATE = 2
+EXT_DECIMAL = 3
+EXT_MODEL = 4
+EXT_TUPLE = 5
+EXT_NAMEDTUPLE = 6
+
+_namedtuples = {}
+
+_field_types = six.integer_types + six.string_types + (
+    type(None), bool, float, six.binary_type, six.text_type, dict, list, tuple,
+    date, Decimal,
+)
+
+
+def register_namedtuple(cls):
+    """
+    Allow instances of the named tuple type ``cls`` to be encoded by
+    ``MsgpackCodec``. Types are identified by their name, so it must be unique
+    among the registered types.
+    """
+    name = cls.__name__
+    assert _namedtuples.get(name, cls) is cls, 'conflicting named tuple: %s' % (name, )
+    _namedtuples[name] = cls
+    return cls
+
+
+def _encode_model(instance):
+    opts = instance._meta
+    values = {}
+    for field in opts.concrete_fields:
+        value = getattr(instance, field.attname)
+        if isinstance(value, NodeData):
+            # Node data is restored as a plain dictionary, which is what the
+            # field expects when the instance is constructed again.
+            value = dict(value._node_data.items()) \
+                if value._node_data is not None else {'node_id': value.id}
+        elif not isinstance(value, _field_types):
+            # Wrapped values (such as bit fields) are stored in the form the
+            # field would save them in, and wrapped again by the field when
+            # the instance is constructed.
+            value = field.get_prep_value(value)
+        values[field.attname] = value
+    return [opts.app_label, opts.object_name, values]
+
+
+def _decode_model(app_label, object_name, values):
+    model = get_model(app_label, object_name)
+    if model is None:
+        raise ValueError('Unknown model: %s.%s' % (app_label, object_name))
+    return model(**values)
+
+
+def _encode_datetime(value):
+    if timezone.is_aware(value):
+        return [calendar.timegm(value.utctimetuple()), value.microsecond, True]
+    return [calendar.timegm(value.timetuple()), value.microsecond, False]
+
+
+def _decode_datetime(seconds, microsecond, aware):
+    value = datetime.utcfromtimestamp(seconds).replace(microsecond=microsecond)
+    if aware:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class Codec(object):
+    """
+    Set ``allow_pickle`` to ``False`` to stop decoding legacy pickles once no
+    more pickled values can be stored (decoding them raises ``ValueError``.)
+    """
+
+    def __init__(self, allow_pickle=True):
+        self.allow_pickle = allow_pickle
+
+    def encode(self, value):
+        raise NotImplementedError
+
+    def decode(self, value):
+        return decode(value, allow_pickle=self.allow_pickle)
+
+
+class PickleCodec(Codec):
+    def encode(self, value):
+        return pickle.dumps(value)
+
+
+class MsgpackCodec(Codec):
+    """
+    Encodes values with msgpack.
+
+    In addition to the types supported by msgpack itself, this supports
+    datetimes, dates, decimals, tuples, registered named tuples and model
+    instances (which are restored from their concrete field values.)
+    """
+
+    def encode(self, value):
+        return MSGPACK_PREFIX + _packb(value)
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return msgpack.ExtType(EXT_DATETIME, _packb(_encode_datetime(value)))
+    if isinstance(value, date):
+        return msgpack.ExtType(EXT_DATE, _packb(value.toordinal()))
+    if isinstance(value, Decimal):
+        return msgpack.ExtType(EXT_DECIMAL, _packb(six.text_type(value)))
+    if isinstance(value, Model):
+        return msgpack.ExtType(EXT_MODEL, _packb(_encode_model(value)))
+    if isinstance(value, tuple):
+        name = type(value).__name__
+        if _namedtuples.get(name) is type(value):
+            return msgpack.ExtType(EXT_NAMEDTUPLE, _packb([name, list(value)]))
+        return msgpack.ExtType(EXT_TUPLE, _packb(list(value)))
+    # Subclasses of the native types (``strict_types`` prevents them from
+    # being packed implicitly, since that would include tuples.)
+    if isinstance(value, Mapping):
+        return dict(value.items())
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, six.text_type):
+        return six.text_type(value)
+    if isinstance(value, six.binary_type):
+        return six.binary_type(value)
+    if isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, six.integer_types):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    raise TypeError('Unable to encode value of type %r' % (type(value), ))
+
+
+def _ext_hook(code, data):
+    value = _unpackb(data)
+    if code == EXT_DATETIME:
+        return _decode_datetime(*value)
+    if code == EXT_DATE:
+        return date.fromordinal(value)
+    if code == EXT_DECIMAL:
+        return Decimal(value)
+    if code == EXT_MODEL:
+        return _decode_model(*value)
+    if code == EXT_TUPLE:
+        return tuple(value)
+    if code == EXT_NAMEDTUPLE:
+        name, items = value
+        return _namedtuples[name](*items)
+    return msgpack.ExtType(code, data)
+
+
+def _packb(value):
+    return msgpack.packb(value, default=_default, use_bin_type=True, strict_types=True)
+
+
+def _unpackb(value):
+    return msgpack.unpackb(value, ext_hook=_ext_hook, encoding='utf-8')
+
+
+def decode(value, allow_pickle=True):
+    """
+    Decode a value that was encoded by any of the codecs in this module. If
+    ``allow_pickle`` is ``False``, only values written by ``MsgpackCodec`` are
+    accepted.
+    """
+    if value.startswith(MSGPACK_PREFIX):
+        return _unpackb(value[len(MSGPACK_PREFIX):])
+    if not allow_pickle:
+        raise ValueError('Refusing to decode a legacy pickled value')
+    return pickle.loads(value)
@@ -7,10 +7,14 @@ sentry.utils.data_filters.py
 """
 from __future__ import absolute_import
 
+import bisect
 import fnmatch
 import ipaddress
+import re
 import six
 
+from collections import defaultdict
+
 from django.utils.encoding import force_text
 
 from sentry import tsdb
@@ -48,66 +52,147 @@ class FilterTypes(object):
     RELEASES = 'releases'
 
 
-def is_valid_ip(project, ip_address):
+def _translate_glob(pattern):
+    rv = fnmatch.translate(pattern)
+    # Python 2 appends the flags to the expression, which isn't allowed when
+    # it is combined with other expressions.
+    if rv.endswith('(?ms)'):
+        rv = rv[:-len('(?ms)')]
+    return rv
+
+
+def compile_globs(patterns):
     """
-    Verify that an IP address is not being blacklisted
-    for the given project.
+    Compiles a list of case insensitive ``fnmatch`` patterns into a single
+    expression, or returns ``None`` if there are no patterns.
+    """
+    patterns = [p for p in patterns or () if p]
+    if not patterns:
+        return None
+    return re.compile(
+        r'|'.join('(?:%s)' % _translate_glob(p.lower()) for p in patterns),
+        re.M | re.S,
+    )
+
+
+class IPBlacklist(object):
+    """
+    A list of blacklisted IP addresses and networks.
+
+    Networks are merged into sorted, non-overlapping ranges of integers (per
+    IP version), so that a lookup is a binary search instead of a comparison
+    with every entry.
     """
-    blacklist = project.get_option('sentry:blacklisted_ips')
-    if not blacklist:
-        return True
 
-    for addr in blacklist:
+    def __init__(self, entries):
+        entries = entries or ()
+        self.addresses = frozenset(entries)
+
+        ranges = defaultdict(list)
+        for addr in entries:
+            # Check to make sure it's actually a range before
+            if '/' not in addr:
+                continue
+            try:
+                network = ipaddress.ip_network(six.text_type(addr), strict=False)
+            except ValueError:
+                # Ignore invalid values here
+                continue
+            ranges[network.version].append(
+                (int(network.network_address), int(network.broadcast_address)))
+
+        self.ranges = {}
+        for version, items in six.iteritems(ranges):
+            starts, ends = [], []
+            for start, end in sorted(items):
+                if ends and start <= ends[-1] + 1:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            self.ranges[version] = (starts, ends)
+
+    def __contains__(self, ip_address):
         # We want to error fast if it's an exact match
-        if ip_address == addr:
+        if ip_address in self.addresses:
+            return True
+
+        if not self.ranges:
             return False
 
-        # Check to make sure it's actually a range before
         try:
-            if '/' in addr and (
-                ipaddress.ip_address(six.text_type(ip_address)) in ipaddress.ip_network(
-                    six.text_type(addr), strict=False
-                )
-            ):
-                return False
+            address = ipaddress.ip_address(six.text_type(ip_address))
         except ValueError:
-            # Ignore invalid values here
-            pass
+            return False
 
-    return True
+        try:
+            starts, ends = self.ranges[address.version]
+        except KeyError:
+            return False
 
+        value = int(address)
+        index = bisect.bisect_right(starts, value) - 1
+        return index >= 0 and value <= ends[index]
 
-def is_valid_release(project, release):
+
+class FilterProgram(object):
     """
-    Verify that a release is not being filtered
-    for the given project.
+    The IP address, release and error message filters of a project, compiled
+    from the project options.
     """
-    invalid_versions = project.get_option('sentry:{}'.format(FilterTypes.RELEASES))
-    if not invalid_versions:
-        return True
 
-    release = force_text(release).lower()
+    def __init__(self, blacklisted_ips=None, releases=None, error_messages=None):
+        self.ip_blacklist = IPBlacklist(blacklisted_ips)
+        self.releases = compile_globs(releases)
+        self.error_messages = compile_globs(error_messages)
 
-    for version in invalid_versions:
-        if fnmatch.fnmatch(release, version.lower()):
-            return False
+    @classmethod
+    def from_options(cls, options):
+        return cls(
+            blacklisted_ips=options.get('sentry:blacklisted_ips'),
+            releases=options.get('sentry:{}'.format(FilterTypes.RELEASES)),
+            error_messages=options.get('sentry:{}'.format(FilterTypes.ERROR_MESSAGES)),
+        )
 
-    return True
+    def is_valid_ip(self, ip_address):
+        return ip_address not in self.ip_blacklist
 
+    def is_valid_release(self, release):
+        if self.releases is None:
+            return True
+        return self.releases.match(force_text(release).lower()) is None
 
-def is_valid_error_message(project, message):
+    def is_valid_error_message(self, message):
+        if self.error_messages is None:
+            return True
+        return self.error_messages.match(force_text(message).lower()) is None
+
+
+def get_filter_program(project):
+    from sentry.ingest_config import get_ingest_config
+
+    return get_ingest_config(project).filter_program
+
+
+def is_valid_ip(project, ip_address):
     """
-    Verify that an error message is not being filtered
+    Verify that an IP address is not being blacklisted
     for the given project.
     """
-    filtered_errors = project.get_option('sentry:{}'.format(FilterTypes.ERROR_MESSAGES))
-    if not filtered_errors:
-        return True
+    return get_filter_program(project).is_valid_ip(ip_address)
 
-    message = force_text(message).lower()
 
-    for error in filtered_errors:
-        if fnmatch.fnmatch(message, error.lower()):
-            return False
+def is_valid_release(project, release):
+    """
+    Verify that a release is not being filtered
+    for the given project.
+    """
+    return get_filter_program(project).is_valid_release(release)
+
 
-    return True
+def is_valid_error_message(project, message):
+    """
+    Verify that an error message is not being filtered
+    for the given project.
+    """
+    return get_filter_program(project).is_valid_error_message(message)
@@ -46,6 +46,10 @@ class SensitiveDataFilter(object):
     """
     Asterisk out things that look like passwords, credit card numbers,
     and API keys in frames, http, and basic extra data.
+
+    The configured fields are compiled into a single expression when the
+    filter is created, so filters should be reused where possible. Data is
+    scrubbed in place.
     """
     VALUES_RE = re.compile(
         r'|'.join(
@@ -71,6 +75,13 @@ class SensitiveDataFilter(object):
             fields += DEFAULT_SCRUBBED_FIELDS
         self.exclude_fields = {f.lower() for f in exclude_fields}
         self.fields = set(fields)
+        if self.fields:
+            # Longer fields first, as alternatives are tried in order.
+            self.fields_re = re.compile(r'|'.join(
+                re.escape(f) for f in sorted(self.fields, key=len, reverse=True)
+            ))
+        else:
+            self.fields_re = None
 
     def apply(self, data):
         # TODO(dcramer): move this into each interface
@@ -96,11 +107,56 @@ class SensitiveDataFilter(object):
             self.filter_csp(data['sentry.interfaces.Csp'])
 
         if 'extra' in data:
-            data['extra'] = varmap(self.sanitize, data['extra'])
+            data['extra'] = self.scrub(data['extra'])
 
         if 'contexts' in data:
             for key, value in six.iteritems(data['contexts']):
-                data['contexts'][key] = varmap(self.sanitize, value)
+                data['contexts'][key] = self.scrub(value)
+
+    def scrub(self, var, name=None, context=None):
+        """
+        Sanitizes all values within ``var``, recursively discovering dict and
+        list scoped values (like ``varmap``.) Dicts and lists are modified in
+        place, and only the values that are changed are replaced.
+        """
+        if isinstance(var, (dict, list, tuple)):
+            if context is None:
+                context = set()
+
+            objid = id(var)
+            if objid in context:
+                return self.sanitize(name, '<...>')
+            context.add(objid)
+
+            if isinstance(var, dict):
+                for k, v in six.iteritems(var):
+                    value = self.scrub(v, k, context)
+                    if value is not v:
+                        var[k] = value
+            else:
+                if isinstance(var, tuple):
+                    var = list(var)
+                # treat it like a mapping
+                if all(isinstance(v, (list, tuple)) and len(v) == 2 for v in var):
+                    for i, item in enumerate(var):
+                        k, v = item
+                        value = self.scrub(v, k, context)
+                        if value is v:
+                            continue
+                        if isinstance(item, list):
+                            item[1] = value
+                        else:
+                            var[i] = [k, value]
+                else:
+                    for i, v in enumerate(var):
+                        value = self.scrub(v, name, context)
+                        if value is not v:
+                            var[i] = value
+
+            context.remove(objid)
+            return var
+
+        return self.sanitize(name, var)
 
     def sanitize(self, key, value):
         if value is None:
@@ -124,16 +180,13 @@ class SensitiveDataFilter(object):
             if '//' in value and '@' in value:
                 value = self.URL_PASSWORD_RE.sub(r'\1' + FILTER_MASK + '@', value)
 
-        if isinstance(value, six.string_types):
-            str_value = value.lower()
-        else:
-            str_value = ''
+        if self.fields_re is None:
+            return value
 
-        for field in self.fields:
-            if field in str_value:
-                return FILTER_MASK
-            if field in key and value not in NOT_SCRUBBED_VALUES:
-                return FILTER_MASK
+        if isinstance(value, six.string_types) and self.fields_re.search(value.lower()):
+            return FILTER_MASK
+        if key and self.fields_re.search(key) and value not in NOT_SCRUBBED_VALUES:
+            return FILTER_MASK
         return value
 
     def filter_stacktrace(self, data):
@@ -142,7 +195,7 @@ class SensitiveDataFilter(object):
         for frame in data['frames']:
             if 'vars' not in frame:
                 continue
-            frame['vars'] = varmap(self.sanitize, frame['vars'])
+            frame['vars'] = self.scrub(frame['vars'])
 
     def filter_http(self, data):
         for n in ('data', 'cookies', 'headers', 'env', 'query_string'):
@@ -163,18 +216,18 @@ class SensitiveDataFilter(object):
             else:
                 # Encoded structured data (HTTP bodies, headers) would have
                 # already been decoded by the request interface.
-                data[n] = varmap(self.sanitize, data[n])
+                data[n] = self.scrub(data[n])
 
     def filter_user(self, data):
         if 'data' not in data:
             return
-        data['data'] = varmap(self.sanitize, data['data'])
+        data['data'] = self.scrub(data['data'])
 
     def filter_crumb(self, data):
         for key in 'data', 'message':
             val = data.get(key)
             if val:
-                data[key] = varmap(self.sanitize, val)
+                data[key] = self.scrub(val)
 
     def filter_csp(self, data):
         for key in 'blocked_uri', 'document_uri':
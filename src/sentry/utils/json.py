@@ -12,6 +12,7 @@ from __future__ import absolute_import
 from enum import Enum
 from simplejson import JSONEncoder, _default_decoder
 import datetime
+import re
 import uuid
 import six
 import decimal
@@ -108,5 +109,45 @@ def loads(value, **kwargs):
     return _default_decoder.decode(value)
 
 
+# Characters that can change the string or nesting state of a JSON document.
+_structural_re = re.compile(r'["\\\[\]{}]')
+
+
+def exceeds_depth(value, max_depth):
+    """
+    Returns whether the arrays and objects in the JSON document ``value`` are
+    nested deeper than ``max_depth``, without decoding it. Documents that are
+    not valid JSON may produce either result.
+
+    The document is scanned once, so the cost stays linear in its size even
+    for malformed input such as unterminated strings.
+    """
+    if value.count('[') + value.count('{') <= max_depth:
+        return False
+
+    depth = 0
+    in_string = False
+    escaped_pos = -1
+    for match in _structural_re.finditer(value):
+        pos = match.start()
+        if pos == escaped_pos:
+            continue
+        char = match.group()
+        if in_string:
+            if char == '\\':
+                escaped_pos = pos + 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '[{':
+            depth += 1
+            if depth > max_depth:
+                return True
+        elif char in ']}':
+            depth -= 1
+    return False
+
+
 def dumps_htmlsafe(value):
     return mark_safe(_default_escaped_encoder.encode(value))
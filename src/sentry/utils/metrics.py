@@ -3,13 +3,15 @@ from __future__ import absolute_import
 __all__ = ['timing', 'incr']
 
 import logging
+import six
 
+from collections import defaultdict
 from contextlib import contextmanager
 from django.conf import settings
 from random import random
 from time import time
 from threading import Thread
-from six.moves.queue import Queue
+from six.moves.queue import Empty, Full, Queue
 
 
 def get_default_backend():
@@ -44,40 +46,91 @@ def _sampled_value(value):
 
 
 class InternalMetrics(object):
-    def __init__(self):
+    """
+    Records metrics to the internal TSDB model on a background thread.
+
+    Counts are aggregated by key for up to ``interval`` seconds (or until
+    ``max_keys`` distinct keys have been seen) and written with a single
+    ``incr_multi`` call. The queue holds at most ``maxsize`` pending values,
+    anything recorded while it is full is dropped and counted by ``dropped``.
+    """
+
+    dropped_key = 'internal-metrics.dropped'
+
+    def __init__(self, maxsize=10000, interval=1.0, max_keys=1000):
+        self.maxsize = maxsize
+        self.interval = interval
+        self.max_keys = max_keys
+        self.dropped = 0
+        self._dropped_recorded = 0
+        self._pending = defaultdict(int)
         self._started = False
 
     def _start(self):
-        self.q = q = Queue()
-
-        def worker():
-            from sentry import tsdb
-
-            while True:
-                key, instance, tags, amount = q.get()
-                amount = _sampled_value(amount)
-                if instance:
-                    full_key = '{}.{}'.format(key, instance)
-                else:
-                    full_key = key
-                try:
-                    tsdb.incr(tsdb.models.internal, full_key, count=amount)
-                except Exception:
-                    logger = logging.getLogger('sentry.errors')
-                    logger.exception('Unable to incr internal metric')
-                finally:
-                    q.task_done()
+        self.q = Queue(maxsize=self.maxsize)
 
-        t = Thread(target=worker)
+        t = Thread(target=self._worker)
         t.setDaemon(True)
         t.start()
 
         self._started = True
 
+    def _worker(self):
+        deadline = None
+        while True:
+            try:
+                item = self.q.get(
+                    timeout=max(deadline - time(), 0) if deadline is not None else None,
+                )
+            except Empty:
+                pass
+            else:
+                try:
+                    self._process(item)
+                finally:
+                    self.q.task_done()
+                if deadline is None:
+                    deadline = time() + self.interval
+
+            if deadline is not None and (
+                    time() >= deadline or len(self._pending) >= self.max_keys):
+                self._flush()
+                deadline = None
+
+    def _process(self, item):
+        key, instance, tags, amount = item
+        if instance:
+            key = '{}.{}'.format(key, instance)
+        self._pending[key] += _sampled_value(amount)
+
+    def _flush(self):
+        from sentry import tsdb
+
+        pending, self._pending = self._pending, defaultdict(int)
+
+        dropped = self.dropped
+        if dropped > self._dropped_recorded:
+            pending[self.dropped_key] += dropped - self._dropped_recorded
+            self._dropped_recorded = dropped
+
+        if not pending:
+            return
+
+        try:
+            tsdb.incr_multi([
+                (tsdb.models.internal, key, amount) for key, amount in six.iteritems(pending)
+            ])
+        except Exception:
+            logger = logging.getLogger('sentry.errors')
+            logger.exception('Unable to incr internal metric')
+
     def incr(self, key, instance=None, tags=None, amount=1):
         if not self._started:
             self._start()
-        self.q.put((key, instance, tags, amount))
+        try:
+            self.q.put((key, instance, tags, amount), block=False)
+        except Full:
+            self.dropped += 1
 
 
 internal = InternalMetrics()
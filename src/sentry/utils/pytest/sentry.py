@@ -102,6 +102,10 @@ def pytest_configure(config):
 
     settings.SENTRY_ALLOW_ORIGIN = '*'
 
+    # Sources are fetched in the test thread, so that database fixtures
+    # (which are not committed) are visible.
+    settings.SENTRY_SCRAPE_JAVASCRIPT_CONCURRENCY = 1
+
     settings.SENTRY_TSDB = 'sentry.tsdb.inmemory.InMemoryTSDB'
     settings.SENTRY_TSDB_OPTIONS = {}
 
@@ -0,0 +1,420 @@
+"""
+sentry.utils.schema_compiler
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Compiles JSON schemas (draft 4) into plain Python validation functions.
+
+``jsonschema`` interprets a schema every time an instance is validated: each
+keyword is looked up in a registry, every error is wrapped in a chain of
+generators and the type of every value is checked through a generic type
+table. For the fixed set of schemas that are used to normalize events that is
+a lot of work that can be done once up front.
+
+A schema is compiled into a tree of closures, one per subschema, with the
+keywords resolved, patterns compiled and type checks reduced to
+``isinstance`` calls. The compiled validator reports the same errors (with
+the same ``path``, ``validator`` and ``schema``) in the same order as
+``jsonschema.Draft4Validator`` does. Schemas using keywords that are not
+supported by the compiler raise ``UnsupportedSchema`` when compiled.
+
+:copyright: (c) 2010-2018 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import numbers
+import re
+import six
+
+from collections import deque
+
+import jsonschema
+
+__all__ = ('CompiledValidator', 'SchemaError', 'UnsupportedSchema', 'compile_schema')
+
+#: Keywords that don't affect validation.
+IGNORED_KEYWORDS = frozenset([
+    'default', 'description', 'title', 'exclusiveMinimum', 'exclusiveMaximum',
+])
+
+
+class UnsupportedSchema(Exception):
+    pass
+
+
+class SchemaError(object):
+    """
+    A validation error. Mirrors the attributes of
+    ``jsonschema.ValidationError`` that are needed to act on an error.
+    """
+    __slots__ = ('path', 'validator', 'schema')
+
+    def __init__(self, validator, schema):
+        self.path = deque()
+        self.validator = validator
+        self.schema = schema
+
+    def __repr__(self):
+        return '<SchemaError: %r at %r>' % (self.validator, list(self.path))
+
+
+def _object(value):
+    return isinstance(value, dict)
+
+
+def _array(value):
+    return isinstance(value, (list, tuple))
+
+
+def _string(value):
+    return isinstance(value, six.string_types)
+
+
+def _number(value):
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+
+def _integer(value):
+    return isinstance(value, six.integer_types) and not isinstance(value, bool)
+
+
+def _boolean(value):
+    return isinstance(value, bool)
+
+
+def _null(value):
+    return value is None
+
+
+TYPE_CHECKS = {
+    'object': _object,
+    'array': _array,
+    'string': _string,
+    'number': _number,
+    'integer': _integer,
+    'boolean': _boolean,
+    'null': _null,
+}
+
+
+def _descend(validate, instance, errors, path):
+    start = len(errors)
+    validate(instance, errors)
+    if len(errors) > start:
+        for error in errors[start:]:
+            error.path.appendleft(path)
+
+
+class SchemaCompiler(object):
+    def __init__(self, format_checker=None):
+        self.format_checker = format_checker
+        self._compiled = {}
+
+    def compile(self, schema):
+        # Subschemas are shared between schemas (and within a schema), only
+        # compile each of them once.
+        key = id(schema)
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            return compiled[1]
+
+        if not isinstance(schema, dict):
+            raise UnsupportedSchema('Schema must be an object: %r' % (schema, ))
+
+        checks = []
+        for keyword, value in six.iteritems(schema):
+            if keyword in IGNORED_KEYWORDS:
+                continue
+            factory = getattr(self, '_compile_%s' % (keyword, ), None)
+            if factory is None:
+                raise UnsupportedSchema('Unsupported keyword: %r' % (keyword, ))
+            check = factory(value, schema)
+            if check is not None:
+                checks.append(check)
+
+        checks = tuple(checks)
+        if not checks:
+            def validate(instance, errors):
+                pass
+        elif len(checks) == 1:
+            validate = checks[0]
+        else:
+            def validate(instance, errors):
+                for check in checks:
+                    check(instance, errors)
+
+        # Keep a reference to the schema, so that its id isn't reused.
+        self._compiled[key] = (schema, validate)
+        return validate
+
+    def _compile_type(self, types, schema):
+        if isinstance(types, six.string_types):
+            types = [types]
+        try:
+            type_checks = tuple(TYPE_CHECKS[t] for t in types)
+        except KeyError as e:
+            raise UnsupportedSchema('Unknown type: %s' % (e, ))
+
+        if len(type_checks) == 1:
+            is_type = type_checks[0]
+        else:
+            def is_type(instance):
+                for type_check in type_checks:
+                    if type_check(instance):
+                        return True
+                return False
+
+        def check(instance, errors):
+            if not is_type(instance):
+                errors.append(SchemaError('type', schema))
+        return check
+
+    def _compile_properties(self, properties, schema):
+        properties = tuple(
+            (name, self.compile(subschema))
+            for name, subschema in six.iteritems(properties)
+        )
+
+        def check(instance, errors):
+            if not isinstance(instance, dict):
+                return
+            for name, validate in properties:
+                if name in instance:
+                    _descend(validate, instance[name], errors, name)
+        return check
+
+    def _compile_patternProperties(self, pattern_properties, schema):
+        pattern_properties = tuple(
+            (re.compile(pattern).search, self.compile(subschema))
+            for pattern, subschema in six.iteritems(pattern_properties)
+        )
+
+        def check(instance, errors):
+            if not isinstance(instance, dict):
+                return
+            for search, validate in pattern_properties:
+                for name, value in six.iteritems(instance):
+                    if search(name):
+                        _descend(validate, value, errors, name)
+        return check
+
+    def _compile_additionalProperties(self, additional, schema):
+        properties = schema.get('properties', {})
+        patterns = '|'.join(schema.get('patternProperties', {}))
+        search = re.compile(patterns).search if patterns else None
+
+        def get_extras(instance):
+            extras = set()
+            for name in instance:
+                if name not in properties and not (search and search(name)):
+                    extras.add(name)
+            return extras
+
+        if isinstance(additional, dict):
+            validate = self.compile(additional)
+
+            def check(instance, errors):
+                if not isinstance(instance, dict):
+                    return
+                for name in get_extras(instance):
+                    _descend(validate, instance[name], errors, name)
+            return check
+
+        if additional:
+            return None
+
+        def check(instance, errors):
+            if isinstance(instance, dict) and get_extras(instance):
+                errors.append(SchemaError('additionalProperties', schema))
+        return check
+
+    def _compile_required(self, required, schema):
+        required = tuple(required)
+
+        def check(instance, errors):
+            if not isinstance(instance, dict):
+                return
+            for name in required:
+                if name not in instance:
+                    errors.append(SchemaError('required', schema))
+        return check
+
+    def _compile_minProperties(self, limit, schema):
+        def check(instance, errors):
+            if isinstance(instance, dict) and len(instance) < limit:
+                errors.append(SchemaError('minProperties', schema))
+        return check
+
+    def _compile_maxProperties(self, limit, schema):
+        def check(instance, errors):
+            if isinstance(instance, dict) and len(instance) > limit:
+                errors.append(SchemaError('maxProperties', schema))
+        return check
+
+    def _compile_items(self, items, schema):
+        if isinstance(items, dict):
+            validate = self.compile(items)
+
+            def check(instance, errors):
+                if not isinstance(instance, (list, tuple)):
+                    return
+                for index, item in enumerate(instance):
+                    _descend(validate, item, errors, index)
+            return check
+
+        item_validators = tuple(self.compile(subschema) for subschema in items)
+
+        def check(instance, errors):
+            if not isinstance(instance, (list, tuple)):
+                return
+            for index, (item, validate) in enumerate(zip(instance, item_validators)):
+                _descend(validate, item, errors, index)
+        return check
+
+    def _compile_minItems(self, limit, schema):
+        def check(instance, errors):
+            if isinstance(instance, (list, tuple)) and len(instance) < limit:
+                errors.append(SchemaError('minItems', schema))
+        return check
+
+    def _compile_maxItems(self, limit, schema):
+        def check(instance, errors):
+            if isinstance(instance, (list, tuple)) and len(instance) > limit:
+                errors.append(SchemaError('maxItems', schema))
+        return check
+
+    def _compile_minLength(self, limit, schema):
+        def check(instance, errors):
+            if isinstance(instance, six.string_types) and len(instance) < limit:
+                errors.append(SchemaError('minLength', schema))
+        return check
+
+    def _compile_maxLength(self, limit, schema):
+        def check(instance, errors):
+            if isinstance(instance, six.string_types) and len(instance) > limit:
+                errors.append(SchemaError('maxLength', schema))
+        return check
+
+    def _compile_pattern(self, pattern, schema):
+        search = re.compile(pattern).search
+
+        def check(instance, errors):
+            if isinstance(instance, six.string_types) and not search(instance):
+                errors.append(SchemaError('pattern', schema))
+        return check
+
+    def _compile_minimum(self, limit, schema):
+        exclusive = schema.get('exclusiveMinimum', False)
+
+        def check(instance, errors):
+            if not _number(instance):
+                return
+            if (instance <= limit) if exclusive else (instance < limit):
+                errors.append(SchemaError('minimum', schema))
+        return check
+
+    def _compile_maximum(self, limit, schema):
+        exclusive = schema.get('exclusiveMaximum', False)
+
+        def check(instance, errors):
+            if not _number(instance):
+                return
+            if (instance >= limit) if exclusive else (instance > limit):
+                errors.append(SchemaError('maximum', schema))
+        return check
+
+    def _compile_enum(self, enum, schema):
+        enum = list(enum)
+        try:
+            choices = frozenset(enum)
+        except TypeError:
+            choices = None
+
+        def check(instance, errors):
+            if choices is not None:
+                try:
+                    if instance in choices:
+                        return
+                except TypeError:
+                    # Unhashable values are compared one by one below.
+                    pass
+            if instance not in enum:
+                errors.append(SchemaError('enum', schema))
+        return check
+
+    def _compile_format(self, format, schema):
+        format_checker = self.format_checker
+        if format_checker is None:
+            return None
+
+        def check(instance, errors):
+            if not format_checker.conforms(instance, format):
+                errors.append(SchemaError('format', schema))
+        return check
+
+    def _compile_anyOf(self, subschemas, schema):
+        validators = tuple(self.compile(subschema) for subschema in subschemas)
+
+        def check(instance, errors):
+            for validate in validators:
+                scratch = []
+                validate(instance, scratch)
+                if not scratch:
+                    return
+            errors.append(SchemaError('anyOf', schema))
+        return check
+
+    def _compile_allOf(self, subschemas, schema):
+        validators = tuple(self.compile(subschema) for subschema in subschemas)
+
+        def check(instance, errors):
+            for validate in validators:
+                validate(instance, errors)
+        return check
+
+    def _compile_not(self, subschema, schema):
+        validate = self.compile(subschema)
+
+        def check(instance, errors):
+            scratch = []
+            validate(instance, scratch)
+            if not scratch:
+                errors.append(SchemaError('not', schema))
+        return check
+
+
+class CompiledValidator(object):
+    """
+    A drop-in replacement for ``jsonschema.Draft4Validator`` (as far as
+    ``iter_errors`` and ``is_valid`` are concerned) for a compiled schema.
+    Arrays may be lists or tuples.
+    """
+
+    def __init__(self, schema, format_checker=None):
+        self.schema = schema
+        self._validate = SchemaCompiler(format_checker).compile(schema)
+
+    def iter_errors(self, instance):
+        errors = []
+        self._validate(instance, errors)
+        return iter(errors)
+
+    def is_valid(self, instance):
+        errors = []
+        self._validate(instance, errors)
+        return not errors
+
+
+def compile_schema(schema, format_checker=None):
+    """
+    Compile ``schema`` into a ``CompiledValidator``, falling back to
+    ``jsonschema.Draft4Validator`` if the schema can't be compiled.
+    """
+    try:
+        return CompiledValidator(schema, format_checker=format_checker)
+    except UnsupportedSchema:
+        return jsonschema.Draft4Validator(
+            schema,
+            types={'array': (list, tuple)},
+            format_checker=format_checker,
+        )
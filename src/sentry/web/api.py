@@ -10,6 +10,7 @@ import six
 import traceback
 import uuid
 
+from collections import defaultdict
 from time import time
 
 from django.conf import settings
@@ -31,19 +32,19 @@ from symbolic import ProcessMinidumpError
 from sentry import features, quotas, tsdb
 from sentry.attachments import CachedAttachment
 from sentry.coreapi import (
-    APIError, APIForbidden, APIRateLimited, ClientApiHelper, SecurityApiHelper, LazyData,
-    MinidumpApiHelper,
+    APIError, APIForbidden, APIPayloadTooLarge, APIRateLimited, ClientApiHelper,
+    SecurityApiHelper, LazyData, MinidumpApiHelper,
 )
 from sentry.interfaces import schemas
 from sentry.interfaces.base import get_interface
 from sentry.lang.native.utils import merge_minidump_event
-from sentry.models import Project, OrganizationOption, Organization
+from sentry.ingest_config import get_ingest_config
+from sentry.models import Project, Organization
 from sentry.signals import (
     event_accepted, event_dropped, event_filtered, event_received)
 from sentry.quotas.base import RateLimit
 from sentry.utils import json, metrics
 from sentry.utils.data_filters import FILTER_STAT_KEYS_TO_VALUES
-from sentry.utils.data_scrubber import SensitiveDataFilter
 from sentry.utils.dates import to_datetime
 from sentry.utils.http import (
     is_valid_origin,
@@ -205,7 +206,7 @@ class APIView(BaseView):
             # This check is specific for clients who need CORS support
             if not project:
                 raise APIError('Client must be upgraded for CORS support')
-            if not is_valid_origin(origin, project):
+            if not get_ingest_config(project).is_valid_origin(origin):
                 tsdb.incr(tsdb.models.project_total_received_cors,
                           project.id)
                 raise APIForbidden('Invalid origin: %s' % (origin, ))
@@ -354,39 +355,11 @@ class StoreView(APIView):
         )
         start_time = time()
         tsdb_start_time = to_datetime(start_time)
-        should_filter, filter_reason = helper.should_filter(
-            project, data, ip_address=remote_addr)
-        if should_filter:
-            increment_list = [
-                (tsdb.models.project_total_received, project.id),
-                (tsdb.models.project_total_blacklisted, project.id),
-                (tsdb.models.organization_total_received,
-                 project.organization_id),
-                (tsdb.models.organization_total_blacklisted,
-                 project.organization_id),
-                (tsdb.models.key_total_received, key.id),
-                (tsdb.models.key_total_blacklisted, key.id),
-            ]
-            try:
-                increment_list.append(
-                    (FILTER_STAT_KEYS_TO_VALUES[filter_reason], project.id))
-            # should error when filter_reason does not match a key in FILTER_STAT_KEYS_TO_VALUES
-            except KeyError:
-                pass
 
-            tsdb.incr_multi(
-                increment_list,
-                timestamp=tsdb_start_time,
-            )
+        def incr(increment_list):
+            tsdb.incr_multi(increment_list, timestamp=tsdb_start_time)
 
-            metrics.incr('events.blacklisted', tags={
-                         'reason': filter_reason})
-            event_filtered.send_robust(
-                ip=remote_addr,
-                project=project,
-                sender=type(self),
-            )
-            raise APIForbidden('Event dropped due to filter: %s' % (filter_reason,))
+        self.apply_filters(project, key, helper, data, remote_addr, incr)
 
         # TODO: improve this API (e.g. make RateLimit act on __ne__)
         rate_limit = safe_execute(
@@ -395,25 +368,109 @@ class StoreView(APIView):
         if isinstance(rate_limit, bool):
             rate_limit = RateLimit(is_limited=rate_limit, retry_after=None)
 
+        self.apply_rate_limit(project, key, helper, rate_limit, remote_addr, incr)
+
+        event_id = data['event_id']
+
+        # TODO(dcramer): ideally we'd only validate this if the event_id was
+        # supplied by the user
+        cache_key = 'ev:%s:%s' % (project.id, event_id, )
+
+        if cache.get(cache_key) is not None:
+            raise APIForbidden(
+                'An event with the same ID already exists (%s)' % (event_id, ))
+
+        config = get_ingest_config(project)
+
+        if config.data_filter is not None:
+            # We filter data immediately before it ever gets into the queue
+            config.data_filter.apply(data)
+
+        if config.scrub_ip_address:
+            # We filter data immediately before it ever gets into the queue
+            helper.ensure_does_not_have_ip(data)
+
+        # mutates data (strips a lot of context if not queued)
+        helper.insert_data_to_database(data, start_time=start_time, attachments=attachments)
+
+        cache.set(cache_key, '', 60 * 5)
+
+        helper.log.debug('New event received (%s)', event_id)
+
+        event_accepted.send_robust(
+            ip=remote_addr,
+            data=data,
+            project=project,
+            sender=type(self),
+        )
+
+        return event_id
+
+    def apply_filters(self, project, key, helper, data, remote_addr, incr):
+        """
+        Raises ``APIForbidden`` if ``data`` is dropped by the inbound filters
+        of ``project``.
+
+        The TSDB outcomes of a filtered event are passed to ``incr`` as a
+        list of ``(model, key)`` pairs.
+        """
+        should_filter, filter_reason = helper.should_filter(
+            project, data, ip_address=remote_addr)
+        if not should_filter:
+            return
+
+        increment_list = [
+            (tsdb.models.project_total_received, project.id),
+            (tsdb.models.project_total_blacklisted, project.id),
+            (tsdb.models.organization_total_received,
+             project.organization_id),
+            (tsdb.models.organization_total_blacklisted,
+             project.organization_id),
+            (tsdb.models.key_total_received, key.id),
+            (tsdb.models.key_total_blacklisted, key.id),
+        ]
+        try:
+            increment_list.append(
+                (FILTER_STAT_KEYS_TO_VALUES[filter_reason], project.id))
+        # should error when filter_reason does not match a key in FILTER_STAT_KEYS_TO_VALUES
+        except KeyError:
+            pass
+
+        incr(increment_list)
+
+        metrics.incr('events.blacklisted', tags={
+                     'reason': filter_reason})
+        event_filtered.send_robust(
+            ip=remote_addr,
+            project=project,
+            sender=type(self),
+        )
+        raise APIForbidden('Event dropped due to filter: %s' % (filter_reason,))
+
+    def apply_rate_limit(self, project, key, helper, rate_limit, remote_addr, incr):
+        """
+        Records the outcome of the quota check ``rate_limit`` for an event
+        and raises ``APIRateLimited`` if the event must be rejected.
+
+        The TSDB outcomes are passed to ``incr`` as a list of ``(model, key)``
+        pairs.
+        """
         # XXX(dcramer): when the rate limiter fails we drop events to ensure
         # it cannot cascade
         if rate_limit is None or rate_limit.is_limited:
             if rate_limit is None:
                 helper.log.debug(
                     'Dropped event due to error with rate limiter')
-            tsdb.incr_multi(
-                [
-                    (tsdb.models.project_total_received, project.id),
-                    (tsdb.models.project_total_rejected, project.id),
-                    (tsdb.models.organization_total_received,
-                     project.organization_id),
-                    (tsdb.models.organization_total_rejected,
-                     project.organization_id),
-                    (tsdb.models.key_total_received, key.id),
-                    (tsdb.models.key_total_rejected, key.id),
-                ],
-                timestamp=tsdb_start_time,
-            )
+            incr([
+                (tsdb.models.project_total_received, project.id),
+                (tsdb.models.project_total_rejected, project.id),
+                (tsdb.models.organization_total_received,
+                 project.organization_id),
+                (tsdb.models.organization_total_rejected,
+                 project.organization_id),
+                (tsdb.models.key_total_received, key.id),
+                (tsdb.models.key_total_rejected, key.id),
+            ])
             metrics.incr(
                 'events.dropped',
                 tags={
@@ -429,76 +486,192 @@ class StoreView(APIView):
             if rate_limit is not None:
                 raise APIRateLimited(rate_limit.retry_after)
         else:
-            tsdb.incr_multi(
-                [
-                    (tsdb.models.project_total_received, project.id),
-                    (tsdb.models.organization_total_received,
-                     project.organization_id),
-                    (tsdb.models.key_total_received, key.id),
-                ],
-                timestamp=tsdb_start_time,
-            )
+            incr([
+                (tsdb.models.project_total_received, project.id),
+                (tsdb.models.organization_total_received,
+                 project.organization_id),
+                (tsdb.models.key_total_received, key.id),
+            ])
 
-        org_options = OrganizationOption.objects.get_all_values(
-            project.organization_id)
 
-        event_id = data['event_id']
+class BatchStoreView(StoreView):
+    """
+    Stores many events that were submitted in a single request.
 
-        # TODO(dcramer): ideally we'd only validate this if the event_id was
-        # supplied by the user
-        cache_key = 'ev:%s:%s' % (project.id, event_id, )
+    The body contains one JSON encoded event per line and may be compressed
+    as a whole. Authentication, rate limiting, outcome counting, duplicate
+    detection and queueing are performed once for the entire batch instead
+    of once per event. The response lists the result of each event in the
+    order they were submitted.
+    """
+    http_method_names = ['post', 'options']
 
-        if cache.get(cache_key) is not None:
-            raise APIForbidden(
-                'An event with the same ID already exists (%s)' % (event_id, ))
+    def post(self, request, **kwargs):
+        try:
+            data = request.body
+        except Exception as e:
+            logger.exception(e)
+            data = None
 
-        scrub_ip_address = (org_options.get('sentry:require_scrub_ip_address', False) or
-                            project.get_option('sentry:scrub_ip_address', False))
-        scrub_data = (org_options.get('sentry:require_scrub_data', False) or
-                      project.get_option('sentry:scrub_data', True))
+        if pubsub is not None and data is not None:
+            pubsub.publish('requests', data)
 
-        if scrub_data:
-            # We filter data immediately before it ever gets into the queue
-            sensitive_fields_key = 'sentry:sensitive_fields'
-            sensitive_fields = (
-                org_options.get(sensitive_fields_key, []) +
-                project.get_option(sensitive_fields_key, [])
+        results = self.process_batch(request, data=data, **kwargs)
+        return HttpResponse(
+            json.dumps({
+                'events': results,
+            }), content_type='application/json'
+        )
+
+    def split_batch(self, helper, data, content_encoding):
+        max_size = settings.SENTRY_STORE_BATCH_MAX_SIZE
+        if content_encoding == 'gzip':
+            data = helper.decompress_gzip(data, max_size=max_size)
+        elif content_encoding == 'deflate':
+            data = helper.decompress_deflate(data, max_size=max_size)
+        elif len(data) > max_size:
+            raise APIPayloadTooLarge()
+        else:
+            data = helper.decode_data(data)
+
+        items = [line for line in (line.strip() for line in data.splitlines()) if line]
+        if len(items) > settings.SENTRY_STORE_BATCH_MAX_EVENTS:
+            raise APIError('Too many events in a single batch (maximum is %d)' % (
+                settings.SENTRY_STORE_BATCH_MAX_EVENTS, ))
+        return items
+
+    def process_batch(self, request, project, key, auth, helper, data, **kwargs):
+        if not data:
+            raise APIError('No JSON data was found')
+
+        items = self.split_batch(
+            helper, data, request.META.get('HTTP_CONTENT_ENCODING', ''))
+        if not items:
+            raise APIError('No JSON data was found')
+
+        metrics.incr('events.total', amount=len(items))
+
+        remote_addr = request.META['REMOTE_ADDR']
+        start_time = time()
+        tsdb_start_time = to_datetime(start_time)
+
+        results = [None] * len(items)
+        counters = defaultdict(int)
+
+        def incr(increment_list):
+            for item in increment_list:
+                counters[item] += 1
+
+        def reject(index, error):
+            results[index] = {'error': six.text_type(error)}
+            if error.name:
+                results[index]['error_name'] = error.name
+
+        pending = []
+        for index, item in enumerate(items):
+            data = LazyData(
+                data=item,
+                content_encoding='',
+                helper=helper,
+                project=project,
+                key=key,
+                auth=auth,
+                client_ip=remote_addr,
+            )
+
+            event_received.send_robust(
+                ip=remote_addr,
+                project=project,
+                sender=type(self),
             )
 
-            exclude_fields_key = 'sentry:safe_fields'
-            exclude_fields = (
-                org_options.get(exclude_fields_key, []) +
-                project.get_option(exclude_fields_key, [])
+            try:
+                self.apply_filters(project, key, helper, data, remote_addr, incr)
+            except APIError as e:
+                reject(index, e)
+                continue
+
+            pending.append((index, data))
+
+        # A single quota check covers every event that passed the filters.
+        rate_limits = None
+        if pending:
+            rate_limits = safe_execute(
+                quotas.is_rate_limited_batch, project=project, key=key,
+                quantity=len(pending), _with_transaction=False
             )
 
-            scrub_defaults = (org_options.get('sentry:require_scrub_defaults', False) or
-                              project.get_option('sentry:scrub_defaults', True))
+        accepted = []
+        for position, (index, data) in enumerate(pending):
+            rate_limit = rate_limits[position] if rate_limits is not None else None
+            if isinstance(rate_limit, bool):
+                rate_limit = RateLimit(is_limited=rate_limit, retry_after=None)
 
-            SensitiveDataFilter(
-                fields=sensitive_fields,
-                include_defaults=scrub_defaults,
-                exclude_fields=exclude_fields,
-            ).apply(data)
+            try:
+                self.apply_rate_limit(project, key, helper, rate_limit, remote_addr, incr)
+            except APIRateLimited as e:
+                reject(index, e)
+                continue
 
-        if scrub_ip_address:
-            # We filter data immediately before it ever gets into the queue
-            helper.ensure_does_not_have_ip(data)
+            accepted.append((index, data))
+
+        if counters:
+            tsdb.incr_multi(
+                [(model, model_key, value) for (model, model_key), value in six.iteritems(counters)],
+                timestamp=tsdb_start_time,
+            )
+
+        if not accepted:
+            return results
+
+        # TODO(dcramer): ideally we'd only validate this if the event_id was
+        # supplied by the user
+        cache_keys = {
+            index: 'ev:%s:%s' % (project.id, data['event_id'], ) for index, data in accepted
+        }
+        existing = set(cache.get_many(list(cache_keys.values())))
+
+        config = get_ingest_config(project)
+
+        queued = []
+        for index, data in accepted:
+            event_id = data['event_id']
+            cache_key = cache_keys[index]
+            if cache_key in existing:
+                reject(index, APIForbidden(
+                    'An event with the same ID already exists (%s)' % (event_id, )))
+                continue
+            existing.add(cache_key)
+
+            if config.data_filter is not None:
+                # We filter data immediately before it ever gets into the queue
+                config.data_filter.apply(data)
+
+            if config.scrub_ip_address:
+                # We filter data immediately before it ever gets into the queue
+                helper.ensure_does_not_have_ip(data)
+
+            queued.append((index, data))
 
         # mutates data (strips a lot of context if not queued)
-        helper.insert_data_to_database(data, start_time=start_time, attachments=attachments)
+        helper.insert_data_batch_to_database(
+            [data for _, data in queued], start_time=start_time)
 
-        cache.set(cache_key, '', 60 * 5)
+        cache.set_many({cache_keys[index]: '' for index, _ in queued}, 60 * 5)
 
-        helper.log.debug('New event received (%s)', event_id)
+        for index, data in queued:
+            helper.log.debug('New event received (%s)', data['event_id'])
 
-        event_accepted.send_robust(
-            ip=remote_addr,
-            data=data,
-            project=project,
-            sender=type(self),
-        )
+            event_accepted.send_robust(
+                ip=remote_addr,
+                data=data,
+                project=project,
+                sender=type(self),
+            )
 
-        return event_id
+            results[index] = {'id': data['event_id']}
+
+        return results
 
 
 class MinidumpView(StoreView):
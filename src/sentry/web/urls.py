@@ -98,6 +98,11 @@ urlpatterns += patterns(
     '',
     # Store endpoints first since they are the most active
     url(r'^api/store/$', api.StoreView.as_view(), name='sentry-api-store'),
+    url(
+        r'^api/(?P<project_id>[\w_-]+)/store/batch/$',
+        api.BatchStoreView.as_view(),
+        name='sentry-api-store-batch'
+    ),
     url(
         r'^api/(?P<project_id>[\w_-]+)/store/$',
         api.StoreView.as_view(),
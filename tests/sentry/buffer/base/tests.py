@@ -66,3 +66,38 @@ class BufferTest(TestCase):
         self.buf.process(ReleaseProject, columns, filters)
         release_project_ = ReleaseProject.objects.get(id=release_project.id)
         assert release_project_.new_groups == 1
+
+    def test_process_batch_saves_data(self):
+        group = Group.objects.create(project=Project(id=1))
+        other = Group.objects.create(project=Project(id=1))
+        # strip micrseconds because MySQL doesn't seem to handle them correctly
+        the_date = (timezone.now() + timedelta(days=5)).replace(microsecond=0)
+        self.buf.process_batch([
+            (Group, {'times_seen': 1}, {'id': group.id}, {'last_seen': the_date}),
+            (Group, {'times_seen': 3}, {'id': other.id}, {'last_seen': the_date}),
+        ])
+        group_ = Group.objects.get(id=group.id)
+        assert group_.times_seen == group.times_seen + 1
+        assert group_.last_seen.replace(microsecond=0) == the_date
+        assert Group.objects.get(id=other.id).times_seen == other.times_seen + 3
+
+    def test_process_batch_saves_data_without_existing_row(self):
+        group = Group.objects.create(project=Project(id=1), message='foo')
+        self.buf.process_batch([
+            (Group, {'times_seen': 1}, {'message': 'foo', 'project_id': 1}, None),
+            (Group, {'times_seen': 1}, {'message': 'bar', 'project_id': 1}, None),
+        ])
+        assert Group.objects.get(id=group.id).times_seen == group.times_seen + 1
+        # the default value for times_seen is 1, so we actually end up
+        # incrementing it to 2 here
+        assert Group.objects.get(message='bar').times_seen == 2
+
+    @mock.patch('sentry.buffer.base.buffer_incr_complete')
+    def test_process_batch_sends_signal(self, buffer_incr_complete):
+        group = Group.objects.create(project=Project(id=1))
+        other = Group.objects.create(project=Project(id=1))
+        self.buf.process_batch([
+            (Group, {'times_seen': 1}, {'id': group.id}, None),
+            (Group, {'times_seen': 1}, {'id': other.id}, None),
+        ])
+        assert buffer_incr_complete.send_robust.call_count == 2
@@ -3,9 +3,12 @@
 from __future__ import absolute_import
 
 import mock
+import threading
+
+from django.utils import timezone
 
 from sentry.buffer.redis import RedisBuffer
-from sentry.models import Group, Project
+from sentry.models import Group, Project, Release, ReleaseProject
 from sentry.testutils import TestCase
 
 
@@ -53,6 +56,37 @@ class RedisBufferTest(TestCase):
         client = self.buf.cluster.get_routing_client()
         assert client.zrange('b:p', 0, -1) == []
 
+    @mock.patch('sentry.buffer.redis.process_incr')
+    def test_process_pending_in_chunks(self, process_incr):
+        self.buf.incr_batch_size = 2
+        self.buf.pending_chunk_size = 1
+        with self.buf.cluster.map() as client:
+            client.zadd('b:p', 3, 'baz')
+            client.zadd('b:p', 1, 'foo')
+            client.zadd('b:p', 2, 'bar')
+        self.buf.process_pending()
+        assert process_incr.apply_async.mock_calls == [
+            mock.call(kwargs={'batch_keys': ['foo', 'bar']}),
+            mock.call(kwargs={'batch_keys': ['baz']}),
+        ]
+        client = self.buf.cluster.get_routing_client()
+        assert client.zrange('b:p', 0, -1) == []
+
+    @mock.patch('sentry.buffer.redis.process_incr')
+    def test_process_pending_defers_past_time_limit(self, process_incr):
+        self.buf.incr_batch_size = 5
+        self.buf.pending_chunk_size = 1
+        self.buf.pending_time_limit = 0
+        with self.buf.cluster.map() as client:
+            client.zadd('b:p', 1, 'foo')
+            client.zadd('b:p', 2, 'bar')
+        self.buf.process_pending()
+        process_incr.apply_async.assert_called_once_with(kwargs={
+            'batch_keys': ['foo'],
+        })
+        client = self.buf.cluster.get_routing_client()
+        assert client.zrange('b:p', 0, -1) == ['bar']
+
     @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
     @mock.patch('sentry.buffer.base.Buffer.process')
     def test_process_does_bubble_up(self, process):
@@ -100,6 +134,178 @@ class RedisBufferTest(TestCase):
         pending = client.zrange('b:p', 0, -1)
         assert pending == ['foo']
 
+    @mock.patch('sentry.buffer.base.Buffer.process_batch')
+    def test_process_batch_does_bubble_up(self, process_batch):
+        buf = RedisBuffer(bulk_process=True)
+        client = buf.cluster.get_routing_client()
+        for key, pk in (('foo', "I1"), ('bar', "I2")):
+            client.hmset(
+                key, {
+                    'e+foo': "S'bar'\np1\n.",
+                    'f': "(dp1\nS'pk'\np2\n%s\ns." % pk,
+                    'i+times_seen': '2',
+                    'm': 'sentry.models.Group',
+                }
+            )
+        buf.process(batch_keys=['foo', 'bar', 'baz'])
+        process_batch.assert_called_once_with([
+            (Group, {'times_seen': 2}, {'pk': 1}, {'foo': 'bar'}),
+            (Group, {'times_seen': 2}, {'pk': 2}, {'foo': 'bar'}),
+        ])
+        assert client.hgetall('foo') == {}
+        assert client.get('l:foo') is None
+
+    def test_process_batch_creates_missing_rows(self):
+        buf = RedisBuffer(bulk_process=True)
+        group_1 = self.create_group(times_seen=1)
+        group_2 = self.create_group(times_seen=1)
+        release = Release.objects.create(
+            version='a' * 40,
+            organization_id=self.project.organization_id,
+        )
+
+        buf.incr(Group, {'times_seen': 1}, {'pk': group_1.id})
+        buf.incr(Group, {'times_seen': 2}, {'pk': group_2.id})
+        buf.incr(ReleaseProject, {'new_groups': 1}, {
+            'project_id': self.project.id,
+            'release_id': release.id,
+        })
+
+        batch_keys = [
+            buf._make_key(Group, {'pk': group_1.id}),
+            buf._make_key(Group, {'pk': group_2.id}),
+            buf._make_key(ReleaseProject, {
+                'project_id': self.project.id,
+                'release_id': release.id,
+            }),
+        ]
+        buf.process(batch_keys=batch_keys)
+
+        assert Group.objects.get(id=group_1.id).times_seen == 2
+        assert Group.objects.get(id=group_2.id).times_seen == 3
+        assert ReleaseProject.objects.get(
+            project=self.project,
+            release=release,
+        ).new_groups == 1
+
+    @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
+    @mock.patch('sentry.buffer.base.Buffer.process')
+    def test_incr_with_msgpack_codec(self, process):
+        buf = RedisBuffer(codec='sentry.utils.codecs.MsgpackCodec')
+        client = buf.cluster.get_routing_client()
+        the_date = timezone.now()
+        buf.incr(Group, {'times_seen': 1}, {'pk': 1}, extra={'last_seen': the_date})
+        assert client.hget('foo', 'f').startswith(b'\x00\x01')
+        buf.process('foo')
+        process.assert_called_once_with(Group, {'times_seen': 1}, {'pk': 1}, {
+            'last_seen': the_date,
+        })
+
+    @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
+    def test_incr_coalesces_until_flush(self):
+        buf = RedisBuffer(coalesce_window=60)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = 'Mock'
+        filters = {'pk': 1}
+        buf.incr(model, {'times_seen': 1}, filters, extra={'foo': 'bar'})
+        buf.incr(model, {'times_seen': 2}, filters, extra={'foo': 'baz'})
+        assert client.hgetall('foo') == {}
+
+        buf.flush()
+        assert client.hgetall('foo') == {
+            'e+foo': "S'baz'\np1\n.",
+            'f': "(dp1\nS'pk'\np2\nI1\ns.",
+            'i+times_seen': '3',
+            'm': 'mock.mock.Mock',
+        }
+        assert client.zrange('b:p', 0, -1) == ['foo']
+
+    @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
+    def test_incr_coalesce_restored_when_flush_fails(self):
+        buf = RedisBuffer(coalesce_window=60)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = 'Mock'
+        filters = {'pk': 1}
+        buf.incr(model, {'times_seen': 1}, filters, extra={'foo': 'bar'})
+
+        failing_client = mock.Mock()
+        failing_client.pipeline.return_value.execute.side_effect = Exception('boom')
+        with mock.patch.object(buf.cluster, 'get_local_client', return_value=failing_client):
+            with self.assertRaises(Exception):
+                buf.flush()
+        assert client.hgetall('foo') == {}
+
+        buf.incr(model, {'times_seen': 2}, filters, extra={'foo': 'baz'})
+        buf.flush()
+        assert client.hget('foo', 'i+times_seen') == '3'
+        assert client.hget('foo', 'e+foo') == "S'baz'\np1\n."
+
+    @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
+    def test_incr_coalesce_flushes_when_full(self):
+        buf = RedisBuffer(coalesce_window=60, coalesce_max_keys=1)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = 'Mock'
+        buf.incr(model, {'times_seen': 1}, {'pk': 1})
+        assert client.hget('foo', 'i+times_seen') == '1'
+
+    @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
+    def test_incr_coalesce_resets_once_after_fork(self):
+        buf = RedisBuffer(coalesce_window=60)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = 'Mock'
+        buf.incr(model, {'times_seen': 1}, {'pk': 1})
+
+        # Pretend the buffer was set up by a parent process.
+        buf._coalesce_pid = -1
+        threads = [
+            threading.Thread(target=buf.incr, args=(model, {'times_seen': 1}, {'pk': 1}))
+            for _ in range(8)
+        ]
+        with mock.patch('sentry.buffer.redis.threading.Thread') as Thread:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert Thread.call_count == 1
+
+        buf.flush()
+        assert client.hget('foo', 'i+times_seen') == '8'
+
+    def test_incr_many(self):
+        client = self.buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = 'Mock'
+        self.buf.incr_many([
+            (model, {'times_seen': 1}, {'pk': 1}, {'foo': 'bar'}),
+            (model, {'times_seen': 2}, {'pk': 2}, None),
+            (model, {'times_seen': 3}, {'pk': 1}, None),
+        ])
+        key1 = self.buf._make_key(model, {'pk': 1})
+        key2 = self.buf._make_key(model, {'pk': 2})
+        assert client.hget(key1, 'i+times_seen') == '4'
+        assert client.hget(key1, 'e+foo') == "S'bar'\np1\n."
+        assert client.hget(key2, 'i+times_seen') == '2'
+        assert sorted(client.zrange('b:p', 0, -1)) == sorted([key1, key2])
+
+    @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
+    def test_incr_many_coalesces_until_flush(self):
+        buf = RedisBuffer(coalesce_window=60)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = 'Mock'
+        buf.incr_many([
+            (model, {'times_seen': 1}, {'pk': 1}, None),
+            (model, {'times_seen': 2}, {'pk': 1}, None),
+        ])
+        assert client.hgetall('foo') == {}
+
+        buf.flush()
+        assert client.hget('foo', 'i+times_seen') == '3'
+
     @mock.patch('sentry.buffer.redis.RedisBuffer._make_key', mock.Mock(return_value='foo'))
     @mock.patch('sentry.buffer.redis.process_incr')
     @mock.patch('sentry.buffer.redis.process_pending')
@@ -23,3 +23,11 @@ class RedisCacheTest(TestCase):
 
         with self.assertRaises(ValueTooLarge):
             self.backend.set('foo', 'x' * (RedisCache.max_size + 1), 0)
+
+    def test_get_set_many(self):
+        self.backend.set_many({'foo': {'foo': 'bar'}, 'bar': [1, 2]}, 50)
+
+        result = self.backend.get_many(['foo', 'bar', 'baz'])
+        assert result == {'foo': {'foo': 'bar'}, 'bar': [1, 2]}
+
+        assert self.backend.get_many([]) == {}
@@ -4,8 +4,10 @@ from __future__ import absolute_import
 
 from datetime import datetime, timedelta
 from functools import partial
+import base64
 import six
 import mock
+import zlib
 import pytest
 
 from django.core.exceptions import SuspiciousOperation
@@ -14,6 +16,7 @@ from uuid import UUID
 
 from sentry.coreapi import (
     APIError,
+    APIPayloadTooLarge,
     APIUnauthorized,
     Auth,
     ClientApiHelper,
@@ -590,6 +593,54 @@ class SafelyLoadJSONStringTest(BaseAPITest):
         with self.assertRaises(APIError):
             self.helper.safely_load_json_string('1')
 
+    def test_max_depth(self):
+        data = self.helper.safely_load_json_string(
+            '{"foo": [[{"bar": "[[[[[[[["}]]]}', max_depth=4)
+        assert data == {'foo': [[{'bar': '[[[[[[[['}]]}
+
+        with self.assertRaises(APIError):
+            self.helper.safely_load_json_string('{"foo": [[[[{}]]]]}', max_depth=4)
+
+
+class DecompressTest(BaseAPITest):
+    payload = b'{"message": "%s"}' % (b'a' * 1000, )
+
+    def gzip(self, value):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(value) + compressor.flush()
+
+    def test_gzip(self):
+        data = self.helper.decompress_gzip(self.gzip(self.payload))
+        assert data == self.payload.decode('utf-8')
+
+        with self.assertRaises(APIPayloadTooLarge):
+            self.helper.decompress_gzip(self.gzip(self.payload), max_size=100)
+
+        with self.assertRaises(APIError):
+            self.helper.decompress_gzip(b'garbage')
+
+    def test_deflate(self):
+        data = self.helper.decompress_deflate(zlib.compress(self.payload))
+        assert data == self.payload.decode('utf-8')
+
+        with self.assertRaises(APIPayloadTooLarge):
+            self.helper.decompress_deflate(zlib.compress(self.payload), max_size=100)
+
+        with self.assertRaises(APIError):
+            self.helper.decompress_deflate(b'garbage')
+
+    def test_decode_and_decompress(self):
+        data = self.helper.decode_and_decompress_data(
+            base64.b64encode(zlib.compress(self.payload)))
+        assert data == self.payload.decode('utf-8')
+
+        data = self.helper.decode_and_decompress_data(base64.b64encode(self.payload))
+        assert data == self.payload.decode('utf-8')
+
+        with self.assertRaises(APIPayloadTooLarge):
+            self.helper.decode_and_decompress_data(
+                base64.b64encode(zlib.compress(self.payload)), max_size=100)
+
 
 class DecodeDataTest(BaseAPITest):
     def test_valid_data(self):
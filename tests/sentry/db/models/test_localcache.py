@@ -0,0 +1,100 @@
+from __future__ import absolute_import
+
+import mock
+import time
+
+from sentry.db.models.localcache import InvalidationChannel, LocalCache
+from sentry.testutils import TestCase
+
+
+class LocalCacheTest(TestCase):
+    def test_lru(self):
+        cache = LocalCache(ttl=60, size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1
+        cache.set('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert len(cache) == 2
+
+    def test_ttl(self):
+        cache = LocalCache(ttl=10, size=10)
+        with mock.patch('time.time', return_value=100):
+            cache.set('a', 1)
+        with mock.patch('time.time', return_value=105):
+            assert cache.get('a') == 1
+        with mock.patch('time.time', return_value=111):
+            assert cache.get('a') is None
+        assert len(cache) == 0
+
+    def test_delete_many(self):
+        cache = LocalCache(ttl=60, size=10)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.delete_many(['a', 'c'])
+        assert cache.get('a') is None
+        assert cache.get('b') == 2
+
+
+class InvalidationChannelTest(TestCase):
+    def test_invalidate(self):
+        channel = InvalidationChannel('default', 'modelcache:test')
+        cache = LocalCache(ttl=60, size=10)
+        channel.register(cache)
+        cache.set('a', 1)
+        cache.set('b', 2)
+
+        client = mock.Mock()
+        with mock.patch.object(channel, '_get_client', return_value=client):
+            channel.invalidate(['a', 'c'])
+
+        assert cache.get('a') is None
+        assert cache.get('b') == 2
+        client.publish.assert_called_once_with('modelcache:test', 'a\nc')
+
+    def test_subscription(self):
+        channel = InvalidationChannel('default', 'modelcache:test')
+        cache = LocalCache(ttl=60, size=10)
+        channel.register(cache)
+
+        assert not channel.is_active()
+        # Wait for the subscriber to connect.
+        for _ in range(100):
+            if channel.is_active():
+                break
+            time.sleep(0.01)
+        assert channel.is_active()
+
+        cache.set('a', 1)
+        channel._get_client().publish('modelcache:test', 'a')
+        for _ in range(100):
+            if cache.get('a') is None:
+                break
+            time.sleep(0.01)
+        assert cache.get('a') is None
+
+
+class ManagerLocalCacheTest(TestCase):
+    def test_get_from_cache(self):
+        manager = type(self.project).objects
+        process_cache = LocalCache(ttl=60, size=100)
+        with mock.patch.object(manager, '_BaseManager__process_cache', process_cache), \
+                mock.patch.object(InvalidationChannel, 'is_active', return_value=True), \
+                mock.patch.object(InvalidationChannel, 'invalidate') as invalidate:
+            project = manager.get_from_cache(id=self.project.id)
+            assert project == self.project
+            assert len(process_cache) == 2  # instance and slug pointer
+
+            with self.assertNumQueries(0), \
+                    mock.patch('sentry.db.models.manager.cache.get') as cache_get:
+                assert manager.get_from_cache(id=self.project.id) == project
+                assert manager.get_from_cache(slug=self.project.slug) == project
+                assert manager.get_from_cache(id=self.project.id) is not project
+            assert cache_get.call_count == 0
+            assert invalidate.call_count == 0
+
+            project.name = 'foo'
+            project.save()
+            assert invalidate.call_count == 1
@@ -154,3 +154,60 @@ class RedisBackendTestCase(TestCase):
 
         with backend.digest('timeline', 0) as records:
             assert len(set(records)) == n
+
+    def test_digest_many(self):
+        backend = RedisBackend(truncation_chance=0.0)
+
+        t = time.time()
+        records = {}
+        for key in ('timeline:1', 'timeline:2', 'timeline:3'):
+            records[key] = Record('{}:record'.format(key), 'value', t)
+            backend.add(key, records[key])
+
+        # The third timeline isn't ready, so it is skipped.
+        backend.add('timeline:3', Record('timeline:3:record:2', 'value', t))
+        with backend.digest('timeline:3', 0):
+            pass
+        backend.add('timeline:3', Record('timeline:3:record:3', 'value', t))
+
+        with backend.digest_many(['timeline:1', 'timeline:2', 'timeline:3', 'missing'],
+                                 minimum_delay={'timeline:1': 0}) as batch:
+            assert len(batch) == 2
+            contents = {key: list(timeline_records) for key, timeline_records in batch}
+            batch.close('timeline:1')
+
+        assert contents == {
+            'timeline:1': [records['timeline:1']],
+            'timeline:2': [records['timeline:2']],
+        }
+        assert batch.closed == set(['timeline:1'])
+
+        # The timeline that wasn't closed is still ready and its lock was
+        # released, so its records can be digested again.
+        with backend.digest('timeline:2', 0) as timeline_records:
+            assert list(timeline_records) == [records['timeline:2']]
+
+        # The closed timeline's digest and records were removed.
+        connection = backend._get_connection('timeline:1')
+        assert not connection.exists('d:t:timeline:1:d')
+        assert not connection.exists('d:t:timeline:1:r:timeline:1:record')
+
+    def test_digest_many_failure(self):
+        backend = RedisBackend(truncation_chance=0.0)
+
+        record = Record('record:1', 'value', time.time())
+        backend.add('timeline', record)
+
+        with pytest.raises(Exception):
+            with backend.digest_many(['timeline']) as batch:
+                batch.close('timeline')
+                raise Exception('This causes the digest to not be closed.')
+
+        assert batch.closed == set()
+
+        # Maintenance moves the timeline back to the waiting state, and it is
+        # scheduled again with the records that weren't closed.
+        backend.maintenance(time.time())
+        assert set(entry.key for entry in backend.schedule(time.time())) == set(['timeline'])
+        with backend.digest('timeline', 0) as records:
+            assert list(records) == [record]
@@ -0,0 +1,29 @@
+from __future__ import absolute_import
+
+from sentry.digests.codecs import CompressedMsgpackCodec, CompressedPickleCodec
+from sentry.digests.notifications import event_to_record
+from sentry.testutils import TestCase
+
+
+class CompressedMsgpackCodecTestCase(TestCase):
+    def test_roundtrip(self):
+        project = self.create_project()
+        event = self.create_event(group=self.create_group(project=project))
+        rule = project.rule_set.all()[0]
+        record = event_to_record(event, (rule, ))
+
+        codec = CompressedMsgpackCodec()
+        value = codec.decode(codec.encode(record.value))
+        assert value.rules == [rule.id]
+        assert value.event.id == event.id
+        assert value.event.group_id == event.group_id
+        assert value.event.datetime == event.datetime
+        assert value.event.message == event.message
+
+    def test_decodes_pickled_records(self):
+        project = self.create_project()
+        event = self.create_event(group=self.create_group(project=project))
+        record = event_to_record(event, project.rule_set.all())
+
+        value = CompressedMsgpackCodec().decode(CompressedPickleCodec().encode(record.value))
+        assert value.event.id == event.id
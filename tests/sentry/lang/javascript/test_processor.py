@@ -1,9 +1,15 @@
 from __future__ import absolute_import
 
+import base64
+import os
 import pytest
 import re
+import shutil
+import tempfile
 import responses
 import six
+import threading
+import time
 from symbolic import SourceMapTokenMatch
 
 from mock import patch
@@ -15,6 +21,7 @@ from sentry.lang.javascript.processor import (
     discover_sourcemap,
     fetch_sourcemap,
     fetch_file,
+    fetch_concurrently,
     generate_module,
     trim_line,
     fetch_release_file,
@@ -26,6 +33,9 @@ from sentry.lang.javascript.processor import (
 from sentry.lang.javascript.errormapping import (rewrite_exception, REACT_MAPPING_URL)
 from sentry.models import File, Release, ReleaseFile, EventError
 from sentry.testutils import TestCase
+from sentry.utils import json
+from sentry.utils.cache import cache
+from sentry.utils.hashlib import md5_text
 from sentry.utils.strings import truncatechars
 
 base64_sourcemap = 'data:application/json;base64,eyJ2ZXJzaW9uIjozLCJmaWxlIjoiZ2VuZXJhdGVkLmpzIiwic291cmNlcyI6WyIvdGVzdC5qcyJdLCJuYW1lcyI6W10sIm1hcHBpbmdzIjoiO0FBQUEiLCJzb3VyY2VzQ29udGVudCI6WyJjb25zb2xlLmxvZyhcImhlbGxvLCBXb3JsZCFcIikiXX0='
@@ -510,6 +520,177 @@ class FetchSourcemapTest(TestCase):
         with pytest.raises(UnparseableSourcemap):
             fetch_sourcemap('http://example.com')
 
+    def test_release_artifact_is_cached(self):
+        project = self.project
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='abc',
+        )
+        release.add_project(project)
+
+        file = File.objects.create(
+            name='file.min.js.map',
+            type='release.file',
+            headers={'Content-Type': 'application/json'},
+        )
+        file.putfile(six.BytesIO(base64.b64decode(base64_sourcemap[29:])))
+
+        releasefile = ReleaseFile.objects.create(
+            name='http://example.com/file.min.js.map',
+            release=release,
+            organization_id=project.organization_id,
+            file=file,
+        )
+
+        cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_path)
+        with self.options({'sourcemaps.cache-path': cache_path}):
+            smap_view = fetch_sourcemap('http://example.com/file.min.js.map', release=release)
+            assert smap_view.get_source_name(0) == u'/test.js'
+
+            with patch('sentry.lang.javascript.processor.fetch_file') as fetch_file:
+                assert fetch_sourcemap(
+                    'http://example.com/file.min.js.map', release=release) is smap_view
+                assert not fetch_file.called
+
+            assert os.listdir(cache_path) == [
+                '%s-%s.map' % (releasefile.id, file.checksum),
+            ]
+
+
+    def _make_sourcemap_file(self, release, source, dist=None):
+        file = File.objects.create(
+            name='file.min.js.map',
+            type='release.file',
+            headers={'Content-Type': 'application/json'},
+        )
+        file.putfile(six.BytesIO(json.dumps({
+            'version': 3,
+            'file': 'generated.js',
+            'sources': [source],
+            'names': [],
+            'mappings': ';AAAA',
+        })))
+        return ReleaseFile.objects.create(
+            name='http://example.com/file.min.js.map',
+            release=release,
+            organization_id=release.organization_id,
+            dist=dist,
+            file=file,
+        )
+
+    def test_release_artifact_cached_per_dist(self):
+        release = Release.objects.create(
+            organization_id=self.project.organization_id,
+            version='abc',
+        )
+        release.add_project(self.project)
+        dist_a = release.add_dist('a')
+        dist_b = release.add_dist('b')
+        self._make_sourcemap_file(release, '/a.js', dist=dist_a)
+        self._make_sourcemap_file(release, '/b.js', dist=dist_b)
+
+        cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_path)
+        with self.options({'sourcemaps.cache-path': cache_path}):
+            smap_view = fetch_sourcemap(
+                'http://example.com/file.min.js.map', release=release, dist=dist_a)
+            assert smap_view.get_source_name(0) == u'/a.js'
+            smap_view = fetch_sourcemap(
+                'http://example.com/file.min.js.map', release=release, dist=dist_b)
+            assert smap_view.get_source_name(0) == u'/b.js'
+
+    @responses.activate
+    def test_release_artifact_ignores_negative_cache(self):
+        release = Release.objects.create(
+            organization_id=self.project.organization_id,
+            version='abc',
+        )
+        release.add_project(self.project)
+        releasefile = self._make_sourcemap_file(release, '/test.js')
+        responses.add(
+            responses.GET, 'http://example.com/file.min.js.map',
+            body=base64.b64decode(base64_sourcemap[29:]).replace('/test.js', '/scraped.js'),
+            content_type='application/json',
+        )
+        cache.set('releasefile:v1:%s:%s' % (
+            release.id, md5_text('http://example.com/file.min.js.map').hexdigest(),
+        ), -1, 60)
+
+        cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_path)
+        with self.options({'sourcemaps.cache-path': cache_path}):
+            smap_view = fetch_sourcemap('http://example.com/file.min.js.map', release=release)
+            assert smap_view.get_source_name(0) == u'/test.js'
+            assert len(responses.calls) == 0
+            assert os.listdir(cache_path) == [
+                '%s-%s.map' % (releasefile.id, releasefile.file.checksum),
+            ]
+
+    @responses.activate
+    def test_scraped_sourcemap_is_not_cached_as_artifact(self):
+        release = Release.objects.create(
+            organization_id=self.project.organization_id,
+            version='abc',
+        )
+        release.add_project(self.project)
+        releasefile = self._make_sourcemap_file(release, '/test.js')
+        responses.add(
+            responses.GET, 'http://example.com/file.min.js.map',
+            body=base64.b64decode(base64_sourcemap[29:]).replace('/test.js', '/scraped.js'),
+            content_type='application/json',
+        )
+
+        cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_path)
+        with self.options({'sourcemaps.cache-path': cache_path}):
+            # The release file was replaced after the manifest was built.
+            with patch('sentry.lang.javascript.processor.get_release_artifact',
+                       return_value=(releasefile.id, 'stale')), \
+                    patch('sentry.lang.javascript.processor.fetch_release_file',
+                          return_value=None):
+                smap_view = fetch_sourcemap(
+                    'http://example.com/file.min.js.map', release=release)
+            assert smap_view.get_source_name(0) == u'/scraped.js'
+            assert os.listdir(cache_path) == []
+
+
+class FetchConcurrentlyTest(TestCase):
+    def test_results_in_order(self):
+        def fetch(url):
+            if url.endswith('bad.js'):
+                raise http.CannotFetch({'url': url})
+            return url.upper()
+
+        urls = ['http://example.com/%d.js' % i for i in range(10)] + ['http://example.com/bad.js']
+        for concurrency in (1, 4):
+            results = fetch_concurrently(fetch, urls, concurrency=concurrency, domain_concurrency=4)
+            assert [r[0] for r in results] == urls
+            assert [r[1] for r in results[:-1]] == [url.upper() for url in urls[:-1]]
+            assert all(r[2] is None for r in results[:-1])
+            assert results[-1][1] is None
+            assert results[-1][2].data == {'url': 'http://example.com/bad.js'}
+
+    def test_domain_concurrency(self):
+        lock = threading.Lock()
+        active = {}
+        peak = {}
+
+        def fetch(url):
+            domain = url.split('/')[2]
+            with lock:
+                active[domain] = active.get(domain, 0) + 1
+                peak[domain] = max(peak.get(domain, 0), active[domain])
+            time.sleep(0.01)
+            with lock:
+                active[domain] -= 1
+            return url
+
+        urls = ['http://%s/%d.js' % (domain, i) for domain in ('a.com', 'b.com') for i in range(6)]
+        results = fetch_concurrently(fetch, urls, concurrency=8, domain_concurrency=2)
+        assert [r[1] for r in results] == urls
+        assert max(peak.values()) <= 2
+
 
 class TrimLineTest(TestCase):
     long_line = 'The public is more familiar with bad design than good design. It is, in effect, conditioned to prefer bad design, because that is what it lives with. The new becomes threatening, the old reassuring.'
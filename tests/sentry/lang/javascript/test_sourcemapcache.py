@@ -0,0 +1,69 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import time
+
+from symbolic import SourceMapView
+
+from sentry.lang.javascript.sourcemapcache import SourceMapArtifactCache
+from sentry.testutils import TestCase
+
+sourcemap = b'{"version":3,"file":"generated.js","sources":["/test.js"],"names":[],"mappings":";AAAA","sourcesContent":["console.log(\\"hello, World!\\")"]}'
+
+
+class SourceMapArtifactCacheTest(TestCase):
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_path)
+        self.cache = SourceMapArtifactCache()
+
+    def test_get_set(self):
+        key = (1, 'a' * 40)
+        with self.options({'sourcemaps.cache-path': self.cache_path}):
+            assert self.cache.get(key) is None
+
+            view = SourceMapView.from_json_bytes(sourcemap)
+            self.cache.set(key, view, sourcemap)
+            assert self.cache.get(key) is view
+            assert os.listdir(self.cache_path) == ['1-%s.map' % ('a' * 40, )]
+
+            # Other processes load the sourcemap from disk.
+            other = SourceMapArtifactCache()
+            loaded = other.get(key)
+            assert loaded is not None
+            assert loaded.get_source_name(0) == u'/test.js'
+            assert other.get(key) is loaded
+
+    def test_memory_size(self):
+        view = SourceMapView.from_json_bytes(sourcemap)
+        with self.options({
+            'sourcemaps.cache-path': self.cache_path,
+            'sourcemaps.memory-cache-size': len(sourcemap) * 2,
+        }):
+            for i in range(3):
+                self.cache.set((i, 'a' * 40), view, sourcemap)
+            assert list(self.cache._views) == [(1, 'a' * 40), (2, 'a' * 40)]
+            assert self.cache._size == len(sourcemap) * 2
+
+    def test_clear_old_entries(self):
+        view = SourceMapView.from_json_bytes(sourcemap)
+        with self.options({
+            'sourcemaps.cache-path': self.cache_path,
+            'sourcemaps.cache-size': len(sourcemap) * 2,
+        }):
+            now = time.time()
+            for i in range(4):
+                self.cache.set((i, 'a' * 40), view, sourcemap)
+                os.utime(self.cache.get_path((i, 'a' * 40)), (now - i * 60, now - i * 60))
+
+            # Too old to keep around, no matter the size.
+            old = now - 60 * 60 * 24 * 2
+            os.utime(self.cache.get_path((0, 'a' * 40)), (old, old))
+
+            self.cache.clear_old_entries()
+            assert sorted(os.listdir(self.cache_path)) == [
+                '1-%s.map' % ('a' * 40, ),
+                '2-%s.map' % ('a' * 40, ),
+            ]
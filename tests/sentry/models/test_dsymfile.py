@@ -1,6 +1,9 @@
 from __future__ import absolute_import
 
+import mock
 import os
+import shutil
+import tempfile
 import time
 import zipfile
 from six import BytesIO, text_type
@@ -83,6 +86,41 @@ class DSymFilesClearTest(APITestCase):
         assert not os.path.isfile(dsyms[PROGUARD_UUID])
 
 
+class DSymCacheTest(TestCase):
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_path)
+
+    def create_cache_file(self, name, size, age):
+        path = os.path.join(self.cache_path, text_type(self.project.id), name)
+        file = File.objects.create(name=name, type='project.dsym')
+        file.putfile(BytesIO(b'x' * size))
+        ProjectDSymFile.dsymcache._save_to_cache(file, path)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_save_to_cache_once(self):
+        with self.options({'dsym.cache-path': self.cache_path}):
+            path = self.create_cache_file('foo', 10, 0)
+            assert os.path.isfile(path)
+
+            file = mock.Mock()
+            ProjectDSymFile.dsymcache._save_to_cache(file, path)
+            assert not file.save_to.called
+
+    def test_clear_to_size(self):
+        with self.options({'dsym.cache-path': self.cache_path, 'dsym.cache-size': 250}):
+            paths = [self.create_cache_file('file%d' % i, 100, i * 60) for i in range(4)]
+
+            ProjectDSymFile.dsymcache.clear_old_entries()
+
+            # The least recently used files are removed first, lock files
+            # are kept.
+            assert [os.path.isfile(path) for path in paths] == [True, True, False, False]
+            assert all(os.path.isfile(path + '.lock') for path in paths)
+
+
 class SymCacheTest(TestCase):
     def test_create_symcache(self):
         file = File.objects.create(
@@ -1,6 +1,10 @@
 from __future__ import absolute_import
 
-from sentry.models import ReleaseFile
+import mock
+import six
+
+from sentry.models import File, ReleaseFile, ReleaseFileManifest
+from sentry.models.releasefile import PENDING_MANIFEST_TTL
 from sentry.testutils import TestCase
 
 
@@ -34,3 +38,63 @@ class ReleaseFileTestCase(TestCase):
             'foo.js',
             '~foo.js',
         ]
+
+
+class ReleaseFileManifestTestCase(TestCase):
+    def create_release_file(self, release, name, dist=None):
+        file = File.objects.create(name=name, type='release.file')
+        file.putfile(six.BytesIO(b'foo'))
+        return ReleaseFile.objects.create(
+            name=name,
+            release=release,
+            organization_id=release.organization_id,
+            file=file,
+            dist=dist,
+        )
+
+    def test_lookup(self):
+        release = self.create_release(self.project)
+        dist = release.add_dist('foo')
+        foo = self.create_release_file(release, '~/foo.js')
+        foo_query = self.create_release_file(release, 'http://example.com/foo.js?bar')
+        foo_dist = self.create_release_file(release, '~/foo.js', dist=dist)
+
+        manifest = ReleaseFileManifest.get(release.id)
+        assert len(manifest) == 2
+        assert manifest.lookup('http://example.com/foo.js') == (foo.id, foo.file.checksum)
+        assert manifest.lookup('http://example.com/foo.js?bar') == \
+            (foo_query.id, foo_query.file.checksum)
+        assert manifest.lookup('http://example.com/bar.js') is None
+
+        manifest = ReleaseFileManifest.get(release.id, dist.id)
+        assert manifest.lookup('http://example.com/foo.js', dist.name) == \
+            (foo_dist.id, foo_dist.file.checksum)
+
+    def test_cached_and_invalidated(self):
+        release = self.create_release(self.project)
+        foo = self.create_release_file(release, '~/foo.js')
+
+        assert ReleaseFileManifest.get(release.id).lookup('/foo.js') == \
+            (foo.id, foo.file.checksum)
+        with self.assertNumQueries(0):
+            assert ReleaseFileManifest.get(release.id).lookup('/bar.js') is None
+
+        bar = self.create_release_file(release, '~/bar.js')
+        assert ReleaseFileManifest.get(release.id).lookup('/bar.js') == \
+            (bar.id, bar.file.checksum)
+
+        foo.delete()
+        assert ReleaseFileManifest.get(release.id).lookup('/foo.js') is None
+
+    def test_pending_changes_use_short_lived_token(self):
+        release = self.create_release(self.project)
+        token_key = ReleaseFileManifest._get_token_key(release.id, None)
+
+        with mock.patch('sentry.models.releasefile.cache') as cache:
+            self.create_release_file(release, '~/foo.js')
+        # Tests run within a transaction.
+        cache.set.assert_called_once_with(token_key, mock.ANY, PENDING_MANIFEST_TTL)
+
+        with mock.patch('sentry.models.releasefile.cache') as cache:
+            ReleaseFileManifest.invalidate(release.id)
+        cache.delete.assert_called_once_with(token_key)
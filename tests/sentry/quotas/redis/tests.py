@@ -10,6 +10,7 @@ from exam import fixture, patcher
 
 from sentry.quotas.redis import (
     is_rate_limited,
+    is_rate_limited_batch,
     BasicRedisQuota,
     RedisQuota,
 )
@@ -68,6 +69,39 @@ def test_is_rate_limited_script():
     ))) == [False, ]
 
 
+def test_is_rate_limited_batch_script():
+    now = int(time.time())
+
+    cluster = clusters.get('default')
+    client = cluster.get_local_client(six.next(iter(cluster.hosts)))
+
+    # Both quotas have room for the entire batch.
+    assert list(map(int, is_rate_limited_batch(
+        client, ('batch:foo', 'r:batch:foo', 'batch:bar', 'r:batch:bar'),
+        (5, now + 60, 10, now + 120, 3)))) == [3, 5, 10]
+
+    # The first quota only has room for two more items.
+    assert list(map(int, is_rate_limited_batch(
+        client, ('batch:foo', 'r:batch:foo', 'batch:bar', 'r:batch:bar'),
+        (5, now + 60, 10, now + 120, 3)))) == [2, 2, 7]
+
+    # Nothing fits anymore, and nothing is counted.
+    assert list(map(int, is_rate_limited_batch(
+        client, ('batch:foo', 'r:batch:foo', 'batch:bar', 'r:batch:bar'),
+        (5, now + 60, 10, now + 120, 3)))) == [0, 0, 5]
+
+    assert client.get('batch:foo') == '5'
+    assert 59 <= client.ttl('batch:foo') <= 60
+
+    assert client.get('batch:bar') == '5'
+    assert 119 <= client.ttl('batch:bar') <= 120
+
+    # Refunds make room for more items.
+    client.set('r:batch:foo', 1)
+    assert list(map(int, is_rate_limited_batch(
+        client, ('batch:foo', 'r:batch:foo'), (5, now + 60, 3)))) == [1, 1]
+
+
 class RedisQuotaTest(TestCase):
     quota = fixture(RedisQuota)
 
@@ -155,6 +189,43 @@ class RedisQuotaTest(TestCase):
 
         assert self.quota.is_rate_limited(self.project).is_limited
 
+    @mock.patch('sentry.quotas.redis.is_rate_limited_batch')
+    @mock.patch.object(RedisQuota, 'get_quotas', return_value=[])
+    def test_batch_bails_immediately_without_any_quota(self, get_quotas, is_rate_limited_batch):
+        results = self.quota.is_rate_limited_batch(self.project, quantity=3)
+        assert not is_rate_limited_batch.called
+        assert [r.is_limited for r in results] == [False, False, False]
+
+    @mock.patch('sentry.quotas.redis.is_rate_limited_batch', return_value=(2, 2, 10))
+    def test_batch_is_limited_past_accepted(self, is_rate_limited_batch):
+        self.get_organization_quota.return_value = (100, 60)
+        self.get_project_quota.return_value = (200, 60)
+        results = self.quota.is_rate_limited_batch(self.project, quantity=4)
+        assert [r.is_limited for r in results] == [False, False, True, True]
+        assert results[2].reason_code == 'project_quota'
+
+    @mock.patch.object(RedisQuota, 'get_quotas')
+    @mock.patch('sentry.quotas.redis.is_rate_limited_batch', return_value=(1, 1, 3))
+    def test_batch_not_limited_without_enforce(self, mock_is_rate_limited_batch, mock_get_quotas):
+        mock_get_quotas.return_value = (
+            BasicRedisQuota(
+                key='p:1',
+                limit=1,
+                window=1,
+                reason_code='project_quota',
+                enforce=False,
+            ), BasicRedisQuota(
+                key='p:2',
+                limit=3,
+                window=1,
+                reason_code='project_quota',
+                enforce=True,
+            ),
+        )
+
+        results = self.quota.is_rate_limited_batch(self.project, quantity=3)
+        assert [r.is_limited for r in results] == [False, False, False]
+
     def test_get_usage(self):
         timestamp = time.time()
 
@@ -1,5 +1,7 @@
 from __future__ import absolute_import
 
+import mmh3
+
 from collections import Counter
 from unittest import TestCase
 
@@ -38,3 +40,12 @@ class MinHashSignatureBuilderTestCase(TestCase):
             estimation,
             delta=0.1,  # totally made up constant, seems reasonable
         )
+
+    def test_matches_definition(self):
+        get_signature = MinHashSignatureBuilder(16, 0xFFFF)
+        features = ['feature-%s' % i for i in range(100)] + ['feature-1'] * 10
+
+        assert get_signature(features) == [
+            min(mmh3.hash(feature, column) % 0xFFFF for feature in features)
+            for column in range(16)
+        ]
@@ -1,15 +1,18 @@
 from __future__ import absolute_import
 
+import mock
 import os
 import pytest
 
 from collections import OrderedDict
-from datetime import datetime
+from datetime import datetime, timedelta
+from django.utils import timezone
 
 from sentry.search.base import ANY
 from sentry.testutils import TestCase
 from sentry.tagstore import TagKeyStatus
 from sentry.tagstore.v2 import models
+from sentry.tagstore.v2.index import group_event_tag_index, group_tag_index
 from sentry.tagstore.v2.backend import V2TagStorage, transformers
 from sentry.tagstore.exceptions import TagKeyNotFound, TagValueNotFound, GroupTagKeyNotFound, GroupTagValueNotFound
 
@@ -423,6 +426,34 @@ class TagStorage(TestCase):
 
         assert models.GroupTagValue.objects.count() == 0
 
+    def test_incr_tag_values_times_seen_bulk(self):
+        tags = [
+            (self.key1, self.value1, None),
+            (self.key1, 'value2', {'foo': 'bar'}),
+            ('key2', self.value1, None),
+        ]
+
+        # The second round resolves all keys and values from the cache.
+        for _ in range(2):
+            with self.tasks():
+                self.ts.incr_tag_values_times_seen_bulk(
+                    project_id=self.proj1.id,
+                    group_id=self.proj1group1.id,
+                    environment_id=self.proj1env1.id,
+                    tags=tags,
+                )
+
+        for env in [self.proj1env1.id, None]:
+            for key, value, _ in tags:
+                assert self.ts.get_tag_value(
+                    self.proj1.id, env, key, value).times_seen == 2
+                assert self.ts.get_group_tag_value(
+                    self.proj1.id, self.proj1group1.id, env, key, value).times_seen == 2
+
+        assert models.TagKey.objects.count() == 4
+        assert models.TagValue.objects.count() == 6
+        assert models.GroupTagValue.objects.count() == 6
+
     def test_get_group_event_filter(self):
         tags = {
             'abc': 'xyz',
@@ -462,6 +493,63 @@ class TagStorage(TestCase):
             tags
         ) == {'id__in': set([self.proj1group1event1.id, self.proj1group1event2.id])}
 
+    def test_get_group_event_filter_from_index(self):
+        events = [self.proj1group1event1, self.proj1group1event2, self.proj1group1event3]
+        now = timezone.now() - timedelta(hours=1)
+
+        with self.options({'tagstore.event-index.write': True}):
+            for i, (event, env, browser) in enumerate([
+                (events[0], self.proj1env1, 'chrome'),
+                (events[1], self.proj1env2, 'chrome'),
+                (events[2], self.proj1env1, 'firefox'),
+            ]):
+                self.ts.create_event_tags(
+                    project_id=self.proj1.id,
+                    group_id=self.proj1group1.id,
+                    environment_id=env.id,
+                    event_id=event.id,
+                    tags=[('browser', browser), ('os', 'windows')],
+                    date_added=now + timedelta(minutes=i),
+                )
+
+        def get_event_ids(group, environment_id, tags, **kwargs):
+            event_filter = self.ts.get_group_event_filter(
+                self.proj1.id, group.id, environment_id, tags, **kwargs)
+            return event_filter['id__in'] if event_filter else set()
+
+        with self.options({'tagstore.event-index.read': True}):
+            tags = {'browser': 'chrome', 'os': 'windows'}
+            assert get_event_ids(self.proj1group1, None, tags) == \
+                set([events[0].id, events[1].id])
+            assert get_event_ids(self.proj1group1, self.proj1env1.id, tags) == \
+                set([events[0].id])
+            assert get_event_ids(self.proj1group1, None, {'browser': 'safari'}) == set()
+
+            # Only the events of the requested page are matched.
+            tags = {'os': 'windows'}
+            assert get_event_ids(self.proj1group1, None, tags, limit=1) == \
+                set([events[2].id])
+            assert get_event_ids(
+                self.proj1group1, None, tags, end=now + timedelta(minutes=1), limit=1,
+            ) == set([events[1].id])
+            tags = {'browser': 'chrome', 'os': 'windows'}
+
+            os_windows = list(models.EventTag.objects.filter(
+                event_id=events[2].id,
+                key__key='os',
+            ).values_list('key_id', 'value_id'))
+            assert group_event_tag_index.search(
+                self.proj1.id, self.proj1group1.id, [os_windows], limit=1) == [events[2].id]
+            assert group_event_tag_index.search(
+                self.proj1.id, self.proj1group1.id, [os_windows], offset=1) == [events[0].id]
+
+            with self.options({'tagstore.event-index.write': True}):
+                self.ts.update_group_for_events(
+                    self.proj1.id, [events[1].id], self.proj1group2.id)
+
+            assert get_event_ids(self.proj1group1, None, tags) == set([events[0].id])
+            assert get_event_ids(self.proj1group2, None, tags) == set([events[1].id])
+
     def test_get_groups_user_counts(self):
         k1, _ = self.ts.get_or_create_group_tag_key(
             self.proj1.id,
@@ -687,6 +775,89 @@ class TagStorage(TestCase):
             limit=2
         )) == 2
 
+    def test_get_group_ids_for_search_filter_from_index(self):
+        now = timezone.now() - timedelta(hours=1)
+        for i, (group_id, browser) in enumerate([(1, 'chrome'), (2, 'firefox'), (3, 'chrome')]):
+            for k, v in [('browser', browser), ('os', 'windows')]:
+                gtv, _ = self.ts.get_or_create_group_tag_value(
+                    self.proj1.id, group_id, self.proj1env1.id, k, v)
+                group_tag_index.record(
+                    self.proj1.id, group_id, gtv._key_id, gtv._value_id,
+                    last_seen=now + timedelta(minutes=i),
+                )
+
+        with self.options({'tagstore.search-index.read': True}):
+            assert self.ts.get_group_ids_for_search_filter(
+                self.proj1.id, self.proj1env1.id, {'browser': 'chrome', 'os': 'windows'},
+            ) == [3, 1]
+            # The index is exact, every match is returned regardless of ``limit``.
+            assert self.ts.get_group_ids_for_search_filter(
+                self.proj1.id, self.proj1env1.id, {'browser': 'chrome'}, limit=1,
+            ) == [3, 1]
+            assert self.ts.get_group_ids_for_search_filter(
+                self.proj1.id, self.proj1env1.id, {'browser': ANY, 'os': 'windows'},
+                candidates=[1, 2, 4],
+            ) == [2, 1]
+            assert self.ts.get_group_ids_for_search_filter(
+                self.proj1.id, self.proj1env1.id, {'browser': 'safari'},
+            ) == []
+            assert self.ts.get_group_ids_for_search_filter(
+                self.proj1.id, self.proj1env2.id, {'browser': 'chrome'},
+            ) == []
+
+            with mock.patch.object(group_tag_index, 'search') as search:
+                assert self.ts.get_group_ids_for_search_filter(
+                    self.proj1.id, self.proj1env1.id, {'browser': 'chrome'},
+                    candidates=[], limit=0,
+                ) == []
+            assert not search.called
+
+    def test_group_tag_index_is_written_by_buffer(self):
+        now = timezone.now()
+        with self.options({'tagstore.search-index.write': True}):
+            self.ts.incr_tag_values_times_seen_bulk(
+                self.proj1.id, self.proj1group1.id, self.proj1env1.id,
+                [('browser', 'chrome', None), ('os', 'windows', None)],
+                last_seen=now - timedelta(minutes=1),
+            )
+            self.ts.incr_tag_values_times_seen_bulk(
+                self.proj1.id, self.proj1group2.id, self.proj1env1.id,
+                [('browser', 'chrome', None)],
+                last_seen=now,
+            )
+
+        with self.options({'tagstore.search-index.read': True}):
+            assert self.ts.get_group_ids_for_search_filter(
+                self.proj1.id, self.proj1env1.id, {'browser': 'chrome'},
+            ) == [self.proj1group2.id, self.proj1group1.id]
+            assert self.ts.get_group_ids_for_search_filter(
+                self.proj1.id, self.proj1env1.id, {'browser': 'chrome', 'os': 'windows'},
+            ) == [self.proj1group1.id]
+            assert self.ts.get_group_ids_for_search_filter(
+                self.proj1.id, self.proj1env2.id, {'browser': 'chrome'},
+            ) == []
+
+    def test_update_group_tag_key_values_seen(self):
+        for value in ['a', 'b', 'c']:
+            self.ts.create_group_tag_value(
+                self.proj1.id, self.proj1group1.id, self.proj1env1.id, self.key1, value)
+        self.ts.create_group_tag_value(
+            self.proj1.id, self.proj1group2.id, self.proj1env1.id, self.key1, 'a')
+
+        gtk1 = self.ts.create_group_tag_key(
+            self.proj1.id, self.proj1group1.id, self.proj1env1.id, self.key1, values_seen=1)
+        gtk2 = self.ts.create_group_tag_key(
+            self.proj1.id, self.proj1group2.id, self.proj1env1.id, self.key1, values_seen=1)
+        gtk3 = self.ts.create_group_tag_key(
+            self.proj1.id, self.proj1group2.id, self.proj1env1.id, 'key2', values_seen=5)
+
+        self.ts.update_group_tag_key_values_seen(
+            self.proj1.id, [self.proj1group1.id, self.proj1group2.id])
+
+        assert models.GroupTagKey.objects.get(id=gtk1.id).values_seen == 3
+        assert models.GroupTagKey.objects.get(id=gtk2.id).values_seen == 1
+        assert models.GroupTagKey.objects.get(id=gtk3.id).values_seen == 0
+
     def test_update_group_for_events(self):
         v1, _ = self.ts.get_or_create_tag_value(self.proj1.id, self.proj1env1.id, 'k1', 'v1')
         v2, _ = self.ts.get_or_create_tag_value(self.proj1.id, self.proj1env1.id, 'k2', 'v2')
@@ -0,0 +1,88 @@
+from __future__ import absolute_import
+
+from sentry.ingest_config import (
+    ProjectIngestConfig, clear_local_cache, get_ingest_config, invalidate_ingest_config,
+    _get_cache_key, _get_token_key
+)
+from sentry.models import OrganizationOption
+from sentry.testutils import TestCase
+from sentry.utils.cache import cache
+from sentry.utils.data_filters import FilterStatKeys
+
+
+class ProjectIngestConfigTest(TestCase):
+    def test_build(self):
+        self.project.update_option('sentry:origins', ['http://example.com'])
+        self.project.update_option('sentry:scrub_data', False)
+        self.project.update_option('sentry:sensitive_fields', ['foo'])
+        self.project.update_option('filters:%s' % (FilterStatKeys.LOCALHOST, ), '1')
+        OrganizationOption.objects.set_value(
+            self.organization, 'sentry:require_scrub_data', True)
+        OrganizationOption.objects.set_value(
+            self.organization, 'sentry:sensitive_fields', ['bar'])
+
+        config = ProjectIngestConfig.build(self.project)
+        assert config.project_id == self.project.id
+        assert config.is_valid_origin('http://example.com')
+        assert not config.is_valid_origin('http://example.org')
+        assert config.scrub_data
+        assert config.sensitive_fields == ['bar', 'foo']
+        assert FilterStatKeys.LOCALHOST in config.filters
+
+    def test_get_ingest_config(self):
+        config = get_ingest_config(self.project)
+        assert get_ingest_config(self.project) is config
+        token, cached = cache.get(_get_cache_key(self.project.id))
+        assert token == cache.get(_get_token_key(self.project.id))
+        assert cached.revision == config.revision
+
+        clear_local_cache()
+        with self.assertNumQueries(0):
+            config = get_ingest_config(self.project)
+        assert config.project_id == self.project.id
+
+    def test_invalidation(self):
+        config = get_ingest_config(self.project)
+        assert config.scrub_data
+
+        self.project.update_option('sentry:scrub_data', False)
+        assert cache.get(_get_token_key(self.project.id)) is None
+        assert not get_ingest_config(self.project).scrub_data
+
+        OrganizationOption.objects.set_value(
+            self.organization, 'sentry:require_scrub_data', True)
+        assert cache.get(_get_token_key(self.project.id)) is None
+        assert get_ingest_config(self.project).scrub_data
+
+    def test_stale_config_is_not_used(self):
+        stale = ProjectIngestConfig.build(self.project)
+        get_ingest_config(self.project)
+        token = cache.get(_get_token_key(self.project.id))
+
+        # A configuration that was built before the invalidation and stored
+        # after it is ignored.
+        self.project.update_option('sentry:scrub_data', False)
+        cache.set(_get_cache_key(self.project.id), (token, stale))
+        clear_local_cache()
+        assert not get_ingest_config(self.project).scrub_data
+
+        invalidate_ingest_config([self.project.id])
+        assert cache.get(_get_token_key(self.project.id)) is None
+
+    def test_data_filter(self):
+        config = get_ingest_config(self.project)
+        data_filter = config.data_filter
+        assert data_filter is not None
+        assert config.data_filter is data_filter
+
+        # Compiled structures are reused by configurations that were loaded
+        # from the cache, and built again when the configuration changes.
+        clear_local_cache()
+        assert get_ingest_config(self.project).data_filter is data_filter
+
+        self.project.update_option('sentry:sensitive_fields', ['foo'])
+        data_filter = get_ingest_config(self.project).data_filter
+        assert 'foo' in data_filter.fields
+
+        self.project.update_option('sentry:scrub_data', False)
+        assert get_ingest_config(self.project).data_filter is None
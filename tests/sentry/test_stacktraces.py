@@ -1,6 +1,11 @@
 from __future__ import absolute_import
 
-from sentry.stacktraces import find_stacktraces_in_data
+import mock
+
+from sentry.stacktraces import (
+    StacktraceProcessor, find_stacktraces_in_data, process_stacktraces
+)
+from sentry.utils.cache import cache
 
 
 def test_stacktraces_basics():
@@ -63,3 +68,55 @@ def test_get_stacktraces_returns_exception_interface():
     infos = find_stacktraces_in_data(data)
     assert len(infos) == 1
     assert len(infos[0].stacktrace['frames']) == 2
+
+
+class UppercaseProcessor(StacktraceProcessor):
+    calls = 0
+
+    def handles_frame(self, frame, stacktrace_info):
+        return True
+
+    def preprocess_frame(self, processable_frame):
+        processable_frame.set_cache_key_from_values([processable_frame['function']])
+
+    def process_frame(self, processable_frame, processing_task):
+        if processable_frame.cache_value is None:
+            UppercaseProcessor.calls += 1
+            processable_frame.set_cache_value(processable_frame['function'].upper())
+            function = processable_frame['function'].upper()
+        else:
+            function = processable_frame.cache_value
+        return [dict(processable_frame.frame, function=function)], None, None
+
+
+def test_frame_cache_is_batched():
+    def make_data():
+        return {
+            'platform': 'python',
+            'sentry.interfaces.Stacktrace': {
+                'frames': [{'function': 'frame_%d' % i} for i in range(20)],
+            },
+        }
+
+    def make_processors(data, infos):
+        return [UppercaseProcessor(data, infos, project=object())]
+
+    cache.clear()
+    UppercaseProcessor.calls = 0
+
+    with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+            mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+        data = process_stacktraces(make_data(), make_processors=make_processors)
+        assert get_many.call_count == 1
+        assert set_many.call_count == 1
+        assert len(set_many.call_args[0][0]) == 20
+
+    assert UppercaseProcessor.calls == 20
+    assert data['sentry.interfaces.Stacktrace']['frames'][0]['function'] == 'FRAME_0'
+
+    with mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+        data = process_stacktraces(make_data(), make_processors=make_processors)
+        assert set_many.call_count == 0
+
+    assert UppercaseProcessor.calls == 20
+    assert data['sentry.interfaces.Stacktrace']['frames'][-1]['function'] == 'FRAME_19'
@@ -100,6 +100,19 @@ class RedisTSDBTest(TestCase):
             ], dts[3], count=1, environment_id=2
         )
 
+        self.db.incr_multi(
+            [
+                (TSDBModel.project, 3, 5),
+                (TSDBModel.project, 4),
+            ], dts[0], count=2
+        )
+
+        results = self.db.get_range(TSDBModel.project, [3, 4], dts[0], dts[0])
+        assert results == {
+            3: [(timestamp(dts[0]), 5)],
+            4: [(timestamp(dts[0]), 2)],
+        }
+
         results = self.db.get_range(TSDBModel.project, [1], dts[0], dts[-1])
         assert results == {
             1: [
@@ -207,6 +220,54 @@ class RedisTSDBTest(TestCase):
             2: 0,
         }
 
+    def test_incr_multi_expiry(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+
+        self.db.incr_multi([
+            (TSDBModel.project, 1),
+            (TSDBModel.project, 1, 2),
+            (TSDBModel.group, 2),
+        ], now, environment_id=1)
+
+        for rollup, max_values in self.db.rollups.items():
+            expiry = self.db.calculate_expiry(rollup, max_values, now)
+            for model, key, value in [(TSDBModel.project, 1, 3), (TSDBModel.group, 2, 1)]:
+                for environment_id in (None, 1):
+                    hash_key, hash_field = self.db.make_counter_key(
+                        model, rollup, now, key, environment_id)
+                    client = self.db.cluster.get_local_client_for_key(hash_key)
+                    assert int(client.hget(hash_key, hash_field)) == value
+                    assert 0 < client.ttl(hash_key) <= expiry - int(to_timestamp(now))
+
+        # Incrementing an existing hash does not change its expiration time.
+        hash_key, _ = self.db.make_counter_key(TSDBModel.project, 10, now, 1, None)
+        client = self.db.cluster.get_local_client_for_key(hash_key)
+        client.expire(hash_key, 100)
+        self.db.incr_multi([(TSDBModel.project, 1)], now)
+        assert client.ttl(hash_key) <= 100
+
+    def test_get_range_many_keys(self):
+        # 1,000 keys over 90 buckets, which touches every virtual node for
+        # every bucket.
+        end = to_datetime(self.db.normalize_to_epoch(
+            datetime.utcnow().replace(tzinfo=pytz.UTC), ONE_MINUTE))
+        start = end - timedelta(minutes=89)
+        keys = list(range(1000))
+
+        self.db.incr_multi(
+            [(TSDBModel.group, key, key) for key in keys if key % 2],
+            start,
+        )
+        self.db.incr_multi([(TSDBModel.group, key) for key in keys], end)
+
+        results = self.db.get_range(TSDBModel.group, keys, start, end, rollup=ONE_MINUTE)
+        assert len(results) == len(keys)
+        for key, series in results.items():
+            assert len(series) == 90
+            assert series[0] == (to_timestamp(start), key if key % 2 else 0)
+            assert series[-1] == (to_timestamp(end), 1)
+            assert sum(count for _, count in series[1:-1]) == 0
+
     def test_count_distinct(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
         dts = [now + timedelta(hours=i) for i in range(4)]
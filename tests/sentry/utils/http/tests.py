@@ -2,6 +2,7 @@
 
 from __future__ import absolute_import
 
+import ipaddress
 import mock
 
 from exam import fixture
@@ -22,7 +23,9 @@ from sentry.utils.data_filters import (
     is_valid_ip,
     is_valid_release,
     is_valid_error_message,
+    compile_globs,
     FilterTypes,
+    IPBlacklist,
 )
 
 
@@ -271,6 +274,48 @@ class IsValidIPTestCase(TestCase):
         assert self.is_valid_ip('127.0.0.1', ['lol/bar'])
 
 
+class IPBlacklistTestCase(TestCase):
+    def test_ranges(self):
+        blacklist = IPBlacklist([
+            '10.0.0.0/16', '10.0.128.0/17', '10.0.0.0/8', '192.168.1.0/24',
+            '192.168.3.0/24', '2001:db8::/32', 'lol/bar', '127.0.0.1',
+        ])
+        assert blacklist.ranges[4][0] == [
+            int(ipaddress.ip_address(u'10.0.0.0')),
+            int(ipaddress.ip_address(u'192.168.1.0')),
+            int(ipaddress.ip_address(u'192.168.3.0')),
+        ]
+
+        assert '127.0.0.1' in blacklist
+        assert '10.255.255.255' in blacklist
+        assert '192.168.1.1' in blacklist
+        assert '192.168.2.1' not in blacklist
+        assert '192.168.3.255' in blacklist
+        assert '11.0.0.0' not in blacklist
+        assert '2001:db8::1' in blacklist
+        assert '2001:db9::1' not in blacklist
+        assert '::ffff:10.0.0.1' not in blacklist
+        assert 'garbage' not in blacklist
+
+    def test_empty(self):
+        assert '127.0.0.1' not in IPBlacklist(None)
+        assert '127.0.0.1' not in IPBlacklist([])
+
+
+class CompileGlobsTestCase(TestCase):
+    def test_compile_globs(self):
+        assert compile_globs(None) is None
+        assert compile_globs(['']) is None
+
+        expression = compile_globs(['1.2.*', 'Foo?bar', '[ab]'])
+        assert expression.match('1.2.3')
+        assert not expression.match('11.2.3')
+        assert expression.match('foo-bar')
+        assert not expression.match('foo-bar-baz')
+        assert expression.match('a')
+        assert expression.match('foo\nbar')
+
+
 class IsValidReleaseTestCase(TestCase):
     def is_valid_release(self, value, inputs):
         self.project.update_option('sentry:{}'.format(FilterTypes.RELEASES), inputs)
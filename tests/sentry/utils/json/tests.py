@@ -3,6 +3,7 @@
 from __future__ import absolute_import
 
 import datetime
+import time
 import uuid
 
 from enum import Enum
@@ -46,3 +47,32 @@ class JSONTest(TestCase):
         enum = Enum('foo', 'a b c')
         res = enum.a
         self.assertEquals(json.dumps(res), '1')
+
+
+class ExceedsDepthTest(TestCase):
+    def test_nested_arrays(self):
+        assert not json.exceeds_depth('[[[1]]]', 3)
+        assert json.exceeds_depth('[[[[1]]]]', 3)
+
+    def test_nested_objects(self):
+        assert not json.exceeds_depth('{"a": {"b": {"c": 1}}}', 3)
+        assert json.exceeds_depth('{"a": {"b": {"c": [1]}}}', 3)
+
+    def test_siblings_do_not_add_up(self):
+        assert not json.exceeds_depth('[[1], [2], {"a": [3]}, [[4]]]', 3)
+
+    def test_brackets_in_strings(self):
+        assert not json.exceeds_depth('["[[[[{{{{"]', 1)
+        assert not json.exceeds_depth('{"[[[[": "]]]]{{{{"}', 1)
+
+    def test_escaped_quotes(self):
+        assert not json.exceeds_depth('["\\"[[[[\\""]', 1)
+        assert not json.exceeds_depth('["\\\\", "[[["]', 1)
+        assert json.exceeds_depth('["\\\\", [[1]]]', 2)
+
+    def test_unterminated_escaped_string(self):
+        value = '"\\' * 500000
+        start = time.time()
+        assert not json.exceeds_depth('[' + value, 1)
+        assert not json.exceeds_depth('[[' + value + '[[[', 2)
+        assert time.time() - start < 5
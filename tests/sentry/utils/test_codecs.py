@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import pytest
+
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from django.utils import timezone
+
+from sentry.models import Project
+from sentry.testutils import TestCase
+from sentry.utils.codecs import (
+    MsgpackCodec, PickleCodec, decode, register_namedtuple,
+)
+from sentry.utils.compat import pickle
+
+Pair = register_namedtuple(namedtuple('Pair', 'left right'))
+
+
+class MsgpackCodecTest(TestCase):
+    codec = MsgpackCodec()
+
+    def roundtrip(self, value):
+        return self.codec.decode(self.codec.encode(value))
+
+    def test_native_types(self):
+        value = {
+            'int': 1,
+            'float': 1.5,
+            'text': u'”',
+            'bytes': b'foo',
+            'list': [1, None, True],
+        }
+        assert self.roundtrip(value) == value
+
+    def test_registered_types(self):
+        now = timezone.now()
+        assert self.roundtrip(now) == now
+        assert self.roundtrip(now).tzinfo is not None
+        assert self.roundtrip(datetime(2018, 1, 1, 12, 30, 1, 5)) == \
+            datetime(2018, 1, 1, 12, 30, 1, 5)
+        assert self.roundtrip(date(2018, 1, 1)) == date(2018, 1, 1)
+        assert self.roundtrip(Decimal('1.10')) == Decimal('1.10')
+        assert self.roundtrip((1, 2)) == (1, 2)
+        assert self.roundtrip(Pair(1, (2, 3))) == Pair(1, (2, 3))
+
+    def test_model_instance(self):
+        project = self.create_project()
+        result = self.roundtrip({'project': project})['project']
+        assert isinstance(result, Project)
+        assert result.id == project.id
+        assert result.slug == project.slug
+        assert result.organization_id == project.organization_id
+
+    def test_is_smaller_than_pickle(self):
+        value = {'project_id': 1, 'release_id': 2, 'environment_id': 3}
+        assert len(self.codec.encode(value)) < len(PickleCodec().encode(value))
+
+
+def test_decodes_legacy_pickle():
+    value = {'pk': 1, 'last_seen': datetime(2018, 1, 1)}
+    assert decode(pickle.dumps(value)) == value
+    assert MsgpackCodec().decode(pickle.dumps(value)) == value
+    assert PickleCodec().decode(MsgpackCodec().encode(value)) == value
+
+
+def test_disallow_pickle():
+    value = {'pk': 1}
+    codec = MsgpackCodec(allow_pickle=False)
+    assert codec.decode(codec.encode(value)) == value
+    with pytest.raises(ValueError):
+        codec.decode(pickle.dumps(value))
+    with pytest.raises(ValueError):
+        decode(PickleCodec().encode(value), allow_pickle=False)
@@ -442,3 +442,39 @@ class SensitiveDataFilterTest(TestCase):
         assert 'sentry.interfaces.Csp' in data
         csp = data['sentry.interfaces.Csp']
         assert csp['blocked_uri'] == 'https://example.com/?foo=[Filtered]&bar=baz'
+
+    def test_scrub_in_place(self):
+        frame_vars = {
+            'foo': {'bar': 'baz'},
+            'password': 'hello',
+            'items': [['api_key', 'secret_key'], ('foo', 'bar')],
+        }
+        nested = frame_vars['foo']
+        items = frame_vars['items']
+        data = {
+            'sentry.interfaces.Stacktrace': {
+                'frames': [{'vars': frame_vars}],
+            }
+        }
+
+        proc = SensitiveDataFilter()
+        proc.apply(data)
+
+        result = data['sentry.interfaces.Stacktrace']['frames'][0]['vars']
+        assert result is frame_vars
+        assert result['foo'] is nested
+        assert result['items'] is items
+        assert result == {
+            'foo': {'bar': 'baz'},
+            'password': FILTER_MASK,
+            'items': [['api_key', FILTER_MASK], ('foo', 'bar')],
+        }
+
+    def test_scrub_recursive(self):
+        extra = {'foo': 'bar'}
+        extra['self'] = extra
+        data = {'extra': extra}
+
+        proc = SensitiveDataFilter()
+        proc.apply(data)
+        assert data['extra'] == {'foo': 'bar', 'self': '<...>'}
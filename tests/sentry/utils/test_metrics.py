@@ -3,7 +3,8 @@ from __future__ import absolute_import
 import mock
 import pytest
 
-from sentry.utils.metrics import timer
+from sentry import tsdb
+from sentry.utils.metrics import InternalMetrics, timer
 
 
 def test_timer_success():
@@ -38,3 +39,42 @@ def test_timer_failure():
             'foo': True,
             'result': 'failure',
         }
+
+
+def test_internal_metrics_aggregation():
+    internal = InternalMetrics()
+    internal._process(('foo', None, None, 1))
+    internal._process(('foo', None, None, 2))
+    internal._process(('foo', 'bar', None, 1))
+
+    with mock.patch('sentry.tsdb.incr_multi') as incr_multi:
+        internal._flush()
+
+    assert incr_multi.call_count == 1
+    args, kwargs = incr_multi.call_args
+    assert sorted(args[0]) == [
+        (tsdb.models.internal, 'foo', 3),
+        (tsdb.models.internal, 'foo.bar', 1),
+    ]
+
+    with mock.patch('sentry.tsdb.incr_multi') as incr_multi:
+        internal._flush()
+
+    assert incr_multi.call_count == 0
+
+
+def test_internal_metrics_dropped():
+    internal = InternalMetrics(maxsize=1)
+    with mock.patch.object(InternalMetrics, '_worker'):
+        internal.incr('foo')
+        internal.incr('foo')
+        internal.incr('foo')
+
+    assert internal.q.qsize() == 1
+    assert internal.dropped == 2
+
+    with mock.patch('sentry.tsdb.incr_multi') as incr_multi:
+        internal._flush()
+
+    args, kwargs = incr_multi.call_args
+    assert args[0] == [(tsdb.models.internal, InternalMetrics.dropped_key, 2)]
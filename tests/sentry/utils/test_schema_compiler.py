@@ -0,0 +1,110 @@
+from __future__ import absolute_import
+
+import jsonschema
+
+from sentry.interfaces.schemas import INTERFACE_SCHEMAS, validate_and_default_interface
+from sentry.testutils import TestCase
+from sentry.utils.schema_compiler import (
+    CompiledValidator, UnsupportedSchema, SchemaCompiler, compile_schema
+)
+
+INSTANCES = {
+    'event': [
+        {'event_id': 'a' * 32, 'platform': 'python'},
+        {
+            'event_id': 'z' * 32,
+            'platform': 'nope',
+            'timestamp': 'not-a-date',
+            'level': {},
+            'logger': 'a\nb',
+            'release': '',
+            'dist': 'a b',
+            'tags': [['a']],
+            'environment': 'a' * 65,
+            'fingerprint': [1],
+            'time_spent': -1,
+            'culprit': 1,
+            'extra': [],
+        },
+        {'event_id': 'a' * 31, 'timestamp': 1500000000, 'level': 'fatal', 'time_spent': True},
+        [],
+    ],
+    'tags': [
+        [['foo', 'bar'], ['release', '1.0'], ['a b', 'c'], ['k', 'v\n'], ['k'], 'x'],
+        {'foo': 'bar'},
+    ],
+    'frame': [
+        {'abs_path': 'foo.py', 'filename': 'foo.py', 'module': 'foo', 'lineno': 1},
+        {'abs_path': 1, 'in_app': 'yes', 'colno': [], 'vars': 'x', 'platform': 'x', 'garbage': 1},
+    ],
+    'stacktrace': [
+        {'frames': [{}]},
+        {'frames': [], 'frames_omitted': [1, 2, 3], 'registers': [], 'extra': 1},
+        {},
+    ],
+    'exception': [
+        {'type': 'ValueError', 'stacktrace': {'frames': []}},
+        {'module': 1, 'stacktrace': {'frames': {}}, 'raw_stacktrace': []},
+    ],
+    'mechanism': [
+        {'type': 'generic', 'meta': {'signal': {'number': 1}, 'errno': {}}},
+        {'type': '', 'handled': 1, 'meta': {'mach_exception': {'exception': 1}}},
+    ],
+    'request': [
+        {'url': 'http://example.com', 'cookies': [['a', 'b']], 'headers': {'a': 'b'}},
+        {'url': '', 'cookies': [['a']], 'headers': 'x', 'data': 1},
+    ],
+    'device': [
+        {'name': 'Windows', 'version': '95'},
+        {'name': '', 'data': []},
+    ],
+    'geo': [
+        {'country_code': 'US', 'city': 'Vienna'},
+        {'country_code': 1, 'planet': 'earth'},
+    ],
+    'expectct': [
+        {'hostname': 'example.com', 'scts': [{'version': 1, 'status': 'valid'}]},
+        {'date_time': 'yesterday', 'scts': [{'status': 'maybe', 'extra': 1}]},
+    ],
+}
+
+
+def get_errors(validator, instance):
+    return [(list(e.path), e.validator, e.schema) for e in validator.iter_errors(instance)]
+
+
+class SchemaCompilerTest(TestCase):
+    def test_matches_jsonschema(self):
+        format_checker = jsonschema.FormatChecker()
+        for name, instances in INSTANCES.items():
+            schema = INTERFACE_SCHEMAS[name]
+            expected = jsonschema.Draft4Validator(
+                schema,
+                types={'array': (list, tuple)},
+                format_checker=format_checker,
+            )
+            compiled = compile_schema(schema, format_checker=format_checker)
+            assert isinstance(compiled, CompiledValidator)
+
+            for instance in instances:
+                assert get_errors(compiled, instance) == get_errors(expected, instance), name
+                assert compiled.is_valid(instance) == expected.is_valid(instance), name
+
+    def test_unsupported_keyword(self):
+        schema = {'type': 'array', 'uniqueItems': True}
+        with self.assertRaises(UnsupportedSchema):
+            SchemaCompiler().compile(schema)
+
+        validator = compile_schema(schema)
+        assert isinstance(validator, jsonschema.Draft4Validator)
+        assert not validator.is_valid([1, 1])
+
+    def test_validate_and_default(self):
+        data = {'event_id': 'a' * 31, 'platform': 'python', 'logger': 'a\nb', 'extra': []}
+        is_valid, errors = validate_and_default_interface(data, 'event')
+
+        assert is_valid
+        assert sorted(e['name'] for e in errors) == ['event_id', 'extra', 'logger']
+        assert len(data['event_id']) == 32
+        assert data['logger'] == ''
+        assert 'extra' not in data
@@ -10,8 +10,10 @@ from mock import Mock
 
 from sentry.coreapi import APIRateLimited
 from sentry.models import ProjectKey
+from sentry.quotas.base import Quota, RateLimit
 from sentry.signals import event_accepted, event_dropped, event_filtered
 from sentry.testutils import (assert_mock_called_once_with_partial, TestCase)
+from sentry.testutils.helpers import get_auth_header
 from sentry.utils import json
 from sentry.utils.data_filters import FilterTypes
 
@@ -678,6 +680,106 @@ class StoreViewTest(TestCase):
         )
 
 
+class BatchStoreViewTest(TestCase):
+    @fixture
+    def path(self):
+        return reverse('sentry-api-store-batch', kwargs={'project_id': self.project.id})
+
+    def _postBatch(self, events):
+        body = '\n'.join(json.dumps(event) for event in events)
+        with self.tasks():
+            return self.client.post(
+                self.path,
+                body,
+                content_type='application/octet-stream',
+                HTTP_X_SENTRY_AUTH=get_auth_header(
+                    '_postBatch/0.0.0',
+                    self.projectkey.public_key,
+                    self.projectkey.secret_key,
+                ),
+            )
+
+    @mock.patch('sentry.coreapi.ClientApiHelper.insert_data_batch_to_database')
+    def test_stores_all_events(self, mock_insert_data_batch_to_database):
+        resp = self._postBatch([
+            {'event_id': 'a' * 32, 'message': 'foo'},
+            {'event_id': 'b' * 32, 'message': 'bar'},
+        ])
+        assert resp.status_code == 200, resp.content
+        assert json.loads(resp.content) == {
+            'events': [{'id': 'a' * 32}, {'id': 'b' * 32}],
+        }
+
+        call_data = mock_insert_data_batch_to_database.call_args[0][0]
+        assert [data['event_id'] for data in call_data] == ['a' * 32, 'b' * 32]
+
+    @mock.patch('sentry.coreapi.ClientApiHelper.insert_data_batch_to_database', Mock())
+    def test_rejects_duplicates_within_batch(self):
+        resp = self._postBatch([
+            {'event_id': 'a' * 32, 'message': 'foo'},
+            {'event_id': 'a' * 32, 'message': 'foo'},
+        ])
+        assert resp.status_code == 200, resp.content
+        results = json.loads(resp.content)['events']
+        assert results[0] == {'id': 'a' * 32}
+        assert 'already exists' in results[1]['error']
+
+    @mock.patch('sentry.coreapi.ClientApiHelper.insert_data_batch_to_database', Mock())
+    @mock.patch('sentry.coreapi.is_valid_release')
+    def test_filters_individual_events(self, mock_is_valid_release):
+        mock_is_valid_release.side_effect = lambda project, release: release != '1.0'
+        resp = self._postBatch([
+            {'event_id': 'a' * 32, 'message': 'foo', 'release': '1.0'},
+            {'event_id': 'b' * 32, 'message': 'bar', 'release': '2.0'},
+        ])
+        assert resp.status_code == 200, resp.content
+        results = json.loads(resp.content)['events']
+        assert 'filter' in results[0]['error']
+        assert results[1] == {'id': 'b' * 32}
+
+    @mock.patch('sentry.coreapi.ClientApiHelper.insert_data_batch_to_database', Mock())
+    @mock.patch('sentry.app.quotas.is_rate_limited_batch')
+    def test_rate_limits_individual_events(self, mock_is_rate_limited_batch):
+        mock_is_rate_limited_batch.return_value = [
+            RateLimit(is_limited=False),
+            RateLimit(is_limited=True, retry_after=10),
+        ]
+        resp = self._postBatch([
+            {'event_id': 'a' * 32, 'message': 'foo'},
+            {'event_id': 'b' * 32, 'message': 'bar'},
+        ])
+        assert resp.status_code == 200, resp.content
+        results = json.loads(resp.content)['events']
+        assert results[0] == {'id': 'a' * 32}
+        assert results[1]['error_name'] == 'rate_limit'
+
+    @mock.patch('sentry.coreapi.ClientApiHelper.insert_data_batch_to_database', Mock())
+    def test_rate_limits_with_bool_quota(self):
+        class BoolQuota(Quota):
+            results = iter([False, True])
+
+            def is_rate_limited(self, project, key=None):
+                return next(self.results)
+
+        with mock.patch('sentry.web.api.quotas', BoolQuota()):
+            resp = self._postBatch([
+                {'event_id': 'a' * 32, 'message': 'foo'},
+                {'event_id': 'b' * 32, 'message': 'bar'},
+            ])
+        assert resp.status_code == 200, resp.content
+        results = json.loads(resp.content)['events']
+        assert results[0] == {'id': 'a' * 32}
+        assert results[1]['error_name'] == 'rate_limit'
+
+    def test_too_many_events(self):
+        with self.settings(SENTRY_STORE_BATCH_MAX_EVENTS=1):
+            resp = self._postBatch([
+                {'message': 'foo'},
+                {'message': 'bar'},
+            ])
+        assert resp.status_code == 400, resp.content
+
+
 class CrossDomainXmlTest(TestCase):
     @fixture
     def path(self):